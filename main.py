@@ -5,6 +5,7 @@ from src.core.yolo_tracker import YOLOTracker
 from src.utils.helpers import load_config
 from src.core.BerxelTracker import BerxelTracker
 from src.core.DualModelTracker import DualModelTracker
+from src.core.multi_device import MultiDeviceTracker
 
 
 def main():
@@ -33,6 +34,12 @@ def main():
             model_path="runs/detect/train8/weights/best.pt",  # RGB模型路径
             config_path="configs/dual_tracker_config.yaml"  # 双模型配置文件
         )
+    elif tracker_type == 'multi':
+        # 多相机共享同一个模型
+        tracker = MultiDeviceTracker(
+            model_path="runs/detect/train8/weights/best.pt",
+            config_path="configs/tracker_config.yaml"
+        )
     else:
         raise ValueError(f"Unsupported tracker type: {tracker_type}")
 
@@ -1,9 +1,9 @@
 import cv2
 import numpy as np
 import logging
+import time
 from typing import Optional, Tuple, Dict, Any
 import yaml
-from ultralytics import YOLO
 from pathlib import Path
 import requests
 import sys
@@ -16,6 +16,20 @@ from src.devices.BerxelSdkDriver.BerxelHawkFrame import *
 from src.devices.BerxelSdkDriver.BerxelHawkDevice import *
 from src.devices.BerxelSdkDriver.BerxelHawkContext import *
 from src.devices.BerxelSdkDriver.BerxelHawkDefines import *
+from src.devices.device_backend import create_hawk_context
+from src.core.capture_worker import CaptureWorker
+from src.core.frame_sync import FrameSynchronizer, read_synced_pair
+from src.core.device_supervisor import DeviceSupervisor
+from src.core.frame_mode_controller import FrameModeController
+from src.core.model_registry import load_tracker_model, get_model_registry
+from src.core.frame_renderer import FrameRenderer
+from src.utils.depth_colorizer import create_display_colorizer
+from src.utils.depth_units import depth_pixel_type
+from src.core.motion_gate import create_motion_gate
+from src.core.detection_scheduler import create_detection_scheduler
+from src.core.two_stage import create_two_stage_recognizer
+from src.core.imgsz_controller import create_imgsz_controller
+from src.core.pipeline import Pipeline, StopPipeline, DROP_OLDEST, LATEST_ONLY
 
 
 class BerxelTracker:
@@ -36,14 +50,28 @@ class BerxelTracker:
         self.logger = self._setup_logging()
         
         # YOLO模型设置
-        self.model = YOLO(model_path) if model_path else None
+        self.model = load_tracker_model(model_path, self.config) if model_path else None
+        # 两阶段模式下手部定位+裁剪分类代替整帧检测
+        self.two_stage = create_two_stage_recognizer(self.config, self.model)
+        self.imgsz_controller = None if self.two_stage is not None else \
+            create_imgsz_controller(self.config, self.model, 'rgb')
         self.previous_class_name = None
         self.stable_frame_count = 0
+        self.motion_gate = create_motion_gate(self.config)
+        self.detection_scheduler = create_detection_scheduler(self.config)
+        self._last_results = None
         
         # Berxel相机设置
         self.__context = None
         self.__device = None
         self.__deviceList = []
+        self.capture_worker = None
+        self.frame_synchronizer = None
+        self.supervisor = None
+        self.frame_mode_controller = None
+        self.frame_modes = {}
+        self.pipeline = None
+        self._pending_frame_modes = None
         
         # 通道控制
         self.rgb_enabled = True
@@ -53,7 +81,11 @@ class BerxelTracker:
         # 最新帧缓存
         self.latest_rgb_frame = None
         self.latest_depth_frame = None
-        self.latest_tracked_frame = None
+        # 识别结果只在有观看者时绘制，本地窗口始终算一个观看者
+        self.renderer = FrameRenderer(self.config['preview_width'])
+        if self.config['display_window']:
+            self.renderer.add_viewer()
+        self.display_colorizer = create_display_colorizer()
 
         self.test_mode = test_mode
         self.test_post = test_post
@@ -77,7 +109,65 @@ class BerxelTracker:
             'server_url': 'http://localhost:5000',
             'required_stable_frames': 3,
             'display_window': True,
-            'mjpg_quality': 95
+            'mjpg_quality': 95,
+            'capture_thread': False,
+            'capture_ring_slots': 4,
+            'read_timeout_ms': 30,
+            'stream_mode': 'poll',
+            'push_queue_size': 2,
+            'frame_sync': False,
+            'sync_tolerance_us': 15000,
+            'sync_queue_size': 4,
+            'hardware_frame_sync': False,
+            'device_backend': 'berxel',
+            'simulated_device': {},
+            'auto_reconnect': True,
+            'stall_timeout_ms': 2000,
+            'reconnect_interval_ms': 500,
+            'max_reconnect_attempts': 0,
+            'adaptive_frame_mode': False,
+            'latency_budget_ms': 50,
+            'frame_mode_capture_budget_ms': 5.0,
+            'frame_mode_min_width': None,
+            'frame_mode_window': 30,
+            'frame_mode_cooldown_s': 5.0,
+            'pipeline_mode': False,
+            'pipeline_queue_size': 2,
+            'pipeline_queue_policy': 'drop_oldest',
+            'publish_queue_size': 8,
+            'inference_backend': 'ultralytics',
+            'onnx_runtime': {},
+            'model_warmup_runs': 2,
+            'preview_width': 0,
+            'inference_workers': 0,
+            'inference_worker_slots': 0,
+            'inference_worker_max_frame': [1080, 1920],
+            'motion_gate': False,
+            'motion_gate_source': 'rgb',
+            'motion_threshold': 0.01,
+            'motion_pixel_threshold': 12,
+            'motion_depth_threshold_mm': 30,
+            'motion_refresh_interval': 15,
+            'motion_gate_width': 80,
+            'detect_interval': 1,
+            'redetect_confidence': 0.5,
+            'box_propagation': 'flow',
+            'recognition_mode': 'detector',
+            'roi_locator': 'detector',
+            'roi_detector_path': None,
+            'roi_detector_imgsz': 320,
+            'crop_classifier_path': 'runs/classify/train/weights/best.pt',
+            'crop_imgsz': 128,
+            'crop_padding': 0.15,
+            'depth_roi_band_mm': 150,
+            'depth_roi_min_mm': 200,
+            'depth_roi_max_mm': 1500,
+            'adaptive_imgsz': False,
+            'imgsz_ladder': [640, 512, 416, 320],
+            'imgsz_target_p95_ms': 60,
+            'imgsz_window': 30,
+            'imgsz_step_up_ratio': 0.6,
+            'imgsz_cooldown_s': 3.0
         }
 
         if config_path and Path(config_path).exists():
@@ -90,9 +180,19 @@ class BerxelTracker:
         
         return default_config
     
+    def _stream_flags(self) -> int:
+        """当前启用的数据流标志"""
+        stream_flags = 0
+        if self.rgb_enabled:
+            stream_flags |= BerxelHawkStreamType.forward_dict['BERXEL_HAWK_COLOR_STREAM']
+        if self.depth_enabled:
+            stream_flags |= BerxelHawkStreamType.forward_dict['BERXEL_HAWK_DEPTH_STREAM']
+        return stream_flags
+
     def open_device(self) -> bool:
         """初始化并打开Berxel相机"""
-        self.__context = BerxelHawkContext()
+        self.__context = create_hawk_context(self.config['device_backend'],
+                                             self.config['simulated_device'])
         if self.__context is None:
             self.logger.error("初始化失败")
             return False
@@ -114,6 +214,8 @@ class BerxelTracker:
             return False
 
         self.__device.setDenoiseStatus(False)
+        if self.config['hardware_frame_sync']:
+            self.__device.setFrameSync(True)
         
         # 准备stream标志
         stream_flags = 0
@@ -122,75 +224,216 @@ class BerxelTracker:
         if self.depth_enabled:
             stream_flags |= BerxelHawkStreamType.forward_dict['BERXEL_HAWK_DEPTH_STREAM']
             
-            # 设置深度流模式
-            frameMode = self.__device.getCurrentFrameMode(
+            # 设置深度流模式（自适应帧模式选定的模式优先）
+            frameMode = self.frame_modes.get(
+                BerxelHawkStreamType.forward_dict['BERXEL_HAWK_DEPTH_STREAM']) or self.__device.getCurrentFrameMode(
                 BerxelHawkStreamType.forward_dict['BERXEL_HAWK_DEPTH_STREAM'])
             self.__device.setFrameMode(
                 BerxelHawkStreamType.forward_dict['BERXEL_HAWK_DEPTH_STREAM'], 
                 frameMode)
+            self._apply_depth_pixel_type(depth_pixel_type(self.__device))
+        if self.rgb_enabled and BerxelHawkStreamType.forward_dict['BERXEL_HAWK_COLOR_STREAM'] in self.frame_modes:
+            self.__device.setFrameMode(
+                BerxelHawkStreamType.forward_dict['BERXEL_HAWK_COLOR_STREAM'],
+                self.frame_modes[BerxelHawkStreamType.forward_dict['BERXEL_HAWK_COLOR_STREAM']])
 
+        if self.config['stream_mode'] == 'push':
+            # 回调推送模式：帧到达时唤醒读取方，不再按超时轮询
+            return self.__device.startPushStreams(stream_flags, self.config['push_queue_size']) == 0
         return self.__device.startStreams(stream_flags) == 0
-    
-    
-    
-    
-    
-    
+
+    def _apply_depth_pixel_type(self, pixel_type: int) -> None:
+        """把深度流的像素格式告知按毫米阈值处理原始深度的组件"""
+        if self.two_stage is not None:
+            self.two_stage.set_depth_pixel_type(pixel_type)
+        if self.motion_gate is not None:
+            self.motion_gate.set_depth_pixel_type(pixel_type)
+
+    def _frame_mode_min_width(self, model) -> int:
+        """帧模式的最小宽度：未配置时取检测器输入尺寸，低于它的分辨率检测器用不上"""
+        if self.config['frame_mode_min_width'] is not None:
+            return self.config['frame_mode_min_width']
+        if model is None:
+            return 0
+        return max(self.config['imgsz_ladder']) if self.config['adaptive_imgsz'] else model.input_size
+
+    def start_frame_mode_controller(self) -> None:
+        """根据支持的帧模式和推理延迟预算选择初始帧模式（数据流启动前调用）"""
+        if not self.config['adaptive_frame_mode'] or self.__device is None:
+            return
+        color_stream = BerxelHawkStreamType.forward_dict['BERXEL_HAWK_COLOR_STREAM']
+        depth_stream = BerxelHawkStreamType.forward_dict['BERXEL_HAWK_DEPTH_STREAM']
+        streams = [stream for stream, enabled in ((color_stream, self.rgb_enabled),
+                                                  (depth_stream, self.depth_enabled)) if enabled]
+        if not streams:
+            return
+        self.frame_mode_controller = FrameModeController(
+            self.__device,
+            primary_stream=streams[0],
+            secondary_streams=streams[1:],
+            latency_budget_ms=self.config['latency_budget_ms'],
+            capture_budget_ms=self.config['frame_mode_capture_budget_ms'],
+            min_width=self._frame_mode_min_width(self.model),
+            window=self.config['frame_mode_window'],
+            cooldown=self.config['frame_mode_cooldown_s'])
+        self.frame_modes = self.frame_mode_controller.select_initial()
+
+    def restart_streams(self, frame_modes: Dict[int, Any]) -> bool:
+        """以新的帧模式重启数据流：停采集线程、关流、切换模式、重新开流和采集"""
+        if self.capture_worker is not None:
+            self.capture_worker.stop()
+            self.capture_worker = None
+        if self.frame_synchronizer is not None:
+            self.frame_synchronizer.clear()
+            self.frame_synchronizer = None
+
+        self.__device.stopStream(self._stream_flags())
+        self.frame_modes = frame_modes
+        if not self.start_streams():
+            self.logger.error("Failed to restart streams with new frame mode")
+            return False
+        self.start_capture_worker()
+        return True
+
+    def warmup_models(self) -> None:
+        """按彩色流的实际分辨率用空白帧预热模型，避免首帧承担延迟初始化开销"""
+        if self.model is None:
+            return
+        mode = self.__device.getCurrentFrameMode(BerxelHawkStreamType.forward_dict['BERXEL_HAWK_COLOR_STREAM'])
+        if mode is not None:
+            get_model_registry().warmup(self.model, (mode.resolutionY, mode.resolutionX),
+                                        self.config['model_warmup_runs'])
+
+    def start_capture_worker(self) -> None:
+        """启动独立采集线程，推理循环改为从环形缓冲区取最新帧对"""
+        if self.__device is None:
+            return
+        if not self.config['capture_thread']:
+            self._create_frame_synchronizer()
+            return
+        self.capture_worker = CaptureWorker(
+            self.__device,
+            rgb_enabled=self.rgb_enabled,
+            depth_enabled=self.depth_enabled,
+            num_slots=self.config['capture_ring_slots'],
+            read_timeout_ms=self.config['read_timeout_ms'],
+            sync_tolerance=self.config['sync_tolerance_us'] if self.config['frame_sync'] else None,
+            sync_queue_size=self.config['sync_queue_size'])
+        self.capture_worker.start()
+        self.logger.info(f"Capture thread started with {self.capture_worker.ring_buffer.num_slots} slots")
+
+    def _create_frame_synchronizer(self) -> None:
+        """未启用采集线程时，直接读帧路径也按时间戳配对"""
+        self.frame_synchronizer = None
+        if self.config['frame_sync'] and self.rgb_enabled and self.depth_enabled:
+            self.frame_synchronizer = FrameSynchronizer(
+                self.config['sync_tolerance_us'],
+                self.config['sync_queue_size'],
+                on_drop=self.__device.releaseFrame)
+
+    def _capture_synced_frame(self) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """读取一对时间戳匹配的RGB和深度帧"""
+        pair = read_synced_pair(self.__device, self.frame_synchronizer, self.config['read_timeout_ms'])
+        if pair is None:
+            return None, None
+
+        hawkColorFrame = self.__device.leaseFrame(pair['color'])
+        hawkDepthFrame = self.__device.leaseFrame(pair['depth'])
+        # 零拷贝视图各自持有租约，视图被回收后帧才归还SDK
+        rgb_frame = hawkColorFrame.asColorArray()
+        depth_frame = hawkDepthFrame.asDepthArray()
+        hawkColorFrame.release()
+        hawkDepthFrame.release()
+        return rgb_frame, depth_frame
+
     def capture_frame(self) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
         """捕获一帧数据"""
+        if self.capture_worker is not None:
+            return self.capture_worker.read_latest(self.config['read_timeout_ms'] / 1000.)
+        if self.frame_synchronizer is not None:
+            return self._capture_synced_frame()
+
         rgb_frame = None
         depth_frame = None
         
         if self.rgb_enabled:
-            hawkColorFrame = self.__device.readColorFrame(30)
+            hawkColorFrame = self.__device.leaseFrame(
+                self.__device.readColorFrame(self.config['read_timeout_ms']))
             if hawkColorFrame is not None:
-                try:
-                    colorFrameBuffer = hawkColorFrame.getDataAsUint8()
-                    rgb_frame = np.ndarray(
-                        shape=(hawkColorFrame.getHeight(), 
-                              hawkColorFrame.getWidth(), 3),
-                        dtype=np.uint8, 
-                        buffer=colorFrameBuffer)
-                finally:
-                    self.__device.releaseFrame(hawkColorFrame)
+                # 零拷贝视图持有租约，视图被回收后帧才归还SDK
+                rgb_frame = hawkColorFrame.asColorArray()
+                hawkColorFrame.release()
         
         if self.depth_enabled:
-            hawkDepthFrame = self.__device.readDepthFrame(30)
+            hawkDepthFrame = self.__device.leaseFrame(
+                self.__device.readDepthFrame(self.config['read_timeout_ms']))
             if hawkDepthFrame is not None:
-                try:
-                    depthFrameBuffer = hawkDepthFrame.getDataAsUint16()
-                    depth_frame = np.ndarray(
-                        shape=(hawkDepthFrame.getHeight(), 
-                              hawkDepthFrame.getWidth()),
-                        dtype=np.uint16, 
-                        buffer=depthFrameBuffer)
-                finally:
-                    self.__device.releaseFrame(hawkDepthFrame)
+                depth_frame = hawkDepthFrame.asDepthArray()
+                hawkDepthFrame.release()
         
         return rgb_frame, depth_frame
     
 
-    def process_frame(self, frame: np.ndarray) -> Tuple[np.ndarray, Optional[str]]:
+    def process_frame(self, frame: np.ndarray, depth_frame: Optional[np.ndarray] = None) -> Tuple[np.ndarray, Optional[str]]:
         """处理帧并进行目标检测"""
         if not self.tracking_enabled or self.model is None:
             return frame, None
             
         # 运行YOLO追踪
-        results = self.model.track(frame, persist=True)
-        annotated_frame = results[0].plot()
+        results = self._run_model(frame, depth_frame)
+        return self._postprocess(frame, results)
+
+    def _run_model(self, frame: np.ndarray, depth_frame: Optional[np.ndarray] = None):
+        """
+        运行检测器
+
+        启用运动门控且画面基本静止时复用上一次的结果；启用检测调度时，
+        两次检测之间由调度器推算检测框。
+        """
+        if self.motion_gate is not None:
+            gate_frame = depth_frame if self.motion_gate.source == 'depth' else frame
+            if gate_frame is not None and not self.motion_gate.should_infer(gate_frame) \
+                    and self._last_results is not None:
+                return self._last_results
+
+        if self.detection_scheduler is not None and not self.detection_scheduler.should_detect():
+            self._last_results = self.detection_scheduler.propagate(frame)
+            return self._last_results
+
+        infer_start = time.monotonic()
+        if self.two_stage is not None:
+            results = self.two_stage.predict(frame, depth_frame)
+        elif self.imgsz_controller is not None:
+            results = self.model.track(frame, persist=True, imgsz=self.imgsz_controller.imgsz)
+            self.imgsz_controller.observe((time.monotonic() - infer_start) * 1000)
+        else:
+            results = self.model.track(frame, persist=True)
+        if self.motion_gate is not None:
+            self.motion_gate.record_inference((time.monotonic() - infer_start) * 1000)
+        if self.detection_scheduler is not None:
+            self.detection_scheduler.update(frame, results)
+        self._last_results = results
+        return results
+
+    def _postprocess(self, frame: np.ndarray, results) -> Tuple[np.ndarray, Optional[str]]:
+        """做类别稳定性过滤；开启本地窗口时返回绘制了检测结果的帧，否则返回原帧"""
+        self.renderer.submit(frame, results)
+        # MJPEG观看者通过get_latest_frame各自取绘制结果，这里只为本地窗口绘制
+        annotated_frame = self.renderer.render() if self.config['display_window'] else frame
         detected_class_name = None
 
         # 提取检测到的类别
         if len(results[0].boxes) > 0:
             class_tensor = results[0].boxes.cls
             class_id = class_tensor[0].item()
-            detected_class_name = self.model.names[class_id]
+            detected_class_name = results[0].names[class_id]
 
-        # 稳定性过滤
-        if detected_class_name == self.previous_class_name:
-            self.stable_frame_count += 1
-        else:
-            self.stable_frame_count = 0
+        # 稳定性过滤（推算帧沿用上一次检测的类别，不计入稳定帧数）
+        if not getattr(results[0], 'propagated', False):
+            if detected_class_name == self.previous_class_name:
+                self.stable_frame_count += 1
+            else:
+                self.stable_frame_count = 0
 
         filtered_class_name = None
         if self.stable_frame_count >= self.config['required_stable_frames']:
@@ -221,63 +464,237 @@ class BerxelTracker:
             self.logger.error("Failed to open device")
             return
             
+        self.start_frame_mode_controller()
         if not self.start_streams():
             self.logger.error("Failed to start streams")
             return
-            
+
+        self.warmup_models()
+        self.start_capture_worker()
+        self.start_supervisor()
         self.logger.info("Starting tracking...")
         
         try:
+            if self.config['pipeline_mode']:
+                self.run_pipeline()
+                return
+
             while True:
-                # 捕获帧
-                rgb_frame, depth_frame = self.capture_frame()
-                # rgb_frame = cv2.cvtColor(rgb_frame, cv2.COLOR_RGB2BGR)
-                
-                if rgb_frame is not None:
-                    # 处理RGB帧
-                    if self.tracking_enabled:
-                        tracked_frame, class_name = self.process_frame(cv2.cvtColor(rgb_frame, cv2.COLOR_RGB2BGR))
-                        self.latest_tracked_frame = tracked_frame
-                        if class_name:
-                            self.logger.info(f"Detected: {class_name}")
-                            self.post_class_name(class_name)
-                    else:
-                        tracked_frame = rgb_frame
-                        
-                    # 显示RGB结果
-                    if self.config['display_window']:
-                        cv2.imshow("RGB View", tracked_frame)
-                
-                if depth_frame is not None:
-                    # 显示深度图
-                    if self.config['display_window']:
-                        depth_display = ((depth_frame / 10000.) * 255).astype(np.uint8)
-                        cv2.imshow("Depth View", depth_display)
-                
-                # 检查退出条件
-                if cv2.waitKey(1) & 0xFF == ord('q'):
+                # 先检查设备再读帧：重连关闭旧设备时主循环不持有它的帧
+                if self.supervisor is not None and not self.supervisor.check():
+                    break
+                if not self._track_next_frame():
                     break
                     
         finally:
             self.cleanup()
 
-    def get_latest_frame(self) -> Any:
-        return self.latest_tracked_frame
+    def _track_next_frame(self) -> bool:
+        """捕获并处理一帧，返回False表示用户要求退出；帧的租约在返回时随局部变量释放"""
+        self._apply_pending_frame_modes()
+        rgb_frame, depth_frame = self.capture_frame()
+        if self.supervisor is not None and (rgb_frame is not None or depth_frame is not None):
+            self.supervisor.frame_received()
+        # rgb_frame = cv2.cvtColor(rgb_frame, cv2.COLOR_RGB2BGR)
+        
+        if rgb_frame is not None:
+            # 处理RGB帧
+            if self.tracking_enabled:
+                tracked_frame, class_name = self.process_frame(self._convert_color(rgb_frame), depth_frame)
+                if class_name:
+                    self.logger.info(f"Detected: {class_name}")
+                    self.post_class_name(class_name)
+            else:
+                tracked_frame = rgb_frame
+                
+            # 显示RGB结果
+            if self.config['display_window']:
+                cv2.imshow("RGB View", tracked_frame)
+        
+        if depth_frame is not None:
+            # 显示深度图
+            if self.config['display_window']:
+                cv2.imshow("Depth View", self.display_colorizer.colorize(depth_frame))
+        
+        # 检查退出条件
+        return (cv2.waitKey(1) & 0xFF) != ord('q')
+
+    def _convert_color(self, rgb_frame: np.ndarray) -> np.ndarray:
+        """RGB转BGR；转换耗时随彩色流分辨率变化，作为采集侧开销交给帧模式控制器"""
+        convert_start = time.monotonic()
+        bgr = cv2.cvtColor(rgb_frame, cv2.COLOR_RGB2BGR)
+        if self.frame_mode_controller is not None:
+            frame_modes = self.frame_mode_controller.observe((time.monotonic() - convert_start) * 1000)
+            if frame_modes:
+                # 由读帧的线程在下一次读帧前重启数据流，此时不持有旧数据流的帧
+                self._pending_frame_modes = frame_modes
+        return bgr
+
+    def _apply_pending_frame_modes(self) -> None:
+        if self._pending_frame_modes is not None:
+            frame_modes, self._pending_frame_modes = self._pending_frame_modes, None
+            self.restart_streams(frame_modes)
+
+    def build_pipeline(self) -> Pipeline:
+        """把采集、预处理、推理、后处理、发布和显示组织成流水线，各阶段独立线程运行"""
+        queue_size = self.config['pipeline_queue_size']
+        policy = self.config['pipeline_queue_policy']
+
+        pipeline = Pipeline('BerxelTracker.pipeline')
+        pipeline.add_stage('capture', self._stage_capture)
+        pipeline.add_stage('preprocess', self._stage_preprocess, queue_size=queue_size, policy=policy)
+        pipeline.add_stage('infer', self._stage_infer, queue_size=queue_size, policy=policy)
+        pipeline.add_stage('postprocess', self._stage_postprocess, queue_size=queue_size, policy=policy)
+        pipeline.add_stage('publish', self._stage_publish, upstream='postprocess',
+                           queue_size=self.config['publish_queue_size'], policy=DROP_OLDEST)
+        if self.config['display_window']:
+            pipeline.add_stage('display', self._stage_display, upstream='postprocess', policy=LATEST_ONLY,
+                               main_thread=True)
+        return pipeline
+
+    def run_pipeline(self) -> None:
+        """以流水线方式运行，阻塞到按下q或Ctrl+C"""
+        self.pipeline = self.build_pipeline()
+        try:
+            self.pipeline.run()
+        finally:
+            self.logger.info(f"Pipeline stats: {self.pipeline.get_stats()}")
+            self.pipeline = None
+
+    def _stage_capture(self) -> Optional[Dict[str, Any]]:
+        self._apply_pending_frame_modes()
+
+        # 先检查设备再读帧：重连关闭旧设备时采集阶段不持有它的帧
+        if self.supervisor is not None and not self.supervisor.check():
+            raise StopPipeline()
+        rgb_frame, depth_frame = self.capture_frame()
+        if self.supervisor is not None and (rgb_frame is not None or depth_frame is not None):
+            self.supervisor.frame_received()
+        if rgb_frame is None and depth_frame is None:
+            return None
+
+        if self.capture_worker is not None:
+            # 环形缓冲区槽位在下一次read_latest后会被复用，进入流水线前拷贝一份
+            rgb_frame = None if rgb_frame is None else rgb_frame.copy()
+            depth_frame = None if depth_frame is None else depth_frame.copy()
+        return {'rgb': rgb_frame, 'depth': depth_frame, 'capture_time': time.monotonic()}
+
+    def _stage_preprocess(self, packet: Dict[str, Any]) -> Dict[str, Any]:
+        if packet['rgb'] is not None and self.tracking_enabled:
+            packet['bgr'] = self._convert_color(packet['rgb'])
+        return packet
+
+    def _stage_infer(self, packet: Dict[str, Any]) -> Dict[str, Any]:
+        packet['results'] = None
+        if packet.get('bgr') is not None and self.model is not None:
+            packet['results'] = self._run_model(packet['bgr'], packet['depth'])
+        return packet
+
+    def _stage_postprocess(self, packet: Dict[str, Any]) -> Dict[str, Any]:
+        packet['class_name'] = None
+        if packet['results'] is not None:
+            packet['tracked'], packet['class_name'] = self._postprocess(packet['bgr'], packet['results'])
+        else:
+            packet['tracked'] = packet.get('bgr', packet['rgb'])
+        return packet
+
+    def _stage_publish(self, packet: Dict[str, Any]) -> None:
+        if packet['class_name']:
+            self.logger.info(f"Detected: {packet['class_name']}")
+            self.post_class_name(packet['class_name'])
+
+    def _stage_display(self, packet: Dict[str, Any]) -> None:
+        if packet['tracked'] is not None:
+            cv2.imshow("RGB View", packet['tracked'])
+        if packet['depth'] is not None:
+            cv2.imshow("Depth View", self.display_colorizer.colorize(packet['depth']))
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            raise StopPipeline()
+
+    def get_latest_frame(self, out: Optional[np.ndarray] = None) -> Any:
+        return self.renderer.render(out)
+
+    def add_viewer(self) -> None:
+        """登记一个观看者（如/mjpg_stream客户端），有观看者时才绘制识别结果"""
+        self.renderer.add_viewer()
+
+    def remove_viewer(self) -> None:
+        self.renderer.remove_viewer()
+
+    def start_supervisor(self) -> None:
+        """注册设备状态回调并启用停滞检测，掉线后自动重连"""
+        if not self.config['auto_reconnect'] or self.__context is None:
+            return
+        self.supervisor = DeviceSupervisor(
+            teardown=self.close_device,
+            reopen=self.reopen_device,
+            stall_timeout_ms=self.config['stall_timeout_ms'],
+            retry_interval_ms=self.config['reconnect_interval_ms'],
+            max_attempts=self.config['max_reconnect_attempts'])
+        self.supervisor.attach(self.__context, self.__deviceList[0].serialNumber)
+
+    def reopen_device(self) -> bool:
+        """重新打开设备、数据流和采集线程，模型和稳定性过滤状态保持不变"""
+        if not self.open_device() or not self.start_streams():
+            return False
+        self.start_capture_worker()
+        self.supervisor.attach(self.__context, self.__deviceList[0].serialNumber)
+        return True
+
+    def close_device(self):
+        """停止采集并关闭设备"""
+        if self.capture_worker is not None:
+            self.capture_worker.stop()
+            self.logger.info(f"Capture stats: {self.capture_worker.get_stats()}")
+            self.capture_worker = None
+
+        if self.frame_synchronizer is not None:
+            self.logger.info(f"Frame sync stats: {self.frame_synchronizer.get_stats()}")
+            self.frame_synchronizer.clear()
+            self.frame_synchronizer = None
 
-    def cleanup(self):
-        """清理资源"""
         if self.__device:
-            stream_flags = 0
-            if self.rgb_enabled:
-                stream_flags |= BerxelHawkStreamType.forward_dict['BERXEL_HAWK_COLOR_STREAM']
-            if self.depth_enabled:
-                stream_flags |= BerxelHawkStreamType.forward_dict['BERXEL_HAWK_DEPTH_STREAM']
-            self.__device.stopStream(stream_flags)
+            self.__device.stopStream(self._stream_flags())
+
+        # 缓存的识别结果引用着零拷贝帧；销毁上下文前等待流水线等处仍持有的租约归还
+        self._last_results = None
+        if self.__device and not self.__device.drainLeases():
+            self.logger.warning(f"{self.__device.getOutstandingLeases()} frame leases still held at close, "
+                                f"invalidating them")
 
         if self.__context and self.__device:
             self.__context.clsoeDevice(self.__device)
+        if self.__context:
             self.__context.destroyCamera()
+        self.__device = None
+        self.__context = None
+
+    def cleanup(self):
+        """清理资源"""
+        if self.supervisor is not None:
+            self.supervisor.stop()
+            self.logger.info(f"Reconnect stats: {self.supervisor.get_stats()}")
+            self.supervisor = None
+
+        if self.frame_mode_controller is not None:
+            self.logger.info(f"Frame mode stats: {self.frame_mode_controller.get_stats()}")
+
+        if self.motion_gate is not None:
+            self.logger.info(f"Motion gate stats: {self.motion_gate.get_stats()}")
+
+        if self.two_stage is not None:
+            self.logger.info(f"Two-stage stats: {self.two_stage.get_stats()}")
+
+        if self.imgsz_controller is not None:
+            self.logger.info(f"Imgsz controller stats: {self.imgsz_controller.get_stats()}")
+
+        if self.detection_scheduler is not None:
+            self.logger.info(f"Detection scheduler stats: {self.detection_scheduler.get_stats()}")
+
+        self.logger.info(f"Model registry stats: {get_model_registry().get_stats()}")
+        self.logger.info(f"Renderer stats: {self.renderer.get_stats()}")
 
+        self.close_device()
         cv2.destroyAllWindows()
 
     def toggle_rgb(self, enabled: bool):
@@ -3,7 +3,6 @@ import numpy as np
 import logging
 from typing import Optional, Tuple, Dict, Any
 import yaml
-from ultralytics import YOLO
 from pathlib import Path
 import requests
 import sys
@@ -20,6 +19,46 @@ from src.devices.BerxelSdkDriver.BerxelHawkFrame import *
 from src.devices.BerxelSdkDriver.BerxelHawkDevice import *
 from src.devices.BerxelSdkDriver.BerxelHawkContext import *
 from src.devices.BerxelSdkDriver.BerxelHawkDefines import *
+from src.devices.device_backend import create_hawk_context
+from src.core.capture_worker import CaptureWorker
+from src.core.frame_sync import FrameSynchronizer, read_synced_pair
+from src.core.device_supervisor import DeviceSupervisor
+from src.core.frame_mode_controller import FrameModeController
+from src.core.model_registry import load_tracker_model, get_model_registry
+from src.core.frame_renderer import FrameRenderer
+from src.utils.depth_colorizer import create_depth_colorizer, create_display_colorizer
+from src.utils.rgbd import fuse_rgbd
+from src.utils.depth_units import depth_pixel_type
+from src.core.motion_gate import create_motion_gate
+from src.core.detection_scheduler import create_detection_scheduler
+from src.core.two_stage import create_two_stage_recognizer
+from src.core.imgsz_controller import create_imgsz_controller
+from src.core.inference_server import create_inference_server
+from src.core.inference_backend import DetectionBoxes, DetectionResult
+from src.core.cascade import create_cascade_gate, RGB_ONLY
+from src.core.pipeline import Pipeline, StopPipeline, DROP_OLDEST, LATEST_ONLY
+
+
+LATE_FUSION = 'late'
+EARLY_FUSION = 'early'
+
+
+def fuse_predictions(rgb_class, rgb_conf, rgb_stable, depth_class, depth_conf, depth_stable,
+                     weights: Dict[str, float]) -> Tuple[Optional[str], float]:
+    """决策融合：类别一致时取较高置信度，否则按 置信度 * 权重 * (稳定帧数 + 1) 取较高的一方"""
+    if rgb_class == depth_class and rgb_class is not None:
+        return rgb_class, max(rgb_conf, depth_conf)
+
+    rgb_score = rgb_conf * weights['rgb'] * (rgb_stable + 1)
+    depth_score = depth_conf * weights['depth'] * (depth_stable + 1)
+
+    if rgb_score > depth_score and rgb_score > 0:
+        return rgb_class, rgb_conf
+    elif depth_score > rgb_score and depth_score > 0:
+        return depth_class, depth_conf
+
+    return None, 0.0
+
 
 class DualModelTracker:
     def __init__(self, 
@@ -42,15 +81,47 @@ class DualModelTracker:
         
         # 从配置中获取深度模型路径
         depth_model_path = self.config.get('depth_model_path', model_path)
+        # 早期融合：model_path为4通道RGB-D模型，一次前向代替两个模型
+        self.early_fusion = self.config['fusion_mode'] == EARLY_FUSION
+        if self.early_fusion and (self.config['recognition_mode'] == 'two_stage' or self.config['cascade_inference']):
+            self.logger.warning("two_stage and cascade_inference are not used with early fusion")
         
         # 初始化模型
-        self.rgb_model = YOLO(model_path)
-        self.depth_model = YOLO(depth_model_path)
+        self.rgb_model = load_tracker_model(model_path, self.config)
+        self.depth_model = None if self.early_fusion else load_tracker_model(depth_model_path, self.config)
+        
+        # 两阶段模式下RGB分支改为手部定位+裁剪分类，深度分支不变
+        self.two_stage = None if self.early_fusion else create_two_stage_recognizer(self.config, self.rgb_model)
+        # 两个模型的耗时不同，各自独立调整输入尺寸
+        self.rgb_imgsz_controller = None if self.two_stage is not None else \
+            create_imgsz_controller(self.config, self.rgb_model, 'rgb')
+        self.depth_imgsz_controller = None if self.early_fusion else \
+            create_imgsz_controller(self.config, self.depth_model, 'depth')
+        self.motion_gate = create_motion_gate(self.config)
+        # 深度模型输入按标定范围查表上色（未标定时逐帧归一化），与训练数据准备一致；早期融合时为灰度深度通道
+        self.depth_colorizer = create_depth_colorizer(self.config, grayscale=self.early_fusion)
+        self.display_colorizer = create_display_colorizer(cv2.COLORMAP_JET)
+        self._rgbd_input = None
+        # 级联模式：RGB结果可信时跳过深度模型
+        self.cascade = None if self.early_fusion else create_cascade_gate(self.config)
+        # 两个模型各自推算检测框，但总是在同一帧上一起检测；级联模式下推算帧只用RGB结果
+        self.rgb_scheduler = create_detection_scheduler(self.config)
+        self.depth_scheduler = create_detection_scheduler(self.config) \
+            if self.cascade is None and not self.early_fusion else None
+        self._last_results = None
+        self.inference_server = self._create_inference_server(model_path, depth_model_path)
         
         # 相机设置
         self.__context = None
         self.__device = None
         self.__deviceList = []
+        self.capture_worker = None
+        self.frame_synchronizer = None
+        self.supervisor = None
+        self.frame_mode_controller = None
+        self.frame_modes = {}
+        self.pipeline = None
+        self._pending_frame_modes = None
         
         # 跟踪状态
         self.previous_rgb_class = None
@@ -58,8 +129,10 @@ class DualModelTracker:
         self.rgb_stable_count = 0
         self.depth_stable_count = 0
         
-        # 最新帧缓存
-        self.latest_tracked_frame = None
+        # 识别结果只在有观看者时绘制，本地窗口始终算一个观看者
+        self.renderer = FrameRenderer(self.config['preview_width'])
+        if self.config['display_window']:
+            self.renderer.add_viewer()
         
         # 测试相关设置
         self.test_mode = test_mode
@@ -84,7 +157,76 @@ class DualModelTracker:
             'required_stable_frames': 3,
             'display_window': True,
             'confidence_threshold': 0.5,
-            'fusion_weights': {'rgb': 0.6, 'depth': 0.4}
+            'fusion_weights': {'rgb': 0.6, 'depth': 0.4},
+            'fusion_mode': LATE_FUSION,
+            'cascade_inference': False,
+            'cascade_confidence': 0.6,
+            'cascade_history': 5,
+            'cascade_refresh_interval': 10,
+            'capture_thread': False,
+            'capture_ring_slots': 4,
+            'read_timeout_ms': 30,
+            'stream_mode': 'poll',
+            'push_queue_size': 2,
+            'frame_sync': False,
+            'sync_tolerance_us': 15000,
+            'sync_queue_size': 4,
+            'hardware_frame_sync': False,
+            'device_backend': 'berxel',
+            'simulated_device': {},
+            'auto_reconnect': True,
+            'stall_timeout_ms': 2000,
+            'reconnect_interval_ms': 500,
+            'max_reconnect_attempts': 0,
+            'adaptive_frame_mode': False,
+            'latency_budget_ms': 50,
+            'frame_mode_capture_budget_ms': 5.0,
+            'frame_mode_min_width': None,
+            'frame_mode_window': 30,
+            'frame_mode_cooldown_s': 5.0,
+            'pipeline_mode': False,
+            'pipeline_queue_size': 2,
+            'pipeline_queue_policy': 'drop_oldest',
+            'publish_queue_size': 8,
+            'inference_backend': 'ultralytics',
+            'onnx_runtime': {},
+            'model_warmup_runs': 2,
+            'preview_width': 0,
+            'depth_range': None,
+            'depth_range_file': None,
+            'depth_colormap': 'jet',
+            'inference_workers': 0,
+            'inference_worker_slots': 0,
+            'inference_worker_max_frame': [1080, 1920],
+            'inference_batching': False,
+            'inference_batch_size': 0,
+            'inference_batch_wait_ms': 5.0,
+            'motion_gate': False,
+            'motion_gate_source': 'rgb',
+            'motion_threshold': 0.01,
+            'motion_pixel_threshold': 12,
+            'motion_depth_threshold_mm': 30,
+            'motion_refresh_interval': 15,
+            'motion_gate_width': 80,
+            'detect_interval': 1,
+            'redetect_confidence': 0.5,
+            'box_propagation': 'flow',
+            'recognition_mode': 'detector',
+            'roi_locator': 'detector',
+            'roi_detector_path': None,
+            'roi_detector_imgsz': 320,
+            'crop_classifier_path': 'runs/classify/train/weights/best.pt',
+            'crop_imgsz': 128,
+            'crop_padding': 0.15,
+            'depth_roi_band_mm': 150,
+            'depth_roi_min_mm': 200,
+            'depth_roi_max_mm': 1500,
+            'adaptive_imgsz': False,
+            'imgsz_ladder': [640, 512, 416, 320],
+            'imgsz_target_p95_ms': 60,
+            'imgsz_window': 30,
+            'imgsz_step_up_ratio': 0.6,
+            'imgsz_cooldown_s': 3.0
         }
 
         if config_path and Path(config_path).exists():
@@ -97,9 +239,29 @@ class DualModelTracker:
         
         return default_config
 
+    def _create_inference_server(self, model_path: str, depth_model_path: str):
+        """
+        RGB和深度模型为同一权重时，两路图像合成一批推理
+
+        一次前向只能跑同一个网络，权重不同或RGB分支为两阶段识别、启用了输入尺寸控制时不合批；
+        级联模式下深度模型在RGB之后按需运行，早期融合只有一个模型，也不合批。
+        """
+        if not self.config['inference_batching']:
+            return None
+        if self.cascade is not None or self.early_fusion:
+            self.logger.warning("Inference batching is not used in cascade or early fusion mode, disabled")
+            return None
+        if Path(model_path).resolve() != Path(depth_model_path).resolve() or self.two_stage is not None \
+                or self.rgb_imgsz_controller is not None or self.depth_imgsz_controller is not None:
+            self.logger.warning("Inference batching requires the RGB and depth models to share weights "
+                                "without two_stage or adaptive_imgsz, disabled")
+            return None
+        return create_inference_server(self.config, self.rgb_model, 2, 'dual')
+
     def open_device(self) -> bool:
         """初始化并打开Berxel相机"""
-        self.__context = BerxelHawkContext()
+        self.__context = create_hawk_context(self.config['device_backend'],
+                                             self.config['simulated_device'])
         if self.__context is None:
             self.logger.error("初始化失败")
             return False
@@ -120,52 +282,158 @@ class DualModelTracker:
             return False
 
         self.__device.setDenoiseStatus(False)
+        if self.config['hardware_frame_sync']:
+            self.__device.setFrameSync(True)
         
-        # 设置深度流模式
-        frameMode = self.__device.getCurrentFrameMode(
+        # 设置深度流模式（自适应帧模式选定的模式优先）
+        frameMode = self.frame_modes.get(
+            BerxelHawkStreamType.forward_dict['BERXEL_HAWK_DEPTH_STREAM']) or self.__device.getCurrentFrameMode(
             BerxelHawkStreamType.forward_dict['BERXEL_HAWK_DEPTH_STREAM'])
         self.__device.setFrameMode(
             BerxelHawkStreamType.forward_dict['BERXEL_HAWK_DEPTH_STREAM'], 
             frameMode)
+        self._apply_depth_pixel_type(depth_pixel_type(self.__device))
+        if BerxelHawkStreamType.forward_dict['BERXEL_HAWK_COLOR_STREAM'] in self.frame_modes:
+            self.__device.setFrameMode(
+                BerxelHawkStreamType.forward_dict['BERXEL_HAWK_COLOR_STREAM'],
+                self.frame_modes[BerxelHawkStreamType.forward_dict['BERXEL_HAWK_COLOR_STREAM']])
 
         # 启动RGB和深度流
-        ret = self.__device.startStreams(
-            BerxelHawkStreamType.forward_dict['BERXEL_HAWK_COLOR_STREAM'] |
-            BerxelHawkStreamType.forward_dict['BERXEL_HAWK_DEPTH_STREAM']
-        )
+        stream_flags = (BerxelHawkStreamType.forward_dict['BERXEL_HAWK_COLOR_STREAM'] |
+                        BerxelHawkStreamType.forward_dict['BERXEL_HAWK_DEPTH_STREAM'])
+        if self.config['stream_mode'] == 'push':
+            # 回调推送模式：帧到达时唤醒读取方，不再按超时轮询
+            ret = self.__device.startPushStreams(stream_flags, self.config['push_queue_size'])
+        else:
+            ret = self.__device.startStreams(stream_flags)
         
         return ret == 0
 
+    def _apply_depth_pixel_type(self, pixel_type: int) -> None:
+        """把深度流的像素格式告知按毫米阈值处理原始深度的组件"""
+        if self.two_stage is not None:
+            self.two_stage.set_depth_pixel_type(pixel_type)
+        if self.motion_gate is not None:
+            self.motion_gate.set_depth_pixel_type(pixel_type)
+        self.depth_colorizer.set_depth_pixel_type(pixel_type)
+
+    def _frame_mode_min_width(self, model) -> int:
+        """帧模式的最小宽度：未配置时取检测器输入尺寸，低于它的分辨率检测器用不上"""
+        if self.config['frame_mode_min_width'] is not None:
+            return self.config['frame_mode_min_width']
+        if model is None:
+            return 0
+        return max(self.config['imgsz_ladder']) if self.config['adaptive_imgsz'] else model.input_size
+
+    def start_frame_mode_controller(self) -> None:
+        """根据支持的帧模式和推理延迟预算选择初始帧模式（数据流启动前调用）"""
+        if not self.config['adaptive_frame_mode'] or self.__device is None:
+            return
+        self.frame_mode_controller = FrameModeController(
+            self.__device,
+            primary_stream=BerxelHawkStreamType.forward_dict['BERXEL_HAWK_COLOR_STREAM'],
+            secondary_streams=[BerxelHawkStreamType.forward_dict['BERXEL_HAWK_DEPTH_STREAM']],
+            latency_budget_ms=self.config['latency_budget_ms'],
+            capture_budget_ms=self.config['frame_mode_capture_budget_ms'],
+            min_width=self._frame_mode_min_width(self.rgb_model),
+            window=self.config['frame_mode_window'],
+            cooldown=self.config['frame_mode_cooldown_s'])
+        self.frame_modes = self.frame_mode_controller.select_initial()
+
+    def restart_streams(self, frame_modes: Dict[int, Any]) -> bool:
+        """以新的帧模式重启数据流：停采集线程、关流、切换模式、重新开流和采集"""
+        if self.capture_worker is not None:
+            self.capture_worker.stop()
+            self.capture_worker = None
+        if self.frame_synchronizer is not None:
+            self.frame_synchronizer.clear()
+            self.frame_synchronizer = None
+
+        self.__device.stopStream(
+            BerxelHawkStreamType.forward_dict['BERXEL_HAWK_COLOR_STREAM'] |
+            BerxelHawkStreamType.forward_dict['BERXEL_HAWK_DEPTH_STREAM'])
+        self.frame_modes = frame_modes
+        if not self.start_streams():
+            self.logger.error("Failed to restart streams with new frame mode")
+            return False
+        self.start_capture_worker()
+        return True
+
+    def warmup_models(self) -> None:
+        """按彩色流和深度流的实际分辨率用空白帧预热两个模型，避免首帧承担延迟初始化开销"""
+        registry = get_model_registry()
+        for model, stream in ((self.rgb_model, 'BERXEL_HAWK_COLOR_STREAM'),
+                              (self.depth_model, 'BERXEL_HAWK_DEPTH_STREAM')):
+            if model is None:
+                continue
+            mode = self.__device.getCurrentFrameMode(BerxelHawkStreamType.forward_dict[stream])
+            if mode is not None:
+                registry.warmup(model, (mode.resolutionY, mode.resolutionX), self.config['model_warmup_runs'])
+
+    def start_capture_worker(self) -> None:
+        """启动独立采集线程，推理循环改为从环形缓冲区取最新帧对"""
+        if self.__device is None:
+            return
+        if not self.config['capture_thread']:
+            self._create_frame_synchronizer()
+            return
+        self.capture_worker = CaptureWorker(
+            self.__device,
+            num_slots=self.config['capture_ring_slots'],
+            read_timeout_ms=self.config['read_timeout_ms'],
+            sync_tolerance=self.config['sync_tolerance_us'] if self.config['frame_sync'] else None,
+            sync_queue_size=self.config['sync_queue_size'])
+        self.capture_worker.start()
+        self.logger.info(f"Capture thread started with {self.capture_worker.ring_buffer.num_slots} slots")
+
+    def _create_frame_synchronizer(self) -> None:
+        """未启用采集线程时，直接读帧路径也按时间戳配对"""
+        self.frame_synchronizer = None
+        if self.config['frame_sync']:
+            self.frame_synchronizer = FrameSynchronizer(
+                self.config['sync_tolerance_us'],
+                self.config['sync_queue_size'],
+                on_drop=self.__device.releaseFrame)
+
+    def _capture_synced_frame(self) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """读取一对时间戳匹配的RGB和深度帧"""
+        pair = read_synced_pair(self.__device, self.frame_synchronizer, self.config['read_timeout_ms'])
+        if pair is None:
+            return None, None
+
+        hawkColorFrame = self.__device.leaseFrame(pair['color'])
+        hawkDepthFrame = self.__device.leaseFrame(pair['depth'])
+        # 零拷贝视图各自持有租约，视图被回收后帧才归还SDK
+        rgb_frame = hawkColorFrame.asColorArray()
+        depth_frame = hawkDepthFrame.asDepthArray()
+        hawkColorFrame.release()
+        hawkDepthFrame.release()
+        return rgb_frame, depth_frame
+
     def capture_frame(self) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
         """捕获一帧RGB和深度数据"""
+        if self.capture_worker is not None:
+            return self.capture_worker.read_latest(self.config['read_timeout_ms'] / 1000.)
+        if self.frame_synchronizer is not None:
+            return self._capture_synced_frame()
+
         rgb_frame = None
         depth_frame = None
         
         # 读取RGB帧
-        hawkColorFrame = self.__device.readColorFrame(30)
+        hawkColorFrame = self.__device.leaseFrame(
+            self.__device.readColorFrame(self.config['read_timeout_ms']))
         if hawkColorFrame is not None:
-            try:
-                colorFrameBuffer = hawkColorFrame.getDataAsUint8()
-                rgb_frame = np.ndarray(
-                    shape=(hawkColorFrame.getHeight(), 
-                          hawkColorFrame.getWidth(), 3),
-                    dtype=np.uint8, 
-                    buffer=colorFrameBuffer)
-            finally:
-                self.__device.releaseFrame(hawkColorFrame)
+            # 零拷贝视图持有租约，视图被回收后帧才归还SDK
+            rgb_frame = hawkColorFrame.asColorArray()
+            hawkColorFrame.release()
         
         # 读取深度帧
-        hawkDepthFrame = self.__device.readDepthFrame(30)
+        hawkDepthFrame = self.__device.leaseFrame(
+            self.__device.readDepthFrame(self.config['read_timeout_ms']))
         if hawkDepthFrame is not None:
-            try:
-                depthFrameBuffer = hawkDepthFrame.getDataAsUint16()
-                depth_frame = np.ndarray(
-                    shape=(hawkDepthFrame.getHeight(), 
-                          hawkDepthFrame.getWidth()),
-                    dtype=np.uint16, 
-                    buffer=depthFrameBuffer)
-            finally:
-                self.__device.releaseFrame(hawkDepthFrame)
+            depth_frame = hawkDepthFrame.asDepthArray()
+            hawkDepthFrame.release()
         
         return rgb_frame, depth_frame
 
@@ -174,34 +442,122 @@ class DualModelTracker:
         处理单帧图像（保持与BerxelTracker接口一致）
         此方法主要用于兼容性，实际处理在process_dual_frames中进行
         """
-        if self.latest_tracked_frame is not None:
-            return self.latest_tracked_frame, self.previous_rgb_class
+        tracked_frame = self.renderer.render()
+        if tracked_frame is not None:
+            return tracked_frame, self.previous_rgb_class
         return frame, None
 
     def process_dual_frames(self, rgb_frame: np.ndarray, depth_frame: np.ndarray) -> Tuple[np.ndarray, Optional[str], float]:
         """处理RGB和深度帧"""
+        rgb_results, depth_results = self._run_models(rgb_frame, depth_frame)
+        return self._postprocess_dual(rgb_frame, rgb_results, depth_results)
+
+    def _run_models(self, rgb_frame: np.ndarray, depth_frame: np.ndarray,
+                    depth_visual: Optional[np.ndarray] = None) -> Tuple[Any, Any]:
+        """
+        运行两个模型
+
+        启用运动门控且画面基本静止时复用上一次的两组结果；启用检测调度时，两次检测之间
+        由调度器推算两个模型的检测框。启用级联模式时先运行RGB模型，由门控决定是否运行深度模型；
+        早期融合时RGB和深度合成4通道输入，由一个模型完成，深度分支为空结果。
+        depth_visual缺省时只在需要时才做深度伪彩色化，跳过的帧不付出这部分开销。
+        """
+        if self.motion_gate is not None:
+            gate_frame = depth_frame if self.motion_gate.source == 'depth' else rgb_frame
+            if not self.motion_gate.should_infer(gate_frame) and self._last_results is not None:
+                return self._last_results
+
+        if self.rgb_scheduler is not None and not self.rgb_scheduler.should_detect() \
+                and (self.depth_scheduler is None or not self.depth_scheduler.should_detect()):
+            if self.depth_scheduler is None:
+                depth_results = self._empty_depth_results(depth_frame)
+            else:
+                if depth_visual is None and self.depth_scheduler.propagator.needs_image:
+                    depth_visual = self._preprocess_depth(depth_frame)
+                depth_results = self.depth_scheduler.propagate(depth_visual if depth_visual is not None
+                                                               else depth_frame)
+            self._last_results = (self.rgb_scheduler.propagate(rgb_frame), depth_results)
+            return self._last_results
+
+        infer_start = time.monotonic()
+        if self.inference_server is not None:
+            if depth_visual is None:
+                depth_visual = self._preprocess_depth(depth_frame)
+            rgb_request = self.inference_server.submit(rgb_frame, 'rgb')
+            depth_results = self.inference_server.infer(depth_visual, 'depth')
+            rgb_results = rgb_request.result()
+        elif self.early_fusion:
+            self._rgbd_input = fuse_rgbd(rgb_frame, depth_frame, self.depth_colorizer, self._rgbd_input)
+            rgb_results = self._track(self.rgb_model, self._rgbd_input, self.rgb_imgsz_controller)
+            depth_results = self._empty_depth_results(depth_frame)
+        else:
+            if self.two_stage is not None:
+                rgb_results = self.two_stage.predict(rgb_frame, depth_frame)
+            else:
+                rgb_results = self._track(self.rgb_model, rgb_frame, self.rgb_imgsz_controller)
+            if self.cascade is not None and self.cascade.decide(rgb_results) == RGB_ONLY:
+                depth_results = self._empty_depth_results(depth_frame)
+            else:
+                if depth_visual is None:
+                    depth_visual = self._preprocess_depth(depth_frame)
+                depth_results = self._track(self.depth_model, depth_visual, self.depth_imgsz_controller)
+        if self.motion_gate is not None:
+            self.motion_gate.record_inference((time.monotonic() - infer_start) * 1000)
+        if self.rgb_scheduler is not None:
+            self.rgb_scheduler.update(rgb_frame, rgb_results)
+        if self.depth_scheduler is not None:
+            self.depth_scheduler.update(depth_visual, depth_results)
+        self._last_results = (rgb_results, depth_results)
+        return self._last_results
+
+    def _empty_depth_results(self, depth_frame: np.ndarray) -> Any:
+        """跳过深度模型时的空结果，融合时只采用RGB的预测"""
+        empty = DetectionBoxes(np.empty((0, 4), np.float32), np.empty(0, np.float32), np.empty(0, np.float32))
+        # 结果会缓存在_last_results中，不能引用深度帧（可能是SDK内存的零拷贝视图），只保留尺寸
+        orig_img = np.empty(depth_frame.shape[:2] + (0,), depth_frame.dtype)
+        return [DetectionResult(orig_img, empty, (self.depth_model or self.rgb_model).names)]
+
+    @staticmethod
+    def _track(model, frame: np.ndarray, imgsz_controller) -> Any:
+        """运行单个模型；启用输入尺寸控制时按当前档位推理并记录耗时"""
+        if imgsz_controller is None:
+            return model.track(frame, persist=True)
+        start = time.monotonic()
+        results = model.track(frame, persist=True, imgsz=imgsz_controller.imgsz)
+        imgsz_controller.observe((time.monotonic() - start) * 1000)
+        return results
+
+    def _preprocess_depth(self, depth_frame: np.ndarray, reuse: bool = True) -> np.ndarray:
+        """
+        深度图伪彩色化（标定范围查表或逐帧归一化），作为深度模型的输入
+
+        reuse为True时写入复用的缓冲区；流水线模式下结果要传给下一阶段，需要独立的数组。
+        """
+        return self.depth_colorizer.colorize(depth_frame, reuse)
+
+    def _postprocess_dual(self, rgb_frame: np.ndarray, rgb_results, depth_results) -> Tuple[np.ndarray, Optional[str], float]:
+        """提取两个模型的预测、更新稳定计数、融合并绘制"""
         # RGB预测
-        rgb_results = self.rgb_model.track(rgb_frame, persist=True)
         rgb_class = None
         rgb_conf = 0.0
         
+        # 推算帧沿用上一次检测的类别，不计入稳定帧数
+        propagated = getattr(rgb_results[0], 'propagated', False)
+        
         if len(rgb_results[0].boxes) > 0:
             rgb_box = rgb_results[0].boxes[0]
             rgb_class_id = int(rgb_box.cls[0].item())
-            rgb_class = self.rgb_model.names[rgb_class_id]
+            rgb_class = rgb_results[0].names[rgb_class_id]
             rgb_conf = float(rgb_box.conf[0].item())
             
-            if rgb_class == self.previous_rgb_class:
-                self.rgb_stable_count += 1
-            else:
-                self.rgb_stable_count = 0
+            if not propagated:
+                if rgb_class == self.previous_rgb_class:
+                    self.rgb_stable_count += 1
+                else:
+                    self.rgb_stable_count = 0
             self.previous_rgb_class = rgb_class
 
-        # 深度图预处理和预测
-        depth_visual = cv2.normalize(depth_frame, None, 0, 255, cv2.NORM_MINMAX)
-        depth_visual = cv2.applyColorMap(depth_visual.astype(np.uint8), cv2.COLORMAP_JET)
-        
-        depth_results = self.depth_model.track(depth_visual, persist=True)
+        # 深度预测
         depth_class = None
         depth_conf = 0.0
         
@@ -211,10 +567,11 @@ class DualModelTracker:
             depth_class = self.depth_model.names[depth_class_id]
             depth_conf = float(depth_box.conf[0].item())
             
-            if depth_class == self.previous_depth_class:
-                self.depth_stable_count += 1
-            else:
-                self.depth_stable_count = 0
+            if not propagated:
+                if depth_class == self.previous_depth_class:
+                    self.depth_stable_count += 1
+                else:
+                    self.depth_stable_count = 0
             self.previous_depth_class = depth_class
 
         # 决策融合
@@ -222,84 +579,187 @@ class DualModelTracker:
             rgb_class, rgb_conf, self.rgb_stable_count,
             depth_class, depth_conf, self.depth_stable_count
         )
+        if self.cascade is not None and not propagated:
+            self.cascade.record(final_class)
 
-        # 可视化
-        annotated_frame = rgb_frame.copy()
-        self._draw_predictions(annotated_frame, rgb_class, rgb_conf, 
-                             depth_class, depth_conf, 
-                             final_class, confidence)
-        
-        self.latest_tracked_frame = annotated_frame
+        # 可视化：只记录绘制所需的信息；MJPEG观看者通过get_latest_frame各自取绘制结果，这里只为本地窗口绘制
+        self.renderer.submit(rgb_frame, overlay=lambda image, scale: self._draw_predictions(
+            image, rgb_class, rgb_conf, depth_class, depth_conf, final_class, confidence, scale))
+        annotated_frame = self.renderer.render() if self.config['display_window'] else rgb_frame
         return annotated_frame, final_class, confidence
 
     def _fuse_predictions(self, rgb_class, rgb_conf, rgb_stable,
                          depth_class, depth_conf, depth_stable) -> Tuple[Optional[str], float]:
         """融合两个模型的预测结果"""
-        if rgb_class == depth_class and rgb_class is not None:
-            return rgb_class, max(rgb_conf, depth_conf)
-        
-        weights = self.config['fusion_weights']
-        rgb_score = rgb_conf * weights['rgb'] * (rgb_stable + 1)
-        depth_score = depth_conf * weights['depth'] * (depth_stable + 1)
-        
-        if rgb_score > depth_score and rgb_score > 0:
-            return rgb_class, rgb_conf
-        elif depth_score > rgb_score and depth_score > 0:
-            return depth_class, depth_conf
-        
-        return None, 0.0
+        return fuse_predictions(rgb_class, rgb_conf, rgb_stable, depth_class, depth_conf, depth_stable,
+                                self.config['fusion_weights'])
 
     def _draw_predictions(self, frame, rgb_class, rgb_conf,
                          depth_class, depth_conf,
-                         final_class, confidence):
-        """在图像上绘制预测结果"""
+                         final_class, confidence, scale: float = 1.0):
+        """在图像上绘制预测结果，scale为预览分辨率相对原图的比例"""
+        font_scale = max(scale, 0.4)
         if rgb_class:
-            cv2.putText(frame, f"RGB: {rgb_class} ({rgb_conf:.2f})",
-                       (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+            cv2.putText(frame, f"{'RGB-D' if self.early_fusion else 'RGB'}: {rgb_class} ({rgb_conf:.2f})",
+                       (10, int(30 * font_scale)), cv2.FONT_HERSHEY_SIMPLEX, font_scale, (0, 255, 0), 2)
         if depth_class:
             cv2.putText(frame, f"Depth: {depth_class} ({depth_conf:.2f})",
-                       (10, 70), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 2)
+                       (10, int(70 * font_scale)), cv2.FONT_HERSHEY_SIMPLEX, font_scale, (255, 0, 0), 2)
         if final_class:
             cv2.putText(frame, f"Final: {final_class} ({confidence:.2f})",
-                       (10, 110), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+                       (10, int(110 * font_scale)), cv2.FONT_HERSHEY_SIMPLEX, font_scale, (0, 0, 255), 2)
 
     def start_tracking(self):
         """开始追踪"""
-        if not self.open_device() or not self.start_streams():
+        if not self.open_device():
             self.logger.error("Failed to initialize device")
             return
-            
+        self.start_frame_mode_controller()
+        if not self.start_streams():
+            self.logger.error("Failed to initialize device")
+            return
+
+        self.warmup_models()
+        self.start_capture_worker()
+        self.start_supervisor()
+        if self.inference_server is not None:
+            self.inference_server.start()
         self.logger.info("Starting dual model tracking...")
         
         try:
+            if self.config['pipeline_mode']:
+                self.run_pipeline()
+                return
+
             while True:
-                rgb_frame, depth_frame = self.capture_frame()
-                if rgb_frame is None or depth_frame is None:
-                    continue
-                
-                tracked_frame, final_class, confidence = self.process_dual_frames(
-                    cv2.cvtColor(rgb_frame, cv2.COLOR_RGB2BGR),
-                    depth_frame
-                )
-                
-                if self.config['display_window']:
-                    cv2.imshow("Dual Model Tracking", tracked_frame)
-                    depth_display = ((depth_frame / 10000.) * 255).astype(np.uint8)
-                    depth_visual = cv2.applyColorMap(depth_display, cv2.COLORMAP_JET)
-                    cv2.imshow("Depth View", depth_visual)
-                
-                if final_class and confidence > self.config['confidence_threshold']:
-                    self.post_class_name(final_class)
-                
-                if cv2.waitKey(1) & 0xFF == ord('q'):
+                # 先检查设备再读帧：重连关闭旧设备时主循环不持有它的帧
+                if self.supervisor is not None and not self.supervisor.check():
+                    break
+                if not self._track_next_frame():
                     break
                     
         finally:
             self.cleanup()
 
-    def get_latest_frame(self) -> Any:
-        """获取最新处理后的帧"""
-        return self.latest_tracked_frame
+    def _track_next_frame(self) -> bool:
+        """捕获并处理一帧，返回False表示用户要求退出；帧的租约在返回时随局部变量释放"""
+        self._apply_pending_frame_modes()
+        rgb_frame, depth_frame = self.capture_frame()
+        if self.supervisor is not None and (rgb_frame is not None or depth_frame is not None):
+            self.supervisor.frame_received()
+        if rgb_frame is None or depth_frame is None:
+            return True
+        
+        tracked_frame, final_class, confidence = self.process_dual_frames(
+            self._convert_color(rgb_frame),
+            depth_frame
+        )
+        
+        if self.config['display_window']:
+            cv2.imshow("Dual Model Tracking", tracked_frame)
+            cv2.imshow("Depth View", self.display_colorizer.colorize(depth_frame))
+        
+        if final_class and confidence > self.config['confidence_threshold']:
+            self.post_class_name(final_class)
+        
+        return (cv2.waitKey(1) & 0xFF) != ord('q')
+
+    def _convert_color(self, rgb_frame: np.ndarray) -> np.ndarray:
+        """RGB转BGR；转换耗时随彩色流分辨率变化，作为采集侧开销交给帧模式控制器"""
+        convert_start = time.monotonic()
+        bgr = cv2.cvtColor(rgb_frame, cv2.COLOR_RGB2BGR)
+        if self.frame_mode_controller is not None:
+            frame_modes = self.frame_mode_controller.observe((time.monotonic() - convert_start) * 1000)
+            if frame_modes:
+                # 由读帧的线程在下一次读帧前重启数据流，此时不持有旧数据流的帧
+                self._pending_frame_modes = frame_modes
+        return bgr
+
+    def _apply_pending_frame_modes(self) -> None:
+        if self._pending_frame_modes is not None:
+            frame_modes, self._pending_frame_modes = self._pending_frame_modes, None
+            self.restart_streams(frame_modes)
+
+    def build_pipeline(self) -> Pipeline:
+        """把采集、预处理、双模型推理、融合、发布和显示组织成流水线，各阶段独立线程运行"""
+        queue_size = self.config['pipeline_queue_size']
+        policy = self.config['pipeline_queue_policy']
+
+        pipeline = Pipeline('DualModelTracker.pipeline')
+        pipeline.add_stage('capture', self._stage_capture)
+        pipeline.add_stage('preprocess', self._stage_preprocess, queue_size=queue_size, policy=policy)
+        pipeline.add_stage('infer', self._stage_infer, queue_size=queue_size, policy=policy)
+        pipeline.add_stage('postprocess', self._stage_postprocess, queue_size=queue_size, policy=policy)
+        pipeline.add_stage('publish', self._stage_publish, upstream='postprocess',
+                           queue_size=self.config['publish_queue_size'], policy=DROP_OLDEST)
+        if self.config['display_window']:
+            pipeline.add_stage('display', self._stage_display, upstream='postprocess', policy=LATEST_ONLY,
+                               main_thread=True)
+        return pipeline
+
+    def run_pipeline(self) -> None:
+        """以流水线方式运行，阻塞到按下q或Ctrl+C"""
+        self.pipeline = self.build_pipeline()
+        try:
+            self.pipeline.run()
+        finally:
+            self.logger.info(f"Pipeline stats: {self.pipeline.get_stats()}")
+            self.pipeline = None
+
+    def _stage_capture(self) -> Optional[Dict[str, Any]]:
+        self._apply_pending_frame_modes()
+
+        # 先检查设备再读帧：重连关闭旧设备时采集阶段不持有它的帧
+        if self.supervisor is not None and not self.supervisor.check():
+            raise StopPipeline()
+        rgb_frame, depth_frame = self.capture_frame()
+        if self.supervisor is not None and (rgb_frame is not None or depth_frame is not None):
+            self.supervisor.frame_received()
+        if rgb_frame is None or depth_frame is None:
+            return None
+
+        if self.capture_worker is not None:
+            # 环形缓冲区槽位在下一次read_latest后会被复用，进入流水线前拷贝一份
+            rgb_frame = rgb_frame.copy()
+            depth_frame = depth_frame.copy()
+        return {'rgb': rgb_frame, 'depth': depth_frame, 'capture_time': time.monotonic()}
+
+    def _stage_preprocess(self, packet: Dict[str, Any]) -> Dict[str, Any]:
+        packet['bgr'] = self._convert_color(packet['rgb'])
+        # 早期融合在推理阶段合成4通道输入，不需要伪彩色深度图
+        packet['depth_visual'] = None if self.early_fusion else self._preprocess_depth(packet['depth'], reuse=False)
+        return packet
+
+    def _stage_infer(self, packet: Dict[str, Any]) -> Dict[str, Any]:
+        packet['rgb_results'], packet['depth_results'] = self._run_models(
+            packet['bgr'], packet['depth'], packet['depth_visual'])
+        return packet
+
+    def _stage_postprocess(self, packet: Dict[str, Any]) -> Dict[str, Any]:
+        packet['tracked'], packet['class_name'], packet['confidence'] = self._postprocess_dual(
+            packet['bgr'], packet['rgb_results'], packet['depth_results'])
+        return packet
+
+    def _stage_publish(self, packet: Dict[str, Any]) -> None:
+        if packet['class_name'] and packet['confidence'] > self.config['confidence_threshold']:
+            self.post_class_name(packet['class_name'])
+
+    def _stage_display(self, packet: Dict[str, Any]) -> None:
+        cv2.imshow("Dual Model Tracking", packet['tracked'])
+        cv2.imshow("Depth View", self.display_colorizer.colorize(packet['depth']))
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            raise StopPipeline()
+
+    def get_latest_frame(self, out: Optional[np.ndarray] = None) -> Any:
+        """获取最新处理后的帧（调用方自己的副本，可传入上一次的返回值复用）"""
+        return self.renderer.render(out)
+
+    def add_viewer(self) -> None:
+        """登记一个观看者（如/mjpg_stream客户端），有观看者时才绘制识别结果"""
+        self.renderer.add_viewer()
+
+    def remove_viewer(self) -> None:
+        self.renderer.remove_viewer()
 
     def post_class_name(self, class_name: str) -> None:
         """发送识别结果到服务器"""
@@ -317,16 +777,91 @@ class DualModelTracker:
         except requests.exceptions.RequestException as e:
             self.logger.error(f"Error posting data: {e}")
 
-    def cleanup(self) -> None:
-        """清理资源"""
+    def start_supervisor(self) -> None:
+        """注册设备状态回调并启用停滞检测，掉线后自动重连"""
+        if not self.config['auto_reconnect'] or self.__context is None:
+            return
+        self.supervisor = DeviceSupervisor(
+            teardown=self.close_device,
+            reopen=self.reopen_device,
+            stall_timeout_ms=self.config['stall_timeout_ms'],
+            retry_interval_ms=self.config['reconnect_interval_ms'],
+            max_attempts=self.config['max_reconnect_attempts'])
+        self.supervisor.attach(self.__context, self.__deviceList[0].serialNumber)
+
+    def reopen_device(self) -> bool:
+        """重新打开设备、数据流和采集线程，两个模型和稳定性计数保持不变"""
+        if not self.open_device() or not self.start_streams():
+            return False
+        self.start_capture_worker()
+        self.supervisor.attach(self.__context, self.__deviceList[0].serialNumber)
+        return True
+
+    def close_device(self) -> None:
+        """停止采集并关闭设备"""
+        if self.capture_worker is not None:
+            self.capture_worker.stop()
+            self.logger.info(f"Capture stats: {self.capture_worker.get_stats()}")
+            self.capture_worker = None
+
+        if self.frame_synchronizer is not None:
+            self.logger.info(f"Frame sync stats: {self.frame_synchronizer.get_stats()}")
+            self.frame_synchronizer.clear()
+            self.frame_synchronizer = None
+
         if self.__device:
             self.__device.stopStream(
                 BerxelHawkStreamType.forward_dict['BERXEL_HAWK_COLOR_STREAM'] |
                 BerxelHawkStreamType.forward_dict['BERXEL_HAWK_DEPTH_STREAM']
             )
 
+        # 缓存的识别结果引用着零拷贝帧；销毁上下文前等待流水线等处仍持有的租约归还
+        self._last_results = None
+        if self.__device and not self.__device.drainLeases():
+            self.logger.warning(f"{self.__device.getOutstandingLeases()} frame leases still held at close, "
+                                f"invalidating them")
+
         if self.__context and self.__device:
             self.__context.clsoeDevice(self.__device)
+        if self.__context:
             self.__context.destroyCamera()
+        self.__device = None
+        self.__context = None
+
+    def cleanup(self) -> None:
+        """清理资源"""
+        if self.supervisor is not None:
+            self.supervisor.stop()
+            self.logger.info(f"Reconnect stats: {self.supervisor.get_stats()}")
+            self.supervisor = None
+
+        if self.frame_mode_controller is not None:
+            self.logger.info(f"Frame mode stats: {self.frame_mode_controller.get_stats()}")
+
+        if self.motion_gate is not None:
+            self.logger.info(f"Motion gate stats: {self.motion_gate.get_stats()}")
+
+        if self.two_stage is not None:
+            self.logger.info(f"Two-stage stats: {self.two_stage.get_stats()}")
+
+        if self.cascade is not None:
+            self.logger.info(f"Cascade stats: {self.cascade.get_stats()}")
+
+        for name, controller in (('rgb', self.rgb_imgsz_controller), ('depth', self.depth_imgsz_controller)):
+            if controller is not None:
+                self.logger.info(f"Imgsz controller stats ({name}): {controller.get_stats()}")
+
+        if self.rgb_scheduler is not None:
+            depth_stats = self.depth_scheduler.get_stats() if self.depth_scheduler is not None else None
+            self.logger.info(f"Detection scheduler stats: rgb {self.rgb_scheduler.get_stats()}, "
+                             f"depth {depth_stats}")
+
+        if self.inference_server is not None:
+            self.inference_server.stop()
+            self.logger.info(f"Inference server stats: {self.inference_server.get_stats()}")
+
+        self.logger.info(f"Model registry stats: {get_model_registry().get_stats()}")
+        self.logger.info(f"Renderer stats: {self.renderer.get_stats()}")
 
+        self.close_device()
         cv2.destroyAllWindows()
\ No newline at end of file
@@ -0,0 +1,309 @@
+import threading
+import time
+import logging
+from typing import Optional, Tuple, Dict, Any
+
+import numpy as np
+
+from src.core.frame_sync import FrameSynchronizer, COLOR, DEPTH
+
+
+class FrameRingBuffer:
+    """
+    预分配的RGB/深度帧环形缓冲区
+
+    采集线程把每一对SDK帧拷贝进N个预分配槽位之一，推理循环总是取最新的完整帧对。
+    读者同一时间只持有一个槽位，写者会跳过该槽位和最新槽位，因此槽位数至少为3。
+    """
+
+    def __init__(self, num_slots: int = 4):
+        self.num_slots = max(int(num_slots), 3)
+
+        self._color = None  # (N, H, W, 3) uint8
+        self._depth = None  # (N, H, W) uint16
+        self._color_timestamp = np.zeros(self.num_slots, dtype=np.uint64)
+        self._depth_timestamp = np.zeros(self.num_slots, dtype=np.uint64)
+        self._seq = np.zeros(self.num_slots, dtype=np.int64)
+        self._commit_time = np.zeros(self.num_slots, dtype=np.float64)
+
+        self._lock = threading.Lock()
+        self._new_pair = threading.Condition(self._lock)
+        self._next_slot = 0
+        self._latest = -1
+        self._reading = -1
+        self._writing = -1
+        self._write_seq = 0
+        self._read_seq = 0
+
+        # 统计计数
+        self.frames_written = 0
+        self.frames_read = 0
+        self.frames_dropped = 0
+
+    def _ensure_storage(self, color_shape: Optional[Tuple[int, ...]],
+                        depth_shape: Optional[Tuple[int, ...]]) -> None:
+        """按帧尺寸分配槽位存储，尺寸变化时重新分配"""
+        if color_shape is not None and (self._color is None or self._color.shape[1:] != color_shape):
+            self._color = np.empty((self.num_slots,) + tuple(color_shape), dtype=np.uint8)
+        if depth_shape is not None and (self._depth is None or self._depth.shape[1:] != depth_shape):
+            self._depth = np.empty((self.num_slots,) + tuple(depth_shape), dtype=np.uint16)
+
+    def acquire_write_slot(self, color_shape: Optional[Tuple[int, ...]] = None,
+                           depth_shape: Optional[Tuple[int, ...]] = None) -> int:
+        """获取一个可写槽位（不会是读者正在使用的槽位，也不会是最新槽位）"""
+        with self._lock:
+            self._ensure_storage(color_shape, depth_shape)
+            if self._writing >= 0:
+                return self._writing
+
+            slot = self._next_slot
+            while slot == self._latest or slot == self._reading:
+                slot = (slot + 1) % self.num_slots
+            self._next_slot = (slot + 1) % self.num_slots
+            self._writing = slot
+            return slot
+
+    def color_slot(self, slot: int) -> Optional[np.ndarray]:
+        return None if self._color is None else self._color[slot]
+
+    def depth_slot(self, slot: int) -> Optional[np.ndarray]:
+        return None if self._depth is None else self._depth[slot]
+
+    def commit(self, slot: int, color_timestamp: int = 0, depth_timestamp: int = 0) -> None:
+        """发布一个写完的槽位，未被读取就被覆盖的旧帧计入丢帧"""
+        with self._new_pair:
+            if self._latest >= 0 and self._seq[self._latest] > self._read_seq:
+                self.frames_dropped += 1
+
+            self._write_seq += 1
+            self._seq[slot] = self._write_seq
+            self._color_timestamp[slot] = color_timestamp
+            self._depth_timestamp[slot] = depth_timestamp
+            self._commit_time[slot] = time.monotonic()
+            self._latest = slot
+            self._writing = -1
+            self.frames_written += 1
+            self._new_pair.notify_all()
+
+    def peek_latest(self) -> Optional[Tuple[int, float]]:
+        """不消费地查看是否有未读的新帧对，有则返回(seq, 发布时刻time.monotonic())"""
+        with self._lock:
+            if self._latest < 0 or self._seq[self._latest] <= self._read_seq:
+                return None
+            return int(self._seq[self._latest]), float(self._commit_time[self._latest])
+
+    def read_latest(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        取最新的完整帧对
+
+        返回的数组是槽位视图，在下一次调用read_latest之前有效。超时返回None。
+        """
+        with self._new_pair:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while self._latest < 0 or self._seq[self._latest] <= self._read_seq:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._new_pair.wait(remaining)
+
+            slot = self._latest
+            self._reading = slot
+            self._read_seq = int(self._seq[slot])
+            self.frames_read += 1
+
+            return {
+                'color': self.color_slot(slot),
+                'depth': self.depth_slot(slot),
+                'color_timestamp': int(self._color_timestamp[slot]),
+                'depth_timestamp': int(self._depth_timestamp[slot]),
+                'seq': self._read_seq,
+                'commit_time': float(self._commit_time[slot]),
+            }
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'slots': self.num_slots,
+                'frames_written': self.frames_written,
+                'frames_read': self.frames_read,
+                'frames_dropped': self.frames_dropped,
+            }
+
+
+class CaptureWorker:
+    """
+    独立采集线程
+
+    以传感器速率从Berxel设备读取彩色/深度帧，在releaseFrame之前拷贝进FrameRingBuffer，
+    推理循环通过read_latest()拿到最新的完整帧对，推理耗时不再阻塞相机。
+    """
+
+    def __init__(self, device,
+                 rgb_enabled: bool = True,
+                 depth_enabled: bool = True,
+                 num_slots: int = 4,
+                 read_timeout_ms: int = 30,
+                 sync_tolerance: Optional[int] = None,
+                 sync_queue_size: int = 4):
+        """
+        Args:
+            device: 已启动数据流的BerxelHawkDevice
+            num_slots: 环形缓冲区槽位数
+            read_timeout_ms: 单次读帧超时
+            sync_tolerance: 不为None时按SDK时间戳配对彩色/深度帧（需同时启用两路流）
+            sync_queue_size: 时间戳配对时每路等待队列长度
+        """
+        self.device = device
+        self.rgb_enabled = rgb_enabled
+        self.depth_enabled = depth_enabled
+        self.read_timeout_ms = read_timeout_ms
+        self.ring_buffer = FrameRingBuffer(num_slots)
+        self.logger = logging.getLogger('CaptureWorker')
+
+        self.synchronizer = None
+        if sync_tolerance is not None and rgb_enabled and depth_enabled:
+            self.synchronizer = FrameSynchronizer(sync_tolerance, sync_queue_size,
+                                                  on_drop=self.device.releaseFrame)
+
+        self._thread = None
+        self._stop_event = threading.Event()
+
+        # 单路流在配对前被同一路新帧覆盖的次数
+        self.color_overwritten = 0
+        self.depth_overwritten = 0
+        self.read_timeouts = 0
+        self.last_frame_time = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='CaptureWorker', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 1.0) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _copy_color(self, hawk_frame) -> int:
+        """把彩色帧拷贝进槽位，返回帧时间戳"""
+        shape = (hawk_frame.getHeight(), hawk_frame.getWidth(), 3)
+        src = np.ndarray(shape=shape, dtype=np.uint8, buffer=hawk_frame.getDataAsUint8())
+        slot = self.ring_buffer.acquire_write_slot(color_shape=shape)
+        np.copyto(self.ring_buffer.color_slot(slot), src)
+        return hawk_frame.getTimeStamp()
+
+    def _copy_depth(self, hawk_frame) -> int:
+        """把深度帧拷贝进槽位，返回帧时间戳"""
+        shape = (hawk_frame.getHeight(), hawk_frame.getWidth())
+        src = np.ndarray(shape=shape, dtype=np.uint16, buffer=hawk_frame.getDataAsUint16())
+        slot = self.ring_buffer.acquire_write_slot(depth_shape=shape)
+        np.copyto(self.ring_buffer.depth_slot(slot), src)
+        return hawk_frame.getTimeStamp()
+
+    def _run(self) -> None:
+        if self.synchronizer is not None:
+            self._run_synced()
+        else:
+            self._run_unsynced()
+
+    def _run_synced(self) -> None:
+        """按时间戳配对后再拷贝进环形缓冲区，未配上的帧由FrameSynchronizer释放"""
+        try:
+            while not self._stop_event.is_set():
+                got_frame = False
+                for stream, read in ((COLOR, self.device.readColorFrame),
+                                     (DEPTH, self.device.readDepthFrame)):
+                    hawk_frame = read(self.read_timeout_ms)
+                    if hawk_frame is None:
+                        continue
+                    got_frame = True
+                    pair = self.synchronizer.push(stream, hawk_frame,
+                                                  hawk_frame.getTimeStamp(), hawk_frame.getFrameIndex())
+                    if pair is not None:
+                        self._publish_pair(pair)
+
+                if not got_frame:
+                    self.read_timeouts += 1
+                else:
+                    self.last_frame_time = time.monotonic()
+        finally:
+            self.synchronizer.clear()
+
+    def _publish_pair(self, pair: Dict[str, Any]) -> None:
+        try:
+            color_ts = self._copy_color(pair['color'])
+            depth_ts = self._copy_depth(pair['depth'])
+        finally:
+            self.device.releaseFrame(pair['color'])
+            self.device.releaseFrame(pair['depth'])
+        slot = self.ring_buffer.acquire_write_slot()
+        self.ring_buffer.commit(slot, color_ts, depth_ts)
+
+    def _run_unsynced(self) -> None:
+        color_ts = None
+        depth_ts = None
+
+        while not self._stop_event.is_set():
+            got_frame = False
+
+            if self.rgb_enabled:
+                hawk_frame = self.device.readColorFrame(self.read_timeout_ms)
+                if hawk_frame is not None:
+                    try:
+                        if color_ts is not None:
+                            self.color_overwritten += 1
+                        color_ts = self._copy_color(hawk_frame)
+                        got_frame = True
+                    finally:
+                        self.device.releaseFrame(hawk_frame)
+
+            if self.depth_enabled:
+                hawk_frame = self.device.readDepthFrame(self.read_timeout_ms)
+                if hawk_frame is not None:
+                    try:
+                        if depth_ts is not None:
+                            self.depth_overwritten += 1
+                        depth_ts = self._copy_depth(hawk_frame)
+                        got_frame = True
+                    finally:
+                        self.device.releaseFrame(hawk_frame)
+
+            if not got_frame:
+                self.read_timeouts += 1
+                continue
+            self.last_frame_time = time.monotonic()
+
+            # 所有启用的流都到齐才发布
+            if (self.rgb_enabled and color_ts is None) or (self.depth_enabled and depth_ts is None):
+                continue
+
+            slot = self.ring_buffer.acquire_write_slot()
+            self.ring_buffer.commit(slot, color_ts or 0, depth_ts or 0)
+            color_ts = None
+            depth_ts = None
+
+    def read_latest(self, timeout: Optional[float] = None) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """返回最新的(rgb_frame, depth_frame)，与tracker.capture_frame()的返回格式一致"""
+        pair = self.ring_buffer.read_latest(timeout)
+        if pair is None:
+            return None, None
+        rgb_frame = pair['color'] if self.rgb_enabled else None
+        depth_frame = pair['depth'] if self.depth_enabled else None
+        return rgb_frame, depth_frame
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.ring_buffer.get_stats()
+        stats.update({
+            'color_overwritten': self.color_overwritten,
+            'depth_overwritten': self.depth_overwritten,
+            'read_timeouts': self.read_timeouts,
+        })
+        if self.synchronizer is not None:
+            stats['sync'] = self.synchronizer.get_stats()
+        return stats
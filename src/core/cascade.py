@@ -0,0 +1,87 @@
+from collections import Counter, deque
+from typing import Optional, Dict, Any
+
+from src.core.inference_backend import to_numpy
+
+
+# 每帧走的路径：RGB_ONLY 跳过深度模型，其余为运行深度模型的原因
+RGB_ONLY = 'rgb_only'
+NO_DETECTION = 'no_detection'
+LOW_CONFIDENCE = 'low_confidence'
+DISAGREEMENT = 'disagreement'
+REFRESH = 'refresh'
+PATHS = (RGB_ONLY, NO_DETECTION, LOW_CONFIDENCE, DISAGREEMENT, REFRESH)
+
+
+class CascadeGate:
+    """
+    级联双模型推理的门控
+
+    RGB模型先推理，结果可信时直接采用、跳过深度模型；以下情况才运行深度模型并融合：
+    RGB没有检测到目标、置信度低于confidence、与最近history帧融合结果的多数类别不一致，
+    或距上次运行深度模型已达refresh_interval帧（定期刷新）。
+    简单帧接近单模型的帧率，难以判断的帧仍有双模型融合。
+    """
+
+    def __init__(self, confidence: float = 0.6, history: int = 5, refresh_interval: int = 10):
+        """
+        Args:
+            confidence: RGB最高置信度低于该值时运行深度模型
+            history: 参与一致性判断的最近融合结果帧数
+            refresh_interval: 最多连续跳过深度模型的帧数
+        """
+        self.confidence = confidence
+        self.refresh_interval = max(int(refresh_interval), 1)
+        self._history = deque(maxlen=max(int(history), 1))
+        self._since_depth = 0
+
+        # 统计信息
+        self.frames = 0
+        self.paths = dict.fromkeys(PATHS, 0)
+        self.last_path = None
+
+    def decide(self, rgb_results) -> str:
+        """根据RGB结果决定本帧的路径，返回RGB_ONLY表示跳过深度模型"""
+        self.frames += 1
+        boxes = rgb_results[0].boxes
+        if len(boxes) == 0:
+            path = NO_DETECTION
+        else:
+            # 与融合时一致，取第一个框
+            conf = float(to_numpy(boxes.conf).ravel()[0])
+            rgb_class = rgb_results[0].names[int(to_numpy(boxes.cls).ravel()[0])]
+            if conf < self.confidence:
+                path = LOW_CONFIDENCE
+            elif self._history and Counter(self._history).most_common(1)[0][0] != rgb_class:
+                path = DISAGREEMENT
+            elif self._since_depth + 1 >= self.refresh_interval:
+                path = REFRESH
+            else:
+                path = RGB_ONLY
+
+        self._since_depth = self._since_depth + 1 if path == RGB_ONLY else 0
+        self.paths[path] += 1
+        self.last_path = path
+        return path
+
+    def record(self, final_class: Optional[str]) -> None:
+        """记录本帧的融合结果，作为后续帧的一致性参照"""
+        self._history.append(final_class)
+
+    def get_stats(self) -> Dict[str, Any]:
+        depth_runs = self.frames - self.paths[RGB_ONLY]
+        return {
+            'frames': self.frames,
+            'depth_runs': depth_runs,
+            'depth_ratio': depth_runs / self.frames if self.frames else 0.0,
+            'paths': {path: count for path, count in self.paths.items() if count},
+            'last_path': self.last_path,
+        }
+
+
+def create_cascade_gate(config: Dict[str, Any]) -> Optional[CascadeGate]:
+    """按追踪器配置创建级联门控，未启用时返回None（每帧都运行两个模型）"""
+    if not config['cascade_inference']:
+        return None
+    return CascadeGate(config['cascade_confidence'], config['cascade_history'],
+                       config['cascade_refresh_interval'])
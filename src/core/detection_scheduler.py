@@ -0,0 +1,246 @@
+import time
+from typing import Optional, Dict, Any, List, Tuple
+
+import cv2
+import numpy as np
+
+from src.core.inference_backend import DetectionBoxes, DetectionResult, to_numpy
+
+
+FLOW = 'flow'
+KALMAN = 'kalman'
+
+
+def _box_iou(a: np.ndarray, b: np.ndarray) -> float:
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(x2 - x1, 0) * max(y2 - y1, 0)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+class FlowPropagator:
+    """用稀疏光流（Lucas-Kanade）跟踪检测框内的角点，按角点位移的中位数平移、缩放检测框"""
+
+    needs_image = True
+
+    def __init__(self, max_points: int = 30, min_points: int = 4):
+        self.max_points = max_points
+        self.min_points = min_points
+        self._gray = None
+        self._points: List[Optional[np.ndarray]] = []
+
+    def reset(self, gray: np.ndarray, xyxy: np.ndarray) -> None:
+        """在检测器输出的每个框内重新提取角点"""
+        self._gray = gray
+        self._points = []
+        h, w = gray.shape[:2]
+        for x1, y1, x2, y2 in xyxy.astype(int):
+            x1, y1 = max(x1, 0), max(y1, 0)
+            x2, y2 = min(x2, w), min(y2, h)
+            points = None
+            if x2 - x1 > 2 and y2 - y1 > 2:
+                points = cv2.goodFeaturesToTrack(gray[y1:y2, x1:x2], self.max_points, 0.01, 3)
+            if points is not None:
+                points = points + np.array([x1, y1], dtype=np.float32)
+            self._points.append(points)
+
+    def propagate(self, gray: np.ndarray, xyxy: np.ndarray) -> Tuple[np.ndarray, bool]:
+        """返回推算后的检测框和是否有框跟丢（有效角点不足）"""
+        boxes = xyxy.copy()
+        lost = False
+        for i, points in enumerate(self._points):
+            if points is None or len(points) < self.min_points:
+                lost = True
+                continue
+            moved, status, _ = cv2.calcOpticalFlowPyrLK(self._gray, gray, points, None,
+                                                        winSize=(15, 15), maxLevel=2)
+            good = status.ravel() == 1
+            if np.count_nonzero(good) < self.min_points:
+                self._points[i] = None
+                lost = True
+                continue
+
+            old = points[good].reshape(-1, 2)
+            new = moved[good].reshape(-1, 2)
+            dx, dy = np.median(new - old, axis=0)
+            old_spread = np.median(np.linalg.norm(old - old.mean(axis=0), axis=1))
+            new_spread = np.median(np.linalg.norm(new - new.mean(axis=0), axis=1))
+            scale = float(np.clip(new_spread / old_spread, 0.8, 1.25)) if old_spread > 1 else 1.0
+
+            cx, cy = (boxes[i, 0] + boxes[i, 2]) / 2 + dx, (boxes[i, 1] + boxes[i, 3]) / 2 + dy
+            half_w, half_h = (boxes[i, 2] - boxes[i, 0]) * scale / 2, (boxes[i, 3] - boxes[i, 1]) * scale / 2
+            boxes[i] = (cx - half_w, cy - half_h, cx + half_w, cy + half_h)
+            self._points[i] = new.reshape(-1, 1, 2)
+
+        self._gray = gray
+        return boxes, lost
+
+
+class KalmanPropagator:
+    """
+    每个框一个匀速卡尔曼滤波器，状态为 (cx, cy, w, h, vx, vy)
+
+    不需要图像，开销最低；检测时按IoU把新框与已有滤波器匹配并校正，未匹配的框新建滤波器。
+    """
+
+    needs_image = False
+
+    def __init__(self, process_noise: float = 1e-2, measurement_noise: float = 1.0, match_iou: float = 0.3):
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.match_iou = match_iou
+        self._filters: List[cv2.KalmanFilter] = []
+
+    def _create_filter(self, measurement: np.ndarray) -> cv2.KalmanFilter:
+        kf = cv2.KalmanFilter(6, 4)
+        kf.transitionMatrix = np.eye(6, dtype=np.float32)
+        kf.transitionMatrix[0, 4] = 1.0
+        kf.transitionMatrix[1, 5] = 1.0
+        kf.measurementMatrix = np.eye(4, 6, dtype=np.float32)
+        kf.processNoiseCov = np.eye(6, dtype=np.float32) * self.process_noise
+        kf.measurementNoiseCov = np.eye(4, dtype=np.float32) * self.measurement_noise
+        kf.errorCovPost = np.eye(6, dtype=np.float32)
+        kf.statePost = np.array([*measurement, 0, 0], dtype=np.float32).reshape(6, 1)
+        return kf
+
+    @staticmethod
+    def _to_measurement(box: np.ndarray) -> np.ndarray:
+        return np.array([(box[0] + box[2]) / 2, (box[1] + box[3]) / 2,
+                         box[2] - box[0], box[3] - box[1]], dtype=np.float32)
+
+    @staticmethod
+    def _to_box(state: np.ndarray) -> np.ndarray:
+        cx, cy, w, h = state[:4].ravel()
+        return np.array([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], dtype=np.float32)
+
+    def reset(self, gray: Optional[np.ndarray], xyxy: np.ndarray) -> None:
+        previous = [(kf, self._to_box(kf.predict())) for kf in self._filters]
+        used = set()
+        filters = []
+        for box in xyxy:
+            measurement = self._to_measurement(box)
+            best, best_iou = None, self.match_iou
+            for index, (kf, predicted) in enumerate(previous):
+                iou = _box_iou(box, predicted)
+                if index not in used and iou >= best_iou:
+                    best, best_iou = index, iou
+            if best is None:
+                filters.append(self._create_filter(measurement))
+            else:
+                used.add(best)
+                kf = previous[best][0]
+                kf.correct(measurement.reshape(4, 1))
+                filters.append(kf)
+        self._filters = filters
+
+    def propagate(self, gray: Optional[np.ndarray], xyxy: np.ndarray) -> Tuple[np.ndarray, bool]:
+        if len(self._filters) != len(xyxy):
+            return xyxy, True
+        boxes = np.array([self._to_box(kf.predict()) for kf in self._filters], dtype=np.float32)
+        return boxes.reshape(-1, 4), False
+
+
+class DetectionScheduler:
+    """
+    检测/推算调度器
+
+    每detect_interval帧运行一次检测器，其间用光流或卡尔曼滤波推算检测框位置，
+    类别和置信度保持为上一次检测的结果。最高置信度低于redetect_confidence、
+    没有检测到目标或有框跟丢时，下一帧立即重新检测。
+    这样显示和跟踪保持相机帧率，检测器只在一部分帧上运行。
+    """
+
+    def __init__(self, detect_interval: int = 5, redetect_confidence: float = 0.5, method: str = FLOW):
+        """
+        Args:
+            detect_interval: 两次检测之间的最大帧数（含检测帧），1表示每帧检测
+            redetect_confidence: 最高置信度低于该值时每帧检测
+            method: 'flow' 稀疏光流 / 'kalman' 匀速卡尔曼滤波
+        """
+        if method == FLOW:
+            self.propagator = FlowPropagator()
+        elif method == KALMAN:
+            self.propagator = KalmanPropagator()
+        else:
+            raise ValueError(f"Unsupported box propagation method: {method}")
+        self.detect_interval = max(int(detect_interval), 1)
+        self.redetect_confidence = redetect_confidence
+        self.method = method
+
+        self._xyxy = None
+        self._conf = None
+        self._cls = None
+        self._names: Dict[int, str] = {}
+        self._since_detection = 0
+        self._force_detection = True
+
+        # 统计信息
+        self.detections = 0
+        self.propagations = 0
+        self.forced_detections = 0
+        self._propagate_time = 0.0
+
+    def _gray(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        if not self.propagator.needs_image:
+            return None
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+    def should_detect(self) -> bool:
+        """本帧是否需要运行检测器"""
+        if self._force_detection:
+            return True
+        return self._since_detection + 1 >= self.detect_interval
+
+    def update(self, frame: np.ndarray, results) -> None:
+        """检测器运行后调用，以检测结果重新初始化推算"""
+        boxes = results[0].boxes
+        self._xyxy = to_numpy(boxes.xyxy).reshape(-1, 4)
+        self._conf = to_numpy(boxes.conf).ravel()
+        self._cls = to_numpy(boxes.cls).ravel()
+        self._names = results[0].names
+        self._since_detection = 0
+        self.detections += 1
+
+        self._force_detection = len(self._conf) == 0 or float(self._conf.max()) < self.redetect_confidence
+        if self._force_detection:
+            self.forced_detections += 1
+            return
+        self.propagator.reset(self._gray(frame), self._xyxy)
+
+    def propagate(self, frame: np.ndarray) -> List[DetectionResult]:
+        """推算本帧的检测框，返回与检测器输出用法一致的结果"""
+        start = time.monotonic()
+        xyxy, lost = self.propagator.propagate(self._gray(frame), self._xyxy)
+        h, w = frame.shape[:2]
+        xyxy[:, [0, 2]] = np.clip(xyxy[:, [0, 2]], 0, w - 1)
+        xyxy[:, [1, 3]] = np.clip(xyxy[:, [1, 3]], 0, h - 1)
+        self._xyxy = xyxy
+        self._since_detection += 1
+        if lost:
+            self._force_detection = True
+            self.forced_detections += 1
+
+        self.propagations += 1
+        self._propagate_time += time.monotonic() - start
+        return [DetectionResult(frame, DetectionBoxes(xyxy.copy(), self._conf, self._cls),
+                                self._names, propagated=True)]
+
+    def get_stats(self) -> Dict[str, Any]:
+        frames = self.detections + self.propagations
+        return {
+            'method': self.method,
+            'detections': self.detections,
+            'propagations': self.propagations,
+            'forced_detections': self.forced_detections,
+            'detect_ratio': self.detections / frames if frames else 0.0,
+            'propagate_ms': self._propagate_time / self.propagations * 1000 if self.propagations else 0.0,
+        }
+
+
+def create_detection_scheduler(config: Dict[str, Any]) -> Optional[DetectionScheduler]:
+    """按追踪器配置创建检测调度器，detect_interval不大于1时返回None（每帧检测）"""
+    if config['detect_interval'] <= 1:
+        return None
+    return DetectionScheduler(config['detect_interval'], config['redetect_confidence'],
+                              config['box_propagation'])
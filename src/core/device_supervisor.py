@@ -0,0 +1,142 @@
+import threading
+import time
+import logging
+from typing import Optional, Callable, Dict, Any
+
+from src.devices.BerxelSdkDriver.BerxelHawkDefines import BerxelHawkDeviceStatus
+
+
+DEVICE_CONNECT = BerxelHawkDeviceStatus.forward_dict['BERXEL_HAWK_DEVICE_CONNECT']
+DEVICE_DISCONNECT = BerxelHawkDeviceStatus.forward_dict['BERXEL_HAWK_DEVICE_DISCONNECT']
+
+
+class DeviceSupervisor:
+    """
+    设备掉线自动恢复
+
+    订阅SDK的设备状态回调，并检测出帧停滞（超过stall_timeout_ms没有新帧）。
+    出现断开事件或停滞时调用teardown关闭设备，然后按retry_interval_ms重试reopen，
+    设备重新接入的回调会提前唤醒重试。模型和跟踪状态由调用方保留，不受影响。
+    """
+
+    def __init__(self,
+                 teardown: Callable[[], None],
+                 reopen: Callable[[], bool],
+                 stall_timeout_ms: int = 2000,
+                 retry_interval_ms: int = 500,
+                 max_attempts: int = 0):
+        """
+        Args:
+            teardown: 停止采集、关闭数据流和设备
+            reopen: 重新打开设备、数据流和采集，成功返回True
+            stall_timeout_ms: 多久没有新帧视为停滞
+            retry_interval_ms: 重连重试间隔
+            max_attempts: 单次恢复的最大重试次数，0表示一直重试
+        """
+        self.teardown = teardown
+        self.reopen = reopen
+        self.stall_timeout = stall_timeout_ms / 1000.
+        self.retry_interval = retry_interval_ms / 1000.
+        self.max_attempts = max_attempts
+        self.logger = logging.getLogger('DeviceSupervisor')
+
+        self.serial_number = None
+        self._disconnected = threading.Event()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._last_frame_time = time.monotonic()
+
+        # 统计信息
+        self.reconnect_count = 0
+        self.failed_attempts = 0
+        self.disconnect_events = 0
+        self.stall_count = 0
+        self.total_downtime = 0.0
+        self.last_downtime = 0.0
+
+    def attach(self, context, serial_number: Optional[bytes] = None) -> None:
+        """在相机上下文上注册设备状态回调，只关注serial_number对应的设备"""
+        self.serial_number = serial_number
+        context.setDeviceStausCallBack(self.on_device_status, None)
+        self._last_frame_time = time.monotonic()
+
+    def on_device_status(self, deviceUri, serialNumber, deviceState, userData) -> None:
+        """SDK回调线程中调用，只记录状态，恢复动作在主循环的check()中执行"""
+        if self.serial_number and serialNumber and serialNumber != self.serial_number:
+            return
+        if deviceState == DEVICE_DISCONNECT:
+            self.disconnect_events += 1
+            self._disconnected.set()
+            self.logger.warning(f"Device {serialNumber} disconnected")
+        elif deviceState == DEVICE_CONNECT:
+            self.logger.info(f"Device {serialNumber} connected")
+            self._wake.set()
+
+    def frame_received(self) -> None:
+        self._last_frame_time = time.monotonic()
+
+    def is_stalled(self) -> bool:
+        return time.monotonic() - self._last_frame_time > self.stall_timeout
+
+    def check(self) -> bool:
+        """
+        在主循环中每轮调用：设备断开或停滞时执行恢复
+
+        返回False表示恢复失败（达到最大重试次数或已stop），调用方应退出主循环。
+        """
+        if self._stopped:
+            return False
+        if self._disconnected.is_set():
+            return self.recover('disconnected')
+        if self.is_stalled():
+            self.stall_count += 1
+            return self.recover('stalled')
+        return True
+
+    def recover(self, reason: str) -> bool:
+        """关闭设备并重试打开，直到成功或放弃"""
+        down_since = self._last_frame_time
+        self.logger.warning(f"Recovering device ({reason}), no frames for "
+                            f"{(time.monotonic() - down_since) * 1000:.0f} ms")
+        self.teardown()
+
+        attempt = 0
+        while not self._stopped and (self.max_attempts <= 0 or attempt < self.max_attempts):
+            attempt += 1
+            # 停滞时先立即重试一次；断开时等设备重新接入或重试间隔
+            if attempt > 1 or reason == 'disconnected':
+                self._wake.wait(self.retry_interval)
+            self._wake.clear()
+            if self._stopped:
+                break
+
+            self._disconnected.clear()
+            if self.reopen():
+                self.last_downtime = time.monotonic() - down_since
+                self.total_downtime += self.last_downtime
+                self.reconnect_count += 1
+                self._last_frame_time = time.monotonic()
+                self.logger.info(f"Device recovered after {attempt} attempt(s), "
+                                 f"downtime {self.last_downtime * 1000:.0f} ms")
+                return True
+
+            self.failed_attempts += 1
+            self.teardown()
+
+        self.logger.error(f"Device recovery failed after {attempt} attempt(s)")
+        return False
+
+    def stop(self) -> None:
+        """中止正在进行的重试"""
+        self._stopped = True
+        self._wake.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'reconnect_count': self.reconnect_count,
+            'failed_attempts': self.failed_attempts,
+            'disconnect_events': self.disconnect_events,
+            'stall_count': self.stall_count,
+            'total_downtime': self.total_downtime,
+            'last_downtime': self.last_downtime,
+        }
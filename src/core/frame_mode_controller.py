@@ -0,0 +1,189 @@
+import time
+import logging
+from typing import Optional, Dict, List, Sequence
+
+from src.devices.BerxelSdkDriver.BerxelHawkDefines import BerxelHawkStreamFrameMode
+
+
+def _copy_mode(mode) -> BerxelHawkStreamFrameMode:
+    """getSupportFrameModes返回的结构体指向SDK内存，这里复制一份"""
+    return BerxelHawkStreamFrameMode(mode.pixelFormat, mode.resolutionX, mode.resolutionY, mode.framerate)
+
+
+def _mode_cost(mode) -> int:
+    """帧模式的传输/转换开销：每秒像素数"""
+    return mode.resolutionX * mode.resolutionY * max(mode.framerate, 1)
+
+
+def format_mode(mode) -> str:
+    return f"{mode.resolutionX}x{mode.resolutionY}@{mode.framerate}"
+
+
+class FrameModeController:
+    """
+    按延迟预算和采集侧开销自适应选择数据流帧模式
+
+    主数据流（通常为彩色流）的支持模式按开销从低到高排成阶梯，低于min_width（检测器输入尺寸）
+    的模式不参与选择。初始选择帧率不低于预算对应帧率(1000/latency_budget_ms)的最便宜模式。
+    运行中只按采集侧开销（每帧转换/拷贝耗时）的EWMA调整，不看推理耗时：检测器把所有模式
+    letterbox到同一输入尺寸，降低传感器分辨率几乎不减少推理时间（推理超预算由imgsz控制器处理）。
+    采集开销持续超出capture_budget_ms降一档，远低于预算(step_up_ratio)时升一档、最多回到初始档，
+    两次切换之间至少间隔cooldown秒。其余数据流跟随主数据流选择最接近的模式。
+    """
+
+    def __init__(self, device,
+                 primary_stream: int,
+                 secondary_streams: Sequence[int] = (),
+                 latency_budget_ms: float = 50.0,
+                 capture_budget_ms: float = 5.0,
+                 min_width: int = 0,
+                 window: int = 30,
+                 step_up_ratio: float = 0.6,
+                 cooldown: float = 5.0,
+                 ewma_alpha: float = 0.1):
+        """
+        Args:
+            device: 已打开的BerxelHawkDevice（数据流启动前）
+            primary_stream: 决定阶梯的数据流类型
+            secondary_streams: 跟随主数据流切换的其他数据流
+            latency_budget_ms: 每帧处理耗时预算，决定初始帧率
+            capture_budget_ms: 每帧采集侧开销（转换/拷贝）预算，超出时降档
+            min_width: 主数据流最小宽度，一般取检测器输入尺寸，低于它的模式不参与选择
+            window: 每观测多少帧评估一次
+            step_up_ratio: 耗时低于预算的该比例时升档
+            cooldown: 两次切换的最小间隔（秒）
+        """
+        self.primary_stream = primary_stream
+        self.secondary_streams = list(secondary_streams)
+        self.latency_budget_ms = latency_budget_ms
+        self.capture_budget_ms = capture_budget_ms
+        self.window = max(int(window), 1)
+        self.step_up_ratio = step_up_ratio
+        self.cooldown = cooldown
+        self.ewma_alpha = ewma_alpha
+        self.logger = logging.getLogger('FrameModeController')
+
+        self.ladder = self._build_ladder(device, primary_stream, min_width)
+        self._secondary_modes = {
+            stream: self._supported_modes(device, stream) for stream in self.secondary_streams
+        }
+
+        self.level = -1
+        self.initial_level = -1
+        self.capture_ewma = None
+        self._observed = 0
+        self._last_switch = 0.0
+
+        # 统计信息
+        self.step_ups = 0
+        self.step_downs = 0
+
+    @staticmethod
+    def _supported_modes(device, stream: int) -> List[BerxelHawkStreamFrameMode]:
+        """与当前模式像素格式相同的支持模式（不切换像素格式，避免解码路径变化）"""
+        current = device.getCurrentFrameMode(stream)
+        modes = [_copy_mode(mode) for mode in device.getSupportFrameModes(stream)]
+        if current is not None:
+            modes = [mode for mode in modes if mode.pixelFormat == current.pixelFormat] or modes
+        return modes
+
+    def _build_ladder(self, device, stream: int, min_width: int) -> List[BerxelHawkStreamFrameMode]:
+        modes = self._supported_modes(device, stream)
+        usable = [mode for mode in modes if mode.resolutionX >= min_width] or modes
+
+        ladder = []
+        seen = set()
+        for mode in sorted(usable, key=lambda m: (_mode_cost(m), m.resolutionX)):
+            key = (mode.resolutionX, mode.resolutionY, mode.framerate)
+            if key not in seen:
+                seen.add(key)
+                ladder.append(mode)
+        return ladder
+
+    def _match_secondary(self, stream: int, primary) -> Optional[BerxelHawkStreamFrameMode]:
+        """选择与主数据流分辨率最接近的模式，帧率尽量一致"""
+        modes = self._secondary_modes.get(stream) or []
+        if not modes:
+            return None
+        return min(modes, key=lambda m: (m.framerate != primary.framerate,
+                                         abs(m.resolutionX - primary.resolutionX),
+                                         abs(m.framerate - primary.framerate)))
+
+    def _modes_for_level(self, level: int) -> Dict[int, BerxelHawkStreamFrameMode]:
+        primary = self.ladder[level]
+        modes = {self.primary_stream: primary}
+        for stream in self.secondary_streams:
+            mode = self._match_secondary(stream, primary)
+            if mode is not None:
+                modes[stream] = mode
+        return modes
+
+    def select_initial(self) -> Dict[int, BerxelHawkStreamFrameMode]:
+        """选择满足预算帧率的最便宜模式，返回 {streamType: frameMode}"""
+        if not self.ladder:
+            return {}
+        target_fps = 1000.0 / self.latency_budget_ms if self.latency_budget_ms > 0 else 0
+        candidates = [i for i, mode in enumerate(self.ladder) if mode.framerate >= target_fps]
+        if candidates:
+            self.level = candidates[0]
+        else:
+            # 没有达到目标帧率的模式时取帧率最高者中最便宜的
+            best_fps = max(mode.framerate for mode in self.ladder)
+            self.level = next(i for i, mode in enumerate(self.ladder) if mode.framerate == best_fps)
+        self.initial_level = self.level
+        self._last_switch = time.monotonic()
+        self.logger.info(f"Initial frame mode {format_mode(self.ladder[self.level])} "
+                         f"({len(self.ladder)} candidates)")
+        return self._modes_for_level(self.level)
+
+    def observe(self, capture_ms: float) -> Optional[Dict[int, BerxelHawkStreamFrameMode]]:
+        """
+        记录一帧的采集侧开销（把SDK帧转换/拷贝成模型输入的耗时，不含推理）
+
+        需要切换时返回新的 {streamType: frameMode}，调用方负责重启数据流；否则返回None。
+        """
+        if self.level < 0:
+            return None
+
+        if self.capture_ewma is None:
+            self.capture_ewma = capture_ms
+        else:
+            self.capture_ewma += self.ewma_alpha * (capture_ms - self.capture_ewma)
+
+        self._observed += 1
+        if self._observed < self.window or time.monotonic() - self._last_switch < self.cooldown:
+            return None
+        self._observed = 0
+
+        level = self.level
+        if self.capture_ewma > self.capture_budget_ms and level > 0:
+            level -= 1
+            self.step_downs += 1
+        elif self.capture_ewma < self.capture_budget_ms * self.step_up_ratio and level < self.initial_level:
+            # 初始档已满足延迟预算，再往上只是检测器用不到的分辨率
+            level += 1
+            self.step_ups += 1
+        else:
+            return None
+
+        self.logger.info(f"Frame mode {format_mode(self.ladder[self.level])} -> "
+                         f"{format_mode(self.ladder[level])} (capture {self.capture_ewma:.1f} ms, "
+                         f"budget {self.capture_budget_ms:.1f} ms)")
+        self.level = level
+        self.capture_ewma = None
+        self._last_switch = time.monotonic()
+        return self._modes_for_level(level)
+
+    def current_modes(self) -> Dict[int, BerxelHawkStreamFrameMode]:
+        return self._modes_for_level(self.level) if self.level >= 0 else {}
+
+    def get_stats(self) -> Dict[str, object]:
+        return {
+            'mode': format_mode(self.ladder[self.level]) if self.level >= 0 else None,
+            'level': self.level,
+            'levels': len(self.ladder),
+            'initial_level': self.initial_level,
+            'capture_ewma_ms': self.capture_ewma,
+            'step_ups': self.step_ups,
+            'step_downs': self.step_downs,
+        }
@@ -0,0 +1,128 @@
+import time
+import threading
+from typing import Optional, Dict, Any, Callable
+
+import cv2
+import numpy as np
+
+from src.core.inference_backend import draw_detections
+
+
+class FrameRenderer:
+    """
+    按需绘制识别结果
+
+    追踪器每帧只调用submit()记下最新的帧和识别结果（不拷贝、不绘制）。只有存在观看者
+    （本地窗口或至少一个/mjpg_stream客户端）时，render()才把最新一帧绘制到复用的缓冲区，
+    可选缩小到预览分辨率；同一帧只绘制一次，多个观看者共用绘制结果。内部缓冲区只在锁内读写，
+    render()返回的是调用方自己的副本，编码慢的观看者不会看到被下一次绘制覆盖的撕裂画面。
+    无人观看的无头部署不在绘制上花任何CPU。
+
+    submit()之后调用方不能再修改该帧（各追踪器每帧都会生成新的BGR帧）。
+    """
+
+    def __init__(self, preview_width: int = 0):
+        """
+        Args:
+            preview_width: 绘制输出的宽度，0表示原分辨率
+        """
+        self.preview_width = max(int(preview_width), 0)
+        self._lock = threading.Lock()
+        self._viewers = 0
+
+        self._frame = None
+        self._results = None
+        self._overlay = None
+        self._version = 0
+        self._rendered_version = -1
+        self._buffer = None
+
+        # 统计信息
+        self.submitted = 0
+        self.rendered = 0
+        self._render_time = 0.0
+
+    @property
+    def active(self) -> bool:
+        """是否有观看者"""
+        return self._viewers > 0
+
+    def add_viewer(self) -> None:
+        with self._lock:
+            self._viewers += 1
+
+    def remove_viewer(self) -> None:
+        with self._lock:
+            self._viewers = max(self._viewers - 1, 0)
+
+    def submit(self, frame: np.ndarray, results=None,
+               overlay: Optional[Callable[[np.ndarray, float], None]] = None) -> None:
+        """
+        记录最新一帧
+
+        Args:
+            frame: BGR帧
+            results: 检测结果列表（model.predict/track的返回值），None表示不画检测框
+            overlay: 额外的绘制函数 overlay(image, scale)，如双模型的文字说明
+        """
+        with self._lock:
+            self._frame = frame
+            self._results = results
+            self._overlay = overlay
+            self._version += 1
+            self.submitted += 1
+
+    def render(self, out: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """
+        绘制最新一帧并拷贝一份返回；还没有帧时返回None
+
+        Args:
+            out: 调用方自己的输出数组（如上一次render()的返回值），形状匹配时直接写入，否则新建
+        """
+        with self._lock:
+            if self._frame is None:
+                return None
+            if self._rendered_version != self._version:
+                self._draw()
+
+            buffer = self._buffer
+            if out is None or out.shape != buffer.shape or out.dtype != buffer.dtype:
+                out = np.empty_like(buffer)
+            np.copyto(out, buffer)
+            return out
+
+    def _draw(self) -> None:
+        """把最新一帧绘制到内部缓冲区，调用方持有锁"""
+        start = time.monotonic()
+        frame = self._frame
+        height, width = frame.shape[:2]
+        scale = 1.0
+        if self.preview_width and self.preview_width < width:
+            scale = self.preview_width / width
+        size = (int(round(width * scale)), int(round(height * scale)))
+        shape = (size[1], size[0]) + frame.shape[2:]
+        buffer = self._buffer
+        if buffer is None or buffer.shape != shape or buffer.dtype != frame.dtype:
+            buffer = self._buffer = np.empty(shape, dtype=frame.dtype)
+
+        if scale == 1.0:
+            np.copyto(buffer, frame)
+        else:
+            cv2.resize(frame, size, dst=buffer, interpolation=cv2.INTER_AREA)
+        if self._results is not None:
+            draw_detections(buffer, self._results[0], scale)
+        if self._overlay is not None:
+            self._overlay(buffer, scale)
+
+        self._rendered_version = self._version
+        self.rendered += 1
+        self._render_time += time.monotonic() - start
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'viewers': self._viewers,
+            'submitted': self.submitted,
+            'rendered': self.rendered,
+            'render_ratio': self.rendered / self.submitted if self.submitted else 0.0,
+            'render_ms': self._render_time / self.rendered * 1000 if self.rendered else 0.0,
+        }
@@ -0,0 +1,147 @@
+import threading
+from collections import deque
+from typing import Optional, Callable, Any, Dict, Tuple
+
+
+COLOR = 'color'
+DEPTH = 'depth'
+
+
+class FrameSynchronizer:
+    """
+    按SDK时间戳配对彩色帧和深度帧
+
+    两路流各有一个有界等待队列。新帧到达时在另一路队列中找时间戳最接近的帧，
+    差值不超过tolerance即配对成功；比匹配帧更旧、已不可能再配对的帧作为孤帧丢弃，
+    并通过on_drop回调交还（例如释放SDK帧）。
+    """
+
+    def __init__(self,
+                 tolerance: int = 15000,
+                 max_queue: int = 4,
+                 on_drop: Optional[Callable[[Any], None]] = None):
+        """
+        Args:
+            tolerance: 允许的最大时间戳差（SDK时间戳单位，微秒）
+            max_queue: 每路等待队列的最大长度
+            on_drop: 孤帧被丢弃时的回调，参数为push时传入的payload
+        """
+        self.tolerance = tolerance
+        self.max_queue = max(int(max_queue), 1)
+        self.on_drop = on_drop
+
+        self._pending = {COLOR: deque(), DEPTH: deque()}
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.pairs_matched = 0
+        self.dropped = {COLOR: 0, DEPTH: 0}
+        self.last_skew = 0
+        self.max_skew = 0
+        self._skew_sum = 0
+
+    def _drop(self, stream: str, item: Tuple[int, int, Any]) -> None:
+        self.dropped[stream] += 1
+        if self.on_drop is not None:
+            self.on_drop(item[2])
+
+    def push(self, stream: str, payload: Any, timestamp: int,
+             frame_index: int = 0) -> Optional[Dict[str, Any]]:
+        """
+        放入一帧，若配对成功返回帧对字典，否则返回None
+
+        返回字典包含color/depth（payload）、color_timestamp/depth_timestamp、
+        color_index/depth_index以及skew（时间戳差的绝对值）。
+        """
+        other = DEPTH if stream == COLOR else COLOR
+        item = (int(timestamp), int(frame_index), payload)
+
+        with self._lock:
+            candidates = self._pending[other]
+
+            # 另一路中早于 timestamp - tolerance 的帧再也配不上，作为孤帧丢弃
+            while candidates and candidates[0][0] < item[0] - self.tolerance:
+                self._drop(other, candidates.popleft())
+
+            best = None
+            best_skew = None
+            for position, candidate in enumerate(candidates):
+                skew = abs(candidate[0] - item[0])
+                if best_skew is None or skew < best_skew:
+                    best, best_skew = position, skew
+
+            if best is None or best_skew > self.tolerance:
+                own = self._pending[stream]
+                own.append(item)
+                while len(own) > self.max_queue:
+                    self._drop(stream, own.popleft())
+                return None
+
+            for _ in range(best):
+                self._drop(other, candidates.popleft())
+            matched = candidates.popleft()
+
+            # 本路中更早的等待帧已被跳过
+            own = self._pending[stream]
+            while own and own[0][0] <= item[0]:
+                self._drop(stream, own.popleft())
+
+            self.pairs_matched += 1
+            self.last_skew = best_skew
+            self.max_skew = max(self.max_skew, best_skew)
+            self._skew_sum += best_skew
+
+        color, depth = (item, matched) if stream == COLOR else (matched, item)
+        return {
+            'color': color[2],
+            'depth': depth[2],
+            'color_timestamp': color[0],
+            'depth_timestamp': depth[0],
+            'color_index': color[1],
+            'depth_index': depth[1],
+            'skew': best_skew,
+        }
+
+    def push_color(self, payload: Any, timestamp: int, frame_index: int = 0) -> Optional[Dict[str, Any]]:
+        return self.push(COLOR, payload, timestamp, frame_index)
+
+    def push_depth(self, payload: Any, timestamp: int, frame_index: int = 0) -> Optional[Dict[str, Any]]:
+        return self.push(DEPTH, payload, timestamp, frame_index)
+
+    def clear(self) -> None:
+        """丢弃所有等待中的帧"""
+        with self._lock:
+            for stream, pending in self._pending.items():
+                while pending:
+                    self._drop(stream, pending.popleft())
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'pairs_matched': self.pairs_matched,
+                'color_dropped': self.dropped[COLOR],
+                'depth_dropped': self.dropped[DEPTH],
+                'last_skew': self.last_skew,
+                'max_skew': self.max_skew,
+                'mean_skew': self._skew_sum / self.pairs_matched if self.pairs_matched else 0.0,
+            }
+
+
+def read_synced_pair(device, synchronizer: FrameSynchronizer,
+                     timeout_ms: int = 30, max_reads: int = 8) -> Optional[Dict[str, Any]]:
+    """
+    交替读取彩色/深度帧直到配对成功
+
+    返回的帧对中color/depth为SDK帧，调用方负责releaseFrame。
+    synchronizer的on_drop应负责释放被丢弃的孤帧。
+    """
+    for _ in range(max_reads):
+        for stream, read in ((COLOR, device.readColorFrame), (DEPTH, device.readDepthFrame)):
+            hawk_frame = read(timeout_ms)
+            if hawk_frame is None:
+                continue
+            pair = synchronizer.push(stream, hawk_frame,
+                                     hawk_frame.getTimeStamp(), hawk_frame.getFrameIndex())
+            if pair is not None:
+                return pair
+    return None
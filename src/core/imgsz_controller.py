@@ -0,0 +1,121 @@
+import time
+import logging
+from collections import deque
+from typing import Optional, Dict, Any, Sequence
+
+import numpy as np
+
+
+class ImgszController:
+    """
+    按延迟预算在运行时调整推理输入尺寸
+
+    输入尺寸按从大到小排成阶梯（如 640/512/416/320），从最大一档开始。每帧记录推理耗时，
+    同时维护EWMA和最近window帧的p95：p95超过target_p95_ms时降一档；p95和EWMA都低于
+    目标的step_up_ratio时升一档。两个阈值之间留出的区间和切换后的冷却时间避免来回切换。
+    主机负载高时宁可损失一点精度也不落后于实时。
+    """
+
+    def __init__(self,
+                 ladder: Sequence[int] = (640, 512, 416, 320),
+                 target_p95_ms: float = 60.0,
+                 window: int = 30,
+                 step_up_ratio: float = 0.6,
+                 cooldown: float = 3.0,
+                 ewma_alpha: float = 0.1,
+                 name: str = 'model'):
+        """
+        Args:
+            ladder: 可选的输入尺寸，均应为32的倍数
+            target_p95_ms: 推理耗时p95的目标
+            window: 计算p95的帧数，切换后重新积累
+            step_up_ratio: p95和EWMA低于目标的该比例时升档
+            cooldown: 两次切换的最小间隔（秒）
+            name: 日志中区分模型（如rgb/depth）
+        """
+        ladder = sorted({int(size) for size in ladder}, reverse=True)
+        if not ladder:
+            raise ValueError("imgsz ladder must not be empty")
+        self.ladder = ladder
+        self.target_p95_ms = target_p95_ms
+        self.window = max(int(window), 2)
+        self.step_up_ratio = step_up_ratio
+        self.cooldown = cooldown
+        self.ewma_alpha = ewma_alpha
+        self.name = name
+        self.logger = logging.getLogger('ImgszController')
+
+        self.level = 0
+        self.latency_ewma = None
+        self._latencies = deque(maxlen=self.window)
+        self._last_switch = time.monotonic()
+
+        # 统计信息
+        self.step_ups = 0
+        self.step_downs = 0
+        self.frames_per_level = [0] * len(ladder)
+
+    @property
+    def imgsz(self) -> int:
+        """当前输入尺寸"""
+        return self.ladder[self.level]
+
+    def p95(self) -> Optional[float]:
+        return float(np.percentile(self._latencies, 95)) if self._latencies else None
+
+    def observe(self, latency_ms: float) -> Optional[int]:
+        """记录一次推理耗时，切换档位时返回新的输入尺寸，否则返回None"""
+        self.frames_per_level[self.level] += 1
+        if self.latency_ewma is None:
+            self.latency_ewma = latency_ms
+        else:
+            self.latency_ewma += self.ewma_alpha * (latency_ms - self.latency_ewma)
+        self._latencies.append(latency_ms)
+
+        if len(self._latencies) < self.window or time.monotonic() - self._last_switch < self.cooldown:
+            return None
+
+        p95 = self.p95()
+        level = self.level
+        if p95 > self.target_p95_ms and level < len(self.ladder) - 1:
+            level += 1
+            self.step_downs += 1
+        elif (p95 < self.target_p95_ms * self.step_up_ratio
+              and self.latency_ewma < self.target_p95_ms * self.step_up_ratio and level > 0):
+            level -= 1
+            self.step_ups += 1
+        else:
+            return None
+
+        self.logger.info(f"[{self.name}] imgsz {self.imgsz} -> {self.ladder[level]} "
+                         f"(p95 {p95:.1f} ms, ewma {self.latency_ewma:.1f} ms, target {self.target_p95_ms:.1f} ms)")
+        self.level = level
+        self.latency_ewma = None
+        self._latencies.clear()
+        self._last_switch = time.monotonic()
+        return self.imgsz
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'imgsz': self.imgsz,
+            'level': self.level,
+            'levels': len(self.ladder),
+            'latency_ewma_ms': self.latency_ewma,
+            'latency_p95_ms': self.p95(),
+            'step_ups': self.step_ups,
+            'step_downs': self.step_downs,
+            'frames_per_imgsz': dict(zip(self.ladder, self.frames_per_level)),
+        }
+
+
+def create_imgsz_controller(config: Dict[str, Any], backend, name: str = 'model') -> Optional[ImgszController]:
+    """按追踪器配置为一个推理后端创建输入尺寸控制器，未启用或后端输入尺寸固定时返回None"""
+    if not config['adaptive_imgsz'] or backend is None:
+        return None
+    if not backend.dynamic_imgsz:
+        logging.getLogger('ImgszController').warning(
+            f"[{name}] model input size is fixed, adaptive imgsz disabled "
+            f"(export the ONNX model with dynamic=True to enable it)")
+        return None
+    return ImgszController(config['imgsz_ladder'], config['imgsz_target_p95_ms'], config['imgsz_window'],
+                           config['imgsz_step_up_ratio'], config['imgsz_cooldown_s'], name=name)
@@ -0,0 +1,424 @@
+import ast
+import copy
+import logging
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple
+
+import cv2
+import numpy as np
+
+
+class DetectionBoxes:
+    """
+    与ultralytics Boxes用法一致的检测框集合
+
+    cls/conf/xyxy均为numpy数组，trackers中的 boxes.cls[0].item()、boxes[0].conf[0].item() 等写法可直接使用。
+    """
+
+    def __init__(self, xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+
+    def __len__(self) -> int:
+        return len(self.cls)
+
+    def __getitem__(self, index) -> 'DetectionBoxes':
+        if isinstance(index, (int, np.integer)):
+            index = slice(index, index + 1)
+        return DetectionBoxes(self.xyxy[index], self.conf[index], self.cls[index])
+
+
+class DetectionResult:
+    """
+    与ultralytics Results用法一致的单张图像检测结果（boxes / names / orig_img / plot）
+
+    propagated为True表示检测框由DetectionScheduler在两次检测之间推算得到，而非检测器输出。
+    """
+
+    def __init__(self, orig_img: np.ndarray, boxes: DetectionBoxes, names: Dict[int, str],
+                 propagated: bool = False):
+        self.orig_img = orig_img
+        self.boxes = boxes
+        self.names = names
+        self.propagated = propagated
+
+    def plot(self) -> np.ndarray:
+        """在原图副本上绘制检测框和类别"""
+        annotated = self.orig_img.copy()
+        draw_detections(annotated, self)
+        return annotated
+
+
+def to_numpy(values) -> np.ndarray:
+    """ultralytics的Boxes/Probs字段是torch张量，ONNX后端是numpy数组，统一转成float32 numpy"""
+    if hasattr(values, 'cpu'):
+        values = values.cpu().numpy()
+    return np.asarray(values, dtype=np.float32)
+
+
+def draw_detections(image: np.ndarray, result, scale: float = 1.0) -> np.ndarray:
+    """
+    在image上就地绘制检测框和类别
+
+    result为DetectionResult或ultralytics Results；scale为image相对原图的缩放比例（预览分辨率）。
+    """
+    boxes = result.boxes
+    if len(boxes) == 0:
+        return image
+    xyxy = (to_numpy(boxes.xyxy).reshape(-1, 4) * scale).astype(int)
+    font_scale = max(0.6 * scale, 0.4)
+    for (x1, y1, x2, y2), conf, cls in zip(xyxy, to_numpy(boxes.conf).ravel(), to_numpy(boxes.cls).ravel()):
+        color = _class_color(int(cls))
+        cv2.rectangle(image, (x1, y1), (x2, y2), color, 2)
+        label = f"{result.names.get(int(cls), int(cls))} {conf:.2f}"
+        cv2.putText(image, label, (x1, max(y1 - 5, 15)), cv2.FONT_HERSHEY_SIMPLEX, font_scale, color, 2)
+    return image
+
+
+def _class_color(class_id: int) -> Tuple[int, int, int]:
+    hue = (class_id * 47) % 180
+    color = cv2.cvtColor(np.uint8([[[hue, 200, 255]]]), cv2.COLOR_HSV2BGR)[0, 0]
+    return int(color[0]), int(color[1]), int(color[2])
+
+
+def letterbox_to_tensor(frame: np.ndarray, canvas: np.ndarray, out: np.ndarray) -> Tuple[float, int, int]:
+    """
+    YOLO输入预处理：等比缩放并居中填充到canvas尺寸，BGR转RGB、归一化到0~1后写入out
+
+    4通道RGB-D输入（B、G、R、深度）与ultralytics训练时一致，按原通道顺序写入。
+
+    Args:
+        frame: BGR图像（或BGR+深度的4通道图像）
+        canvas: (H, W, C) uint8 预分配画布
+        out: (C, H, W) float32 预分配输出
+    Returns:
+        (gain, pad_x, pad_y)，用于把检测框映射回原图
+    """
+    input_h, input_w = canvas.shape[:2]
+    height, width = frame.shape[:2]
+    gain = min(input_h / height, input_w / width)
+    new_w, new_h = int(round(width * gain)), int(round(height * gain))
+    pad_x, pad_y = (input_w - new_w) // 2, (input_h - new_h) // 2
+
+    canvas.fill(114)
+    canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(
+        frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    # HWC BGR -> CHW RGB, 0~1
+    channels = canvas.shape[2]
+    for channel in range(channels):
+        source = 2 - channel if channels == 3 else channel
+        np.multiply(canvas[:, :, source], 1 / 255.0, out=out[channel], casting='unsafe')
+    return gain, pad_x, pad_y
+
+
+class InferenceBackend:
+    """
+    推理后端接口
+
+    predict/track 接收BGR图像，返回只含一个元素的结果列表，元素提供 boxes(cls/conf/xyxy)、
+    names 和 plot()，与trackers当前使用的ultralytics结果结构一致。
+    """
+
+    names: Dict[int, str] = {}
+    # 输入通道数：3为BGR，4为早期融合的RGB-D
+    channels: int = 3
+    # 检测器输入边长，更高的传感器分辨率会被letterbox缩小
+    input_size: int = 640
+
+    def predict(self, frame: np.ndarray, **kwargs) -> List[Any]:
+        raise NotImplementedError
+
+    def track(self, frame: np.ndarray, persist: bool = True, **kwargs) -> List[Any]:
+        raise NotImplementedError
+
+    def predict_batch(self, frames: List[np.ndarray], **kwargs) -> List[Any]:
+        """
+        对多张图像推理，返回与frames一一对应的单图结果（不是列表）
+
+        默认逐张调用predict；支持批量输入的后端一次前向完成整批。
+        """
+        return [self.predict(frame, **kwargs)[0] for frame in frames]
+
+    @property
+    def dynamic_imgsz(self) -> bool:
+        """是否支持通过predict/track的imgsz参数逐帧改变输入尺寸"""
+        return False
+
+    def warmup(self, runs: int = 1, shape: Tuple[int, int] = (480, 640)) -> None:
+        """用实际输入尺寸 (H, W) 的空白图像跑几次推理，避免首帧承担延迟初始化开销"""
+        frame = np.zeros((shape[0], shape[1], self.channels), dtype=np.uint8)
+        for _ in range(runs):
+            self.predict(frame, verbose=False)
+
+    def fork(self) -> 'InferenceBackend':
+        """返回共享权重、但推理状态（跟踪器、缓冲区）独立的实例，供ModelRegistry分发给多个使用者"""
+        return self
+
+    def __call__(self, frame: np.ndarray, **kwargs) -> List[Any]:
+        return self.predict(frame, **kwargs)
+
+
+class UltralyticsBackend(InferenceBackend):
+    """基于ultralytics.YOLO的后端（.pt权重或ultralytics支持的任意导出格式）"""
+
+    def __init__(self, model_path: str):
+        from ultralytics import YOLO
+        self.model = YOLO(model_path)
+
+    @property
+    def names(self) -> Dict[int, str]:
+        return self.model.names
+
+    @property
+    def dynamic_imgsz(self) -> bool:
+        return True
+
+    @property
+    def channels(self) -> int:
+        # 训练时data.yaml的channels写入模型yaml；导出格式没有yaml，按3通道处理
+        model_yaml = getattr(self.model.model, 'yaml', None)
+        return int(model_yaml.get('channels', 3)) if isinstance(model_yaml, dict) else 3
+
+    @property
+    def input_size(self) -> int:
+        imgsz = self.model.overrides.get('imgsz') or 640
+        return max(imgsz) if isinstance(imgsz, (list, tuple)) else int(imgsz)
+
+    def predict(self, frame: np.ndarray, **kwargs) -> List[Any]:
+        return self.model.predict(frame, **kwargs)
+
+    def track(self, frame: np.ndarray, persist: bool = True, **kwargs) -> List[Any]:
+        return self.model.track(frame, persist=persist, **kwargs)
+
+    def predict_batch(self, frames: List[np.ndarray], **kwargs) -> List[Any]:
+        # ultralytics对图像列表做一次批量前向
+        return self.model.predict(list(frames), **kwargs)
+
+    def fork(self) -> 'UltralyticsBackend':
+        # 浅拷贝共享网络权重；predictor（含跟踪器状态）和回调列表各自独立，
+        # 避免不同数据流的track(persist=True)互相串扰
+        clone = UltralyticsBackend.__new__(UltralyticsBackend)
+        clone.model = copy.copy(self.model)
+        clone.model.predictor = None
+        clone.model.callbacks = {event: list(funcs) for event, funcs in self.model.callbacks.items()}
+        return clone
+
+
+class OnnxRuntimeBackend(InferenceBackend):
+    """
+    ONNX Runtime CPU后端，加载ModelTrainer.export_model('onnx')导出的YOLO模型
+
+    负责letterbox预处理、预分配的输入/输出缓冲区（IO binding）、线程数控制和NMS。
+    ONNX Runtime不带多目标跟踪，track()等同于predict()，trackers只使用类别和置信度。
+    """
+
+    def __init__(self, model_path: str,
+                 conf: float = 0.25,
+                 iou: float = 0.45,
+                 max_det: int = 100,
+                 intra_op_threads: int = 0,
+                 inter_op_threads: int = 1,
+                 imgsz: Optional[int] = None,
+                 providers: Optional[List[str]] = None):
+        """
+        Args:
+            model_path: .onnx模型路径
+            conf: 置信度阈值
+            iou: NMS的IoU阈值
+            max_det: 每张图最多保留的检测框数
+            intra_op_threads: 单个算子内部的线程数，0表示由ONNX Runtime决定
+            inter_op_threads: 算子之间并行的线程数
+            imgsz: 输入尺寸，模型输入为动态尺寸时使用，默认取导出时的imgsz；
+                   动态尺寸模型也可在predict时通过imgsz参数逐帧切换
+            providers: 执行提供者，默认 ['CPUExecutionProvider']
+        """
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("onnxruntime is required for the ONNX backend: pip install onnxruntime") from e
+
+        self.logger = logging.getLogger('OnnxRuntimeBackend')
+        self.conf = conf
+        self.iou = iou
+        self.max_det = max_det
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        self.session = ort.InferenceSession(str(model_path), options,
+                                            providers=providers or ['CPUExecutionProvider'])
+
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names = self._parse_names(metadata.get('names'))
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self._dynamic_input = not all(isinstance(dim, int) for dim in model_input.shape[2:])
+        self._dynamic_batch = not isinstance(model_input.shape[0], int)
+        self.channels = model_input.shape[1] if isinstance(model_input.shape[1], int) else 3
+        self._batch_input = None
+        self.output_name = self.session.get_outputs()[0].name
+        self._bind_buffers(*self._input_size(model_input.shape, metadata, imgsz))
+
+        self.logger.info(f"Loaded {model_path} ({self.input_w}x{self.input_h}, "
+                         f"{len(self.names)} classes, providers={self.session.get_providers()})")
+
+    def _bind_buffers(self, input_h: int, input_w: int) -> None:
+        """按输入尺寸分配letterbox画布、网络输入和输出，并建立IO binding"""
+        import onnxruntime as ort
+
+        self.input_h, self.input_w = input_h, input_w
+        # 预分配的letterbox画布和网络输入
+        self._canvas = np.full((input_h, input_w, self.channels), 114, dtype=np.uint8)
+        self._input = np.empty((1, self.channels, input_h, input_w), dtype=np.float32)
+
+        # IO binding：输入直接引用预分配数组，输出尺寸固定时也绑定到预分配数组
+        self._binding = self.session.io_binding()
+        self._input_value = ort.OrtValue.ortvalue_from_numpy(self._input)
+        self._binding.bind_ortvalue_input(self.input_name, self._input_value)
+
+        output_shape = self.session.get_outputs()[0].shape
+        self._output = None
+        if all(isinstance(dim, int) for dim in output_shape):
+            self._output = np.empty(output_shape, dtype=np.float32)
+            self._output_value = ort.OrtValue.ortvalue_from_numpy(self._output)
+            self._binding.bind_ortvalue_output(self.output_name, self._output_value)
+        else:
+            self._binding.bind_output(self.output_name, 'cpu')
+
+    @property
+    def dynamic_imgsz(self) -> bool:
+        return self._dynamic_input
+
+    @property
+    def input_size(self) -> int:
+        return max(self.input_h, self.input_w)
+
+    @staticmethod
+    def _parse_names(raw: Optional[str]) -> Dict[int, str]:
+        """ultralytics导出时把类别名以字典字面量写在元数据names中"""
+        if not raw:
+            return {}
+        try:
+            names = ast.literal_eval(raw)
+        except (ValueError, SyntaxError):
+            return {}
+        if isinstance(names, list):
+            names = dict(enumerate(names))
+        return {int(k): str(v) for k, v in names.items()}
+
+    @staticmethod
+    def _input_size(shape, metadata: Dict[str, str], imgsz: Optional[int]) -> Tuple[int, int]:
+        height, width = shape[2], shape[3]
+        if isinstance(height, int) and isinstance(width, int):
+            return height, width
+        if imgsz is None and metadata.get('imgsz'):
+            size = ast.literal_eval(metadata['imgsz'])
+            return (size[0], size[1]) if isinstance(size, (list, tuple)) else (size, size)
+        imgsz = imgsz or 640
+        return imgsz, imgsz
+
+    def _preprocess(self, frame: np.ndarray) -> Tuple[float, float, float]:
+        """letterbox到输入尺寸并写入预分配的输入数组，返回(gain, pad_x, pad_y)"""
+        return letterbox_to_tensor(frame, self._canvas, self._input[0])
+
+    def _postprocess(self, output: np.ndarray, frame: np.ndarray,
+                     gain: float, pad_x: float, pad_y: float) -> DetectionResult:
+        """解码 (1, 4+nc, N) 输出，按类别做NMS并映射回原图坐标"""
+        predictions = output[0].T  # (N, 4+nc)
+        scores = predictions[:, 4:]
+        class_ids = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(class_ids)), class_ids]
+
+        keep = confidences > self.conf
+        boxes = predictions[keep, :4]
+        confidences = confidences[keep]
+        class_ids = class_ids[keep]
+
+        if len(confidences):
+            # xywh -> 左上角xywh，按类别偏移后做一次NMS即为按类别NMS
+            offsets = class_ids[:, None].astype(np.float32) * 7680.0
+            nms_boxes = np.empty_like(boxes)
+            nms_boxes[:, :2] = boxes[:, :2] - boxes[:, 2:] / 2 + offsets
+            nms_boxes[:, 2:] = boxes[:, 2:]
+            indices = cv2.dnn.NMSBoxes(nms_boxes.tolist(), confidences.tolist(), self.conf, self.iou)
+            indices = np.asarray(indices, dtype=np.int64).reshape(-1)[:self.max_det]
+            boxes, confidences, class_ids = boxes[indices], confidences[indices], class_ids[indices]
+
+        xyxy = np.empty((len(boxes), 4), dtype=np.float32)
+        xyxy[:, 0] = (boxes[:, 0] - boxes[:, 2] / 2 - pad_x) / gain
+        xyxy[:, 1] = (boxes[:, 1] - boxes[:, 3] / 2 - pad_y) / gain
+        xyxy[:, 2] = (boxes[:, 0] + boxes[:, 2] / 2 - pad_x) / gain
+        xyxy[:, 3] = (boxes[:, 1] + boxes[:, 3] / 2 - pad_y) / gain
+        xyxy[:, [0, 2]] = np.clip(xyxy[:, [0, 2]], 0, frame.shape[1])
+        xyxy[:, [1, 3]] = np.clip(xyxy[:, [1, 3]], 0, frame.shape[0])
+
+        # 按置信度从高到低排列，boxes[0]为最可信的检测
+        order = np.argsort(-confidences)
+        return DetectionResult(frame, DetectionBoxes(xyxy[order], confidences[order].astype(np.float32),
+                                                     class_ids[order].astype(np.float32)), self.names)
+
+    def predict(self, frame: np.ndarray, **kwargs) -> List[DetectionResult]:
+        imgsz = kwargs.get('imgsz')
+        if imgsz and self._dynamic_input and (imgsz, imgsz) != (self.input_h, self.input_w):
+            self._bind_buffers(imgsz, imgsz)
+        gain, pad_x, pad_y = self._preprocess(frame)
+        self.session.run_with_iobinding(self._binding)
+        output = self._output if self._output is not None else self._binding.copy_outputs_to_cpu()[0]
+        return [self._postprocess(output, frame, gain, pad_x, pad_y)]
+
+    def track(self, frame: np.ndarray, persist: bool = True, **kwargs) -> List[DetectionResult]:
+        return self.predict(frame, **kwargs)
+
+    def predict_batch(self, frames: List[np.ndarray], **kwargs) -> List[DetectionResult]:
+        """导出时batch维为动态（dynamic=True）才能批量前向，否则逐张推理"""
+        if not self._dynamic_batch or len(frames) < 2:
+            return super().predict_batch(frames, **kwargs)
+
+        imgsz = kwargs.get('imgsz')
+        if imgsz and self._dynamic_input and (imgsz, imgsz) != (self.input_h, self.input_w):
+            self._bind_buffers(imgsz, imgsz)
+        count = len(frames)
+        # 批量输入数组按需增大，之后复用
+        if self._batch_input is None or len(self._batch_input) < count \
+                or self._batch_input.shape[2:] != (self.input_h, self.input_w):
+            self._batch_input = np.empty((count, self.channels, self.input_h, self.input_w), dtype=np.float32)
+
+        letterbox = [letterbox_to_tensor(frame, self._canvas, self._batch_input[i]) for i, frame in enumerate(frames)]
+        output = self.session.run([self.output_name], {self.input_name: self._batch_input[:count]})[0]
+        return [self._postprocess(output[i:i + 1], frame, *letterbox[i]) for i, frame in enumerate(frames)]
+
+    def fork(self) -> 'OnnxRuntimeBackend':
+        # InferenceSession可并发调用，共享会话，只为新实例分配自己的缓冲区和IO binding
+        clone = copy.copy(self)
+        clone._batch_input = None
+        clone._bind_buffers(self.input_h, self.input_w)
+        return clone
+
+
+def create_inference_backend(model_path: str, backend: str = 'ultralytics',
+                             options: Optional[Dict[str, Any]] = None) -> InferenceBackend:
+    """
+    创建推理后端
+
+    Args:
+        model_path: 模型路径；onnxruntime后端下若传入.pt路径，会改用同目录同名的.onnx文件
+        backend: ultralytics 或 onnxruntime
+        options: 传给后端的参数（conf/iou/max_det/intra_op_threads/inter_op_threads/imgsz ...）；
+                 int8为True时加载ModelTrainer.quantize_model()生成的<名称>_int8.onnx
+    """
+    options = dict(options or {})
+    if backend == 'ultralytics':
+        return UltralyticsBackend(str(model_path))
+    if backend == 'onnxruntime':
+        int8 = options.pop('int8', False)
+        onnx_path = Path(model_path)
+        if onnx_path.suffix != '.onnx':
+            onnx_path = onnx_path.with_suffix('.onnx')
+        if int8 and not onnx_path.stem.endswith('_int8'):
+            onnx_path = onnx_path.with_name(f"{onnx_path.stem}_int8.onnx")
+        return OnnxRuntimeBackend(str(onnx_path), **options)
+    raise ValueError(f"Unsupported inference backend: {backend}")
@@ -0,0 +1,186 @@
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from typing import Optional, Dict, Any, List
+
+import numpy as np
+
+
+class InferenceRequest:
+    """提交给InferenceServer的一张图像，推理完成后由服务线程填入结果"""
+
+    def __init__(self, frame: np.ndarray, stream: Any = None):
+        self.frame = frame
+        self.stream = stream
+        self.submit_time = time.monotonic()
+        self.results = None
+        self.error = None
+        self._done = threading.Event()
+
+    def _complete(self, results=None, error: Optional[BaseException] = None) -> None:
+        self.results = results
+        self.error = error
+        self._done.set()
+
+    def result(self, timeout: Optional[float] = None) -> List[Any]:
+        """等待推理完成，返回与model.predict()格式一致的单元素结果列表"""
+        if not self._done.wait(timeout):
+            raise TimeoutError("inference request timed out")
+        if self.error is not None:
+            raise self.error
+        return self.results
+
+
+class InferenceServer:
+    """
+    进程内的微批推理服务
+
+    多路数据流（多台相机，或同一权重的RGB和深度）各自submit()图像，服务线程收到第一张后
+    最多等待max_wait_ms，凑满max_batch张或超时即调用model.predict_batch()做一次批量前向，
+    再把结果按请求分发回各路。CPU上一次批量前向比N次单张推理更充分地利用SIMD和多线程。
+
+    服务只做无状态的predict：稳定性过滤、运动门控、检测调度等逐路状态仍由各路调用方维护，
+    不同数据流的跟踪状态不会混在一起。
+    """
+
+    def __init__(self, model, max_batch: int = 4, max_wait_ms: float = 5.0, name: str = 'model'):
+        """
+        Args:
+            model: 推理后端（InferenceBackend）
+            max_batch: 单批最多的图像数，通常等于数据流数
+            max_wait_ms: 收到一批中第一张图像后最多等待的时间
+            name: 日志中区分服务
+        """
+        self.model = model
+        self.max_batch = max(int(max_batch), 1)
+        self.max_wait = max(max_wait_ms, 0.0) / 1000.
+        self.name = name
+        self.logger = logging.getLogger('InferenceServer')
+
+        self._requests = queue.Queue()
+        self._thread = None
+        self._stop_event = threading.Event()
+
+        # 统计信息
+        self.requests = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.batch_sizes = [0] * self.max_batch
+        self._queue_wait = 0.0
+        self._batch_time = 0.0
+        self._latencies = deque(maxlen=200)
+        self._busy_time = 0.0
+        self._start_time = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._start_time = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name=f'InferenceServer-{self.name}', daemon=True)
+        self._thread.start()
+        self.logger.info(f"[{self.name}] started (max_batch={self.max_batch}, "
+                         f"max_wait={self.max_wait * 1000:.1f} ms)")
+
+    def stop(self, timeout: float = 1.0) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        # 停止后仍在排队的请求以异常结束，避免调用方一直等待
+        while True:
+            try:
+                self._requests.get_nowait()._complete(error=RuntimeError("inference server stopped"))
+            except queue.Empty:
+                break
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def submit(self, frame: np.ndarray, stream: Any = None) -> InferenceRequest:
+        """提交一张BGR图像，立即返回请求，调用request.result()等待结果"""
+        request = InferenceRequest(frame, stream)
+        if not self.is_running():
+            request._complete(error=RuntimeError("inference server is not running"))
+            return request
+        self._requests.put(request)
+        return request
+
+    def infer(self, frame: np.ndarray, stream: Any = None, timeout: Optional[float] = None) -> List[Any]:
+        """提交并等待结果，可直接替换model.predict(frame)"""
+        return self.submit(frame, stream).result(timeout)
+
+    def _collect(self) -> List[InferenceRequest]:
+        """阻塞等待第一个请求，然后在等待窗口内尽量凑满一批"""
+        try:
+            batch = [self._requests.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        deadline = batch[0].submit_time + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._requests.get(timeout=remaining) if remaining > 0
+                             else self._requests.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+
+            start = time.monotonic()
+            try:
+                results = self.model.predict_batch([request.frame for request in batch], verbose=False)
+            except Exception as e:
+                self.failed_batches += 1
+                self.logger.error(f"[{self.name}] batch of {len(batch)} failed: {e}")
+                for request in batch:
+                    request._complete(error=e)
+                continue
+            end = time.monotonic()
+
+            for request, result in zip(batch, results):
+                self._queue_wait += start - request.submit_time
+                self._latencies.append((end - request.submit_time) * 1000)
+                request._complete([result])
+
+            self.requests += len(batch)
+            self.batches += 1
+            self.batch_sizes[len(batch) - 1] += 1
+            self._batch_time += end - start
+            self._busy_time += end - start
+
+    def get_stats(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self._start_time if self._start_time is not None else 0.0
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'failed_batches': self.failed_batches,
+            'mean_batch_size': self.requests / self.batches if self.batches else 0.0,
+            'batch_size_histogram': {size + 1: count for size, count in enumerate(self.batch_sizes) if count},
+            'queue_wait_ms': self._queue_wait / self.requests * 1000 if self.requests else 0.0,
+            'batch_ms': self._batch_time / self.batches * 1000 if self.batches else 0.0,
+            'latency_p95_ms': float(np.percentile(self._latencies, 95)) if self._latencies else None,
+            'throughput_fps': self.requests / elapsed if elapsed > 0 else 0.0,
+            'utilization': self._busy_time / elapsed if elapsed > 0 else 0.0,
+        }
+
+
+def create_inference_server(config: Dict[str, Any], model, streams: int,
+                            name: str = 'model') -> Optional[InferenceServer]:
+    """
+    按追踪器配置创建微批推理服务，未启用时返回None
+
+    Args:
+        streams: 共用该模型的数据流数，inference_batch_size为0时作为单批上限
+    """
+    if not config['inference_batching'] or model is None:
+        return None
+    max_batch = config['inference_batch_size'] or streams
+    return InferenceServer(model, max_batch, config['inference_batch_wait_ms'], name=name)
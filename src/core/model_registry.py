@@ -0,0 +1,137 @@
+import time
+import logging
+import threading
+import weakref
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple
+
+from src.core.inference_backend import InferenceBackend, create_inference_backend
+
+
+class ModelRegistry:
+    """
+    进程内的模型注册表
+
+    同一权重文件（相同后端和参数）只加载一次：第一个使用者拿到加载的实例，之后的使用者拿到
+    fork()出的实例——共享网络权重，跟踪器状态和输入缓冲区各自独立。这样多个追踪器、多路
+    相机或同一权重的RGB/深度模型不再重复占用权重内存。warmup()按实际输入尺寸预热各实例，
+    避免首帧承担延迟初始化开销；加载和预热耗时都记录在get_stats()中。
+    workers大于0时模型在ProcessPoolBackend的推理进程中加载，所有使用者共用同一个进程池。
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger('ModelRegistry')
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self._owners = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def _key(model_path: str, backend: str, options: Optional[Dict[str, Any]],
+             workers: int) -> Tuple[str, str, str, int]:
+        return str(Path(model_path).resolve()), backend, repr(sorted((options or {}).items())), workers
+
+    def acquire(self, model_path: str, backend: str = 'ultralytics',
+                options: Optional[Dict[str, Any]] = None,
+                workers: int = 0,
+                pool_options: Optional[Dict[str, Any]] = None) -> InferenceBackend:
+        """
+        获取模型实例，model_path/backend/options同create_inference_backend
+
+        Args:
+            workers: 大于0时在该数量的推理进程中运行模型（ProcessPoolBackend）
+            pool_options: 传给ProcessPoolBackend的其他参数（slots/max_frame_shape）
+        """
+        key = self._key(model_path, backend, options, workers)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                start = time.perf_counter()
+                if workers > 0:
+                    from src.core.process_pool import ProcessPoolBackend
+                    instance = ProcessPoolBackend(model_path, backend, options, workers, **(pool_options or {}))
+                else:
+                    instance = create_inference_backend(model_path, backend, options)
+                entry = {
+                    'path': str(model_path),
+                    'backend': backend if workers <= 0 else f"{backend} x{workers} processes",
+                    'model': instance,
+                    'load_ms': (time.perf_counter() - start) * 1000,
+                    'warmup_ms': 0.0,
+                    'instances': 0,
+                }
+                self._entries[key] = entry
+                self.logger.info(f"Loaded {model_path} ({backend}) in {entry['load_ms']:.0f} ms")
+            else:
+                instance = entry['model'].fork()
+                self.logger.info(f"Sharing weights of {model_path} ({backend}), "
+                                 f"{entry['instances'] + 1} instances")
+            entry['instances'] += 1
+            self._owners[instance] = entry
+        return instance
+
+    def warmup(self, model: InferenceBackend, shape: Tuple[int, int], runs: int = 2) -> float:
+        """
+        用 (H, W) 尺寸的空白帧运行runs次推理，返回耗时（毫秒）
+
+        每个实例各自预热：fork出的实例有独立的predictor，第一次推理同样需要初始化。
+        """
+        if runs <= 0:
+            return 0.0
+        start = time.perf_counter()
+        model.warmup(runs, shape)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        entry = self._owners.get(model)
+        with self._lock:
+            if entry is not None:
+                entry['warmup_ms'] += elapsed
+        name = entry['path'] if entry is not None else type(model).__name__
+        self.logger.info(f"Warmed up {name} on {shape[1]}x{shape[0]} x{runs} in {elapsed:.0f} ms")
+        return elapsed
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            stats = []
+            for entry in self._entries.values():
+                item = {k: v for k, v in entry.items() if k != 'model'}
+                if hasattr(entry['model'], 'get_stats'):
+                    item['pool'] = entry['model'].get_stats()
+                stats.append(item)
+            return stats
+
+    def clear(self) -> None:
+        """释放注册表对已加载模型的引用（已分发的实例不受影响）"""
+        with self._lock:
+            self._entries.clear()
+
+    def close(self) -> None:
+        """关闭进程池后端的推理进程并清空注册表"""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            if hasattr(entry['model'], 'close'):
+                entry['model'].close()
+
+
+_registry = ModelRegistry()
+
+
+def get_model_registry() -> ModelRegistry:
+    return _registry
+
+
+def load_model(model_path: str, backend: str = 'ultralytics',
+               options: Optional[Dict[str, Any]] = None,
+               workers: int = 0,
+               pool_options: Optional[Dict[str, Any]] = None) -> InferenceBackend:
+    """从进程内注册表获取模型，同一权重只加载一次"""
+    return _registry.acquire(model_path, backend, options, workers, pool_options)
+
+
+def load_tracker_model(model_path: str, config: Dict[str, Any]) -> InferenceBackend:
+    """按追踪器配置（inference_backend/onnx_runtime/inference_workers ...）获取模型"""
+    return load_model(model_path, config['inference_backend'], config['onnx_runtime'],
+                      config['inference_workers'],
+                      {'slots': config['inference_worker_slots'],
+                       'max_frame_shape': tuple(config['inference_worker_max_frame'])})
@@ -4,9 +4,13 @@ import yaml
 import os
 from pathlib import Path
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+import json
+import time
 import torch
 import sys
+import cv2
+import numpy as np
 from pathlib import Path
 
 ROOT_DIR = Path(__file__).resolve().parents[2]  # 获取项目根目录
@@ -62,7 +66,21 @@ class ModelTrainer:
             'batch_size': 8,
             'device': 'cuda' if torch.cuda.is_available() else 'cpu',
             'save_period': 10,
-            'workers': 4
+            'workers': 4,
+            'quant_calibration_images': 200,
+            'quant_calibration_split': 'train',
+            'quant_per_channel': True,
+            'quant_calibrate_method': 'minmax',
+            'quant_op_types': ['Conv', 'MatMul'],
+            'quant_latency_runs': 50,
+            'crop_model_path': 'yolo11n-cls.pt',
+            'crop_imgsz': 128,
+            'crop_padding': 0.15,
+            'crop_epochs': 30,
+            'crop_dataset_dir': None,
+            'depth_range': None,
+            'depth_colormap': 'jet',
+            'depth_calibration_percentiles': [1, 99]
         }
 
         if config_path and os.path.exists(config_path):
@@ -170,6 +188,544 @@ class ModelTrainer:
             self.logger.error(f"Error exporting model: {e}")
             raise
 
+    def _dataset_split_dir(self, split: str) -> Path:
+        """Resolve the image directory of a dataset split from data_yaml."""
+        data_yaml_path = Path(self.config['data_yaml'])
+        with open(data_yaml_path, 'r', encoding='utf-8') as f:
+            data_config = yaml.safe_load(f)
+
+        dataset_root = Path(data_config.get('path', data_yaml_path.parent))
+        if not dataset_root.is_absolute():
+            dataset_root = ROOT_DIR / dataset_root
+        # data.yaml uses 'val' while the directory is named 'valid'
+        split_dir = data_config.get(split, f'{split}/images')
+        return dataset_root / split_dir
+
+    def _sample_images(self, split: str, count: int, seed: int = 0) -> List[Path]:
+        """Draw a reproducible random subset of images from a dataset split."""
+        image_dir = self._dataset_split_dir(split)
+        images = sorted(p for p in image_dir.glob('*')
+                        if p.suffix.lower() in ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff'))
+        if not images:
+            raise FileNotFoundError(f"No images found in {image_dir}")
+        if count and len(images) > count:
+            rng = np.random.default_rng(seed)
+            images = [images[i] for i in sorted(rng.choice(len(images), count, replace=False))]
+        return images
+
+    def _export_fp32_onnx(self) -> Path:
+        """Export the current model to a static-shape FP32 ONNX file."""
+        if self.model is None:
+            raise ValueError("Model not initialized. Call initialize_model() first.")
+        onnx_path = self.model.export(format='onnx', imgsz=self.config['imgsz'], dynamic=False, simplify=True)
+        return Path(onnx_path)
+
+    def quantize_model(self, onnx_path: Optional[str] = None,
+                       output_path: Optional[str] = None,
+                       validate: bool = True) -> Dict[str, Any]:
+        """
+        Produce a static INT8 (QDQ) ONNX model calibrated on the collected dataset.
+
+        Calibration images are drawn from the split named by quant_calibration_split of the
+        dataset in data_yaml (dataset/rgb or dataset/depth). Only the op types listed in
+        quant_op_types are quantized, which keeps the detection head's decode ops in FP32.
+        When validate is set, FP32 and INT8 are evaluated on the val split and timed on CPU.
+
+        Args:
+            onnx_path: FP32 ONNX model; exported from the current model when omitted
+            output_path: INT8 model path, defaults to <fp32 stem>_int8.onnx
+            validate: Compare mAP and CPU latency of both models
+
+        Returns:
+            Report with model paths, mAP@0.5 / mAP@0.5:0.95 of both models, their delta and latency
+        """
+        try:
+            import onnxruntime as ort
+            from onnxruntime.quantization import (CalibrationDataReader, CalibrationMethod,
+                                                  QuantFormat, QuantType, quantize_static)
+            from onnxruntime.quantization.shape_inference import quant_pre_process
+        except ImportError as e:
+            raise ImportError("onnxruntime is required for quantization: pip install onnxruntime") from e
+
+        from src.core.inference_backend import OnnxRuntimeBackend, letterbox_to_tensor
+
+        fp32_path = Path(onnx_path) if onnx_path else self._export_fp32_onnx()
+        int8_path = Path(output_path) if output_path else fp32_path.with_name(f"{fp32_path.stem}_int8.onnx")
+
+        session = ort.InferenceSession(str(fp32_path), providers=['CPUExecutionProvider'])
+        model_input = session.get_inputs()[0]
+        input_h, input_w = model_input.shape[2], model_input.shape[3]
+        if not isinstance(input_h, int) or not isinstance(input_w, int):
+            input_h = input_w = self.config['imgsz']
+        # 3 for RGB, 4 for the early-fusion RGB-D model
+        channels = model_input.shape[1] if isinstance(model_input.shape[1], int) else 3
+        del session
+
+        calibration_images = self._sample_images(self.config['quant_calibration_split'],
+                                                 self.config['quant_calibration_images'])
+        self.logger.info(f"Calibrating on {len(calibration_images)} images "
+                         f"from the {self.config['quant_calibration_split']} split")
+
+        logger = self.logger
+
+        class _CalibrationReader(CalibrationDataReader):
+            """
+            Feeds letterboxed calibration images using the runtime preprocessing.
+
+            Images are read unchanged so the 4-channel TIFFs of the RGB-D dataset keep their
+            depth channel. Grey and BGRA images are converted for 3-channel models, other
+            images whose channel count does not match the model are skipped.
+            """
+
+            def __init__(self, images: List[Path]):
+                self.images = iter(images)
+                self.canvas = np.empty((input_h, input_w, channels), dtype=np.uint8)
+
+            def get_next(self):
+                for image_path in self.images:
+                    frame = cv2.imread(str(image_path), cv2.IMREAD_UNCHANGED)
+                    if frame is None or frame.dtype != np.uint8:
+                        continue
+                    if channels == 3 and frame.ndim == 2:
+                        frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+                    elif channels == 3 and frame.shape[2] == 4:
+                        frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+                    if frame.ndim != 3 or frame.shape[2] != channels:
+                        logger.warning(f"Skipping {image_path}: {frame.shape} does not match "
+                                       f"the {channels}-channel model input")
+                        continue
+                    tensor = np.empty((1, channels, input_h, input_w), dtype=np.float32)
+                    letterbox_to_tensor(frame, self.canvas, tensor[0])
+                    return {model_input.name: tensor}
+                return None
+
+        # Shape inference and graph cleanup recommended before static quantization
+        prepared_path = fp32_path.with_name(f"{fp32_path.stem}_prep.onnx")
+        try:
+            quant_pre_process(str(fp32_path), str(prepared_path))
+            source_path = prepared_path
+        except Exception as e:
+            self.logger.warning(f"Quantization pre-processing skipped: {e}")
+            source_path = fp32_path
+
+        calibrate_method = {
+            'minmax': CalibrationMethod.MinMax,
+            'entropy': CalibrationMethod.Entropy,
+            'percentile': CalibrationMethod.Percentile,
+        }[self.config['quant_calibrate_method']]
+
+        try:
+            self.logger.info(f"Quantizing {fp32_path} -> {int8_path}...")
+            quantize_static(
+                str(source_path), str(int8_path),
+                _CalibrationReader(calibration_images),
+                quant_format=QuantFormat.QDQ,
+                activation_type=QuantType.QUInt8,
+                weight_type=QuantType.QInt8,
+                per_channel=self.config['quant_per_channel'],
+                calibrate_method=calibrate_method,
+                op_types_to_quantize=self.config['quant_op_types'])
+        except Exception as e:
+            self.logger.error(f"Error quantizing model: {e}")
+            raise
+        finally:
+            if prepared_path.exists():
+                prepared_path.unlink()
+
+        # Keep the class names and imgsz metadata the runtime backends read
+        self._copy_onnx_metadata(fp32_path, int8_path)
+
+        report = {
+            'fp32_model': str(fp32_path),
+            'int8_model': str(int8_path),
+            'calibration_images': len(calibration_images),
+            'fp32_size_mb': fp32_path.stat().st_size / 1e6,
+            'int8_size_mb': int8_path.stat().st_size / 1e6,
+        }
+        if validate:
+            report.update(self._compare_quantized(fp32_path, int8_path, OnnxRuntimeBackend))
+
+        report_path = int8_path.with_suffix('.json')
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        self.logger.info(f"Quantization report saved to {report_path}")
+        return report
+
+    @staticmethod
+    def _copy_onnx_metadata(source: Path, target: Path) -> None:
+        import onnx
+        source_model = onnx.load(str(source), load_external_data=False)
+        target_model = onnx.load(str(target))
+        existing = {prop.key for prop in target_model.metadata_props}
+        for prop in source_model.metadata_props:
+            if prop.key not in existing:
+                target_model.metadata_props.add(key=prop.key, value=prop.value)
+        onnx.save(target_model, str(target))
+
+    def _measure_latency(self, backend, images: List[Path]) -> Dict[str, float]:
+        """CPU latency of one backend on val images, after a short warmup."""
+        frames = [frame for frame in (cv2.imread(str(p)) for p in images) if frame is not None]
+        backend.warmup(3)
+        timings = []
+        for i in range(self.config['quant_latency_runs']):
+            start = time.perf_counter()
+            backend.predict(frames[i % len(frames)])
+            timings.append((time.perf_counter() - start) * 1000)
+        return {'mean_ms': float(np.mean(timings)), 'p95_ms': float(np.percentile(timings, 95))}
+
+    def _compare_quantized(self, fp32_path: Path, int8_path: Path, backend_cls) -> Dict[str, Any]:
+        """Validate FP32 and INT8 on the val split and time both on CPU."""
+        comparison = {}
+        for name, path in (('fp32', fp32_path), ('int8', int8_path)):
+            self.logger.info(f"Validating {name} model {path}...")
+            metrics = YOLO(str(path), task='detect').val(
+                data=self.config['data_yaml'], imgsz=self.config['imgsz'],
+                batch=1, device='cpu', verbose=False)
+            comparison[f'{name}_map50'] = float(metrics.box.map50)
+            comparison[f'{name}_map50_95'] = float(metrics.box.map)
+
+        val_images = self._sample_images('val', 20)
+        for name, path in (('fp32', fp32_path), ('int8', int8_path)):
+            latency = self._measure_latency(backend_cls(str(path)), val_images)
+            comparison[f'{name}_latency_ms'] = latency['mean_ms']
+            comparison[f'{name}_latency_p95_ms'] = latency['p95_ms']
+
+        comparison['map50_delta'] = comparison['int8_map50'] - comparison['fp32_map50']
+        comparison['map50_95_delta'] = comparison['int8_map50_95'] - comparison['fp32_map50_95']
+        comparison['speedup'] = comparison['fp32_latency_ms'] / max(comparison['int8_latency_ms'], 1e-6)
+
+        self.logger.info(
+            f"{'':6}{'mAP@0.5':>10}{'mAP@.5:.95':>12}{'latency ms':>12}{'p95 ms':>10}\n"
+            f"{'fp32':6}{comparison['fp32_map50']:>10.4f}{comparison['fp32_map50_95']:>12.4f}"
+            f"{comparison['fp32_latency_ms']:>12.1f}{comparison['fp32_latency_p95_ms']:>10.1f}\n"
+            f"{'int8':6}{comparison['int8_map50']:>10.4f}{comparison['int8_map50_95']:>12.4f}"
+            f"{comparison['int8_latency_ms']:>12.1f}{comparison['int8_latency_p95_ms']:>10.1f}\n"
+            f"delta mAP@0.5 {comparison['map50_delta']:+.4f}, speedup x{comparison['speedup']:.2f}")
+        return comparison
+
+    def _dataset_names(self) -> Dict[int, str]:
+        """Class names from data_yaml as an id -> name dict."""
+        with open(self.config['data_yaml'], 'r', encoding='utf-8') as f:
+            names = yaml.safe_load(f).get('names', {})
+        if isinstance(names, list):
+            names = dict(enumerate(names))
+        return {int(k): str(v) for k, v in names.items()}
+
+    def prepare_crop_dataset(self, output_dir: Optional[str] = None) -> Path:
+        """
+        Build a hand-crop classification dataset from the existing YOLO labels.
+
+        Every labelled box is cut out with the same square crop the runtime two-stage
+        recognizer uses (square_crop_box with crop_padding), resized to crop_imgsz and saved
+        as <output>/<train|val|test>/<class name>/<image>_<box>.jpg, the folder layout
+        ultralytics expects for classification.
+
+        Args:
+            output_dir: Target directory, defaults to crop_dataset_dir or <dataset root>_crops
+
+        Returns:
+            Path of the crop dataset
+        """
+        from src.core.two_stage import square_crop_box, crop_to_buffer
+
+        names = self._dataset_names()
+        if output_dir is None:
+            output_dir = self.config['crop_dataset_dir'] or f"{self._dataset_split_dir('train').parents[1]}_crops"
+        output = Path(output_dir)
+        size = self.config['crop_imgsz']
+        crop = np.empty((size, size, 3), dtype=np.uint8)
+
+        counts = {}
+        for split in ('train', 'val', 'test'):
+            image_dir = self._dataset_split_dir(split)
+            if not image_dir.exists():
+                continue
+            label_dir = image_dir.parent / 'labels'
+            count = 0
+            for image_path in sorted(image_dir.glob('*')):
+                label_path = label_dir / f"{image_path.stem}.txt"
+                if image_path.suffix.lower() not in ('.jpg', '.jpeg', '.png', '.bmp') or not label_path.exists():
+                    continue
+                frame = cv2.imread(str(image_path))
+                if frame is None:
+                    continue
+                height, width = frame.shape[:2]
+                for index, line in enumerate(label_path.read_text().splitlines()):
+                    parts = line.split()
+                    if len(parts) != 5:
+                        continue
+                    class_id = int(parts[0])
+                    cx, cy, w, h = (float(v) for v in parts[1:])
+                    box = ((cx - w / 2) * width, (cy - h / 2) * height, (cx + w / 2) * width, (cy + h / 2) * height)
+                    crop_to_buffer(frame, square_crop_box(box, self.config['crop_padding'], width, height), crop)
+
+                    class_dir = output / split / names.get(class_id, str(class_id))
+                    class_dir.mkdir(parents=True, exist_ok=True)
+                    cv2.imwrite(str(class_dir / f"{image_path.stem}_{index}.jpg"), crop)
+                    count += 1
+            counts[split] = count
+
+        self.logger.info(f"Crop dataset written to {output}: {counts}")
+        return output
+
+    def prepare_depth_dataset(self, raw_dir: str, output_dir: Optional[str] = None,
+                              depth_range: Optional[List[float]] = None) -> Path:
+        """
+        Colorize raw 16-bit depth images into the dataset the depth model trains on.
+
+        Uses the same lookup-table DepthColorizer as DualModelTracker, with one fixed depth
+        range for the whole dataset, so a given distance gets the same colour in training and
+        at runtime. The range is depth_range (argument or config) or, when unset, calibrated
+        from the percentiles of the valid train pixels. It is written to
+        <output>/depth_range.yaml for the tracker's depth_range_file. Ranges are in
+        millimetres; the raw captures are read as the Hawk's default 12I_4D depth format.
+
+        Args:
+            raw_dir: Directory with train/valid/test splits of 16-bit depth PNGs and labels
+            output_dir: Target dataset root, defaults to the dataset root of data_yaml
+            depth_range: (min, max) depth in mm mapped onto the colormap
+
+        Returns:
+            Path of the colorized dataset
+        """
+        from src.utils.depth_colorizer import DepthColorizer, calibrate_depth_range, colormap_code
+
+        raw = Path(raw_dir)
+        output = Path(output_dir) if output_dir else self._dataset_split_dir('train').parents[1]
+        splits = [split for split in ('train', 'valid', 'test') if (raw / split / 'images').exists()]
+
+        def depth_images(split):
+            for image_path in sorted((raw / split / 'images').glob('*.png')):
+                depth = cv2.imread(str(image_path), cv2.IMREAD_UNCHANGED)
+                if depth is None or depth.dtype != np.uint16 or depth.ndim != 2:
+                    self.logger.warning(f"Skipping {image_path}: not a 16-bit depth image")
+                    continue
+                yield image_path, depth
+
+        depth_range = depth_range or self.config['depth_range']
+        if not depth_range:
+            low, high = self.config['depth_calibration_percentiles']
+            depth_range = calibrate_depth_range((depth for _, depth in depth_images('train')), low, high)
+            self.logger.info(f"Calibrated depth range from train split: {depth_range}")
+        colorizer = DepthColorizer(depth_range[0], depth_range[1], colormap_code(self.config['depth_colormap']))
+
+        counts = {}
+        for split in splits:
+            image_dir = output / split / 'images'
+            label_dir = output / split / 'labels'
+            image_dir.mkdir(parents=True, exist_ok=True)
+            label_dir.mkdir(parents=True, exist_ok=True)
+            count = 0
+            for image_path, depth in depth_images(split):
+                cv2.imwrite(str(image_dir / image_path.name), colorizer.colorize(depth))
+                label_path = raw / split / 'labels' / f"{image_path.stem}.txt"
+                if label_path.exists():
+                    (label_dir / label_path.name).write_text(label_path.read_text())
+                count += 1
+            counts[split] = count
+
+        colorizer.save_range(output / 'depth_range.yaml')
+        self.logger.info(f"Depth dataset written to {output} (range {colorizer.depth_range}): {counts}")
+        return output
+
+    def prepare_rgbd_dataset(self, raw_dir: str, output_dir: Optional[str] = None,
+                             depth_range: Optional[List[float]] = None) -> Path:
+        """
+        Fuse paired RGB and depth captures into the 4-channel dataset of the early-fusion model.
+
+        Pairs <name>_rgb.jpg with <name>_depth.png as written by DataCollector.save_data and
+        stores B, G, R and the grey depth channel (fuse_rgbd, the function the tracker uses at
+        runtime) as one 4-channel TIFF per pair, the multi-channel format ultralytics reads
+        when data.yaml sets channels: 4. The depth range is chosen as in
+        prepare_depth_dataset and written to <output>/depth_range.yaml.
+
+        Args:
+            raw_dir: Directory with train/valid/test splits of RGB/depth pairs and labels
+            output_dir: Target dataset root, defaults to the dataset root of data_yaml
+            depth_range: (min, max) depth in mm mapped onto 0~255 of the depth channel
+
+        Returns:
+            Path of the fused dataset
+        """
+        from src.utils.depth_colorizer import DepthColorizer, calibrate_depth_range
+        from src.utils.rgbd import find_rgbd_pairs, read_rgbd_pair, fuse_rgbd
+
+        raw = Path(raw_dir)
+        output = Path(output_dir) if output_dir else self._dataset_split_dir('train').parents[1]
+        pairs = {split: find_rgbd_pairs(raw / split) for split in ('train', 'valid', 'test')
+                 if (raw / split / 'images').exists()}
+
+        depth_range = depth_range or self.config['depth_range']
+        if not depth_range:
+            low, high = self.config['depth_calibration_percentiles']
+            depths = (cv2.imread(str(pair.depth_path), cv2.IMREAD_UNCHANGED) for pair in pairs.get('train', []))
+            depth_range = calibrate_depth_range((depth for depth in depths if depth is not None), low, high)
+            self.logger.info(f"Calibrated depth range from train split: {depth_range}")
+        colorizer = DepthColorizer(depth_range[0], depth_range[1], colormap=None)
+
+        counts = {}
+        fused = None
+        for split, split_pairs in pairs.items():
+            image_dir = output / split / 'images'
+            label_dir = output / split / 'labels'
+            image_dir.mkdir(parents=True, exist_ok=True)
+            label_dir.mkdir(parents=True, exist_ok=True)
+            count = 0
+            for pair in split_pairs:
+                bgr, depth = read_rgbd_pair(pair)
+                if bgr is None:
+                    self.logger.warning(f"Skipping {pair.name}: unreadable image or not a 16-bit depth image")
+                    continue
+                fused = fuse_rgbd(bgr, depth, colorizer, fused)
+                cv2.imwrite(str(image_dir / f"{pair.name}.tiff"), fused)
+                if pair.label_path is not None:
+                    (label_dir / f"{pair.name}.txt").write_text(pair.label_path.read_text())
+                count += 1
+            counts[split] = count
+
+        colorizer.save_range(output / 'depth_range.yaml')
+        self.logger.info(f"RGB-D dataset written to {output} (range {colorizer.depth_range}): {counts}")
+        return output
+
+    def compare_fusion(self, raw_dir: str, rgb_model_path: str, depth_model_path: str,
+                       rgbd_model_path: Optional[str] = None, split: str = 'test',
+                       backend: str = 'onnxruntime', depth_range_file: Optional[str] = None,
+                       fusion_weights: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """
+        Benchmark the early-fusion RGB-D model against the two-model DualModelTracker path.
+
+        Both paths run on the same RGB/depth pairs of one raw split, through the runtime
+        backends and preprocessing the tracker uses: the two-model path colorizes depth,
+        runs both detectors and fuses their top boxes with fuse_predictions (as on the first
+        frame, without stability history); the early-fusion path builds the 4-channel input
+        and runs one detector. Accuracy is top-1 agreement of the recognised class with the
+        first labelled box, the number the tracker posts; latency is per frame, end to end.
+
+        Args:
+            raw_dir: Directory with splits of RGB/depth pairs and labels
+            rgb_model_path / depth_model_path: Weights of the two-model tracker
+            rgbd_model_path: Early-fusion weights, defaults to the best weights of the last train()
+            split: Raw split to evaluate
+            backend: Inference backend of both paths (ultralytics / onnxruntime)
+            depth_range_file: Range of the depth model input, defaults to dataset/depth/depth_range.yaml
+            fusion_weights: Decision fusion weights, defaults to DualModelTracker's
+
+        Returns:
+            Dictionary with accuracy and latency of both paths (and RGB alone for reference)
+        """
+        from src.core.inference_backend import create_inference_backend
+        from src.core.DualModelTracker import fuse_predictions
+        from src.utils.depth_colorizer import create_depth_colorizer
+        from src.utils.rgbd import find_rgbd_pairs, read_rgbd_pair, fuse_rgbd
+
+        if rgbd_model_path is None:
+            rgbd_model_path = str(self.model.trainer.best)
+        fusion_weights = fusion_weights or {'rgb': 0.6, 'depth': 0.4}
+        depth_range = self.config['depth_range']
+        depth_colorizer = create_depth_colorizer({
+            'depth_range': depth_range, 'depth_colormap': self.config['depth_colormap'],
+            'depth_range_file': depth_range_file or str(ROOT_DIR / 'dataset/depth/depth_range.yaml')})
+        rgbd_colorizer = create_depth_colorizer({
+            'depth_range': depth_range, 'depth_colormap': None,
+            'depth_range_file': str(self._dataset_split_dir('train').parents[1] / 'depth_range.yaml')},
+            grayscale=True)
+
+        rgb_model = create_inference_backend(rgb_model_path, backend)
+        depth_model = create_inference_backend(depth_model_path, backend)
+        rgbd_model = create_inference_backend(rgbd_model_path, backend)
+        names = self._dataset_names()
+
+        def top_class(results):
+            boxes = results[0].boxes
+            if len(boxes) == 0:
+                return None, 0.0
+            return results[0].names[int(boxes.cls[0].item())], float(boxes.conf[0].item())
+
+        samples = []
+        for pair in find_rgbd_pairs(Path(raw_dir) / split):
+            if pair.label_path is None:
+                continue
+            lines = pair.label_path.read_text().split()
+            bgr, depth = read_rgbd_pair(pair)
+            if lines and bgr is not None:
+                samples.append((names[int(lines[0])], bgr, depth))
+        if not samples:
+            raise ValueError(f"No labelled RGB/depth pairs in {Path(raw_dir) / split}")
+
+        height, width = samples[0][1].shape[:2]
+        for model in (rgb_model, depth_model, rgbd_model):
+            model.warmup(3, (height, width))
+
+        correct = {'two_model': 0, 'early_fusion': 0, 'rgb_only': 0}
+        timings = {'two_model': [], 'early_fusion': []}
+        fused = None
+        for truth, bgr, depth in samples:
+            start = time.perf_counter()
+            rgb_class, rgb_conf = top_class(rgb_model.predict(bgr, verbose=False))
+            depth_class, depth_conf = top_class(depth_model.predict(depth_colorizer.colorize(depth), verbose=False))
+            final_class, _ = fuse_predictions(rgb_class, rgb_conf, 0, depth_class, depth_conf, 0, fusion_weights)
+            timings['two_model'].append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            fused = fuse_rgbd(bgr, depth, rgbd_colorizer, fused)
+            rgbd_class, _ = top_class(rgbd_model.predict(fused, verbose=False))
+            timings['early_fusion'].append((time.perf_counter() - start) * 1000)
+
+            correct['two_model'] += final_class == truth
+            correct['early_fusion'] += rgbd_class == truth
+            correct['rgb_only'] += rgb_class == truth
+
+        comparison = {'frames': len(samples)}
+        for name, count in correct.items():
+            comparison[f'{name}_accuracy'] = count / len(samples)
+        for name, values in timings.items():
+            comparison[f'{name}_latency_ms'] = float(np.mean(values))
+            comparison[f'{name}_latency_p95_ms'] = float(np.percentile(values, 95))
+        comparison['accuracy_delta'] = comparison['early_fusion_accuracy'] - comparison['two_model_accuracy']
+        comparison['speedup'] = comparison['two_model_latency_ms'] / max(comparison['early_fusion_latency_ms'], 1e-6)
+
+        self.logger.info(
+            f"{'':14}{'accuracy':>10}{'latency ms':>12}{'p95 ms':>10}\n"
+            f"{'two-model':14}{comparison['two_model_accuracy']:>10.4f}"
+            f"{comparison['two_model_latency_ms']:>12.1f}{comparison['two_model_latency_p95_ms']:>10.1f}\n"
+            f"{'early fusion':14}{comparison['early_fusion_accuracy']:>10.4f}"
+            f"{comparison['early_fusion_latency_ms']:>12.1f}{comparison['early_fusion_latency_p95_ms']:>10.1f}\n"
+            f"{'rgb only':14}{comparison['rgb_only_accuracy']:>10.4f}\n"
+            f"{len(samples)} frames, delta accuracy {comparison['accuracy_delta']:+.4f}, "
+            f"speedup x{comparison['speedup']:.2f}")
+        return comparison
+
+    def train_crop_classifier(self, dataset_dir: Optional[str] = None, export_format: Optional[str] = 'onnx'):
+        """
+        Train the compact crop classifier used by the two-stage recognizer.
+
+        Args:
+            dataset_dir: Crop dataset, built with prepare_crop_dataset() when omitted
+            export_format: Export the best weights after training (None to skip)
+
+        Returns:
+            The trained classification model
+        """
+        dataset_dir = Path(dataset_dir) if dataset_dir else self.prepare_crop_dataset()
+        try:
+            self.logger.info(f"Training crop classifier {self.config['crop_model_path']} on {dataset_dir}...")
+            model = YOLO(self.config['crop_model_path'])
+            model.train(
+                data=str(dataset_dir),
+                epochs=self.config['crop_epochs'],
+                imgsz=self.config['crop_imgsz'],
+                patience=self.config['patience'],
+                batch=self.config['batch_size'],
+                device=self.config['device'],
+                workers=self.config['workers'])
+            if export_format:
+                model.export(format=export_format, imgsz=self.config['crop_imgsz'])
+            self.logger.info("Crop classifier training completed successfully")
+            return model
+        except Exception as e:
+            self.logger.error(f"Error training crop classifier: {e}")
+            raise
+
 
 def main():
     # Example usage
@@ -0,0 +1,146 @@
+import time
+from typing import Optional, Dict, Any
+
+import cv2
+import numpy as np
+
+from src.utils.depth_units import DEFAULT_DEPTH_PIXEL_TYPE, depth_to_mm
+
+
+RGB = 'rgb'
+DEPTH = 'depth'
+
+
+class MotionGate:
+    """
+    推理前的运动门控
+
+    手语字母多为静止手势，相邻帧几乎相同。把帧缩小成灰度（或深度）缩略图，与上一次
+    推理时的缩略图比较，变化像素比例低于threshold时跳过检测器、复用上一次的结果；
+    连续跳过refresh_interval帧后强制推理一次，避免长时间使用过期结果。
+    参考图只在推理时更新，缓慢的移动会逐帧累积，最终仍会触发推理。
+    """
+
+    def __init__(self,
+                 threshold: float = 0.01,
+                 pixel_threshold: float = 12.0,
+                 refresh_interval: int = 15,
+                 width: int = 80,
+                 source: str = RGB,
+                 pixel_type: int = DEFAULT_DEPTH_PIXEL_TYPE):
+        """
+        Args:
+            threshold: 变化像素占比阈值，达到即推理
+            pixel_threshold: 单个像素视为变化的差值（RGB为灰度级，深度为毫米）
+            refresh_interval: 最多连续跳过的帧数
+            width: 缩略图宽度
+            source: 'rgb' 比较BGR帧，'depth' 比较深度帧（忽略无效的0值像素）
+            pixel_type: 深度像素格式，depth下原始深度值按它换算为毫米
+        """
+        if source not in (RGB, DEPTH):
+            raise ValueError(f"Unsupported motion gate source: {source}")
+        self.threshold = threshold
+        self.pixel_threshold = pixel_threshold
+        self.refresh_interval = max(int(refresh_interval), 1)
+        self.width = max(int(width), 8)
+        self.source = source
+        self.pixel_type = pixel_type
+
+        self._reference = None
+        self._since_refresh = 0
+
+        # 统计信息
+        self.frames = 0
+        self.inferred = 0
+        self.skipped = 0
+        self.forced_refreshes = 0
+        self.last_change = 0.0
+        self.inference_ms = None
+        self._gate_time = 0.0
+
+    def set_depth_pixel_type(self, pixel_type: int) -> None:
+        """设置深度流的像素格式，由追踪器在启动数据流后调用；格式变化时丢弃参考图"""
+        if pixel_type != self.pixel_type:
+            self.pixel_type = pixel_type
+            self._reference = None
+
+    def _thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        h, w = frame.shape[:2]
+        size = (self.width, max(int(round(h * self.width / w)), 1))
+        if self.source == DEPTH:
+            # 最近邻缩放，避免无效的0值和有效深度混合成虚假的中间值
+            return depth_to_mm(cv2.resize(frame, size, interpolation=cv2.INTER_NEAREST), self.pixel_type)
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small.astype(np.float32)
+
+    def _change(self, thumbnail: np.ndarray) -> float:
+        """与参考图相比变化像素的占比"""
+        changed = np.abs(thumbnail - self._reference) > self.pixel_threshold
+        if self.source == DEPTH:
+            valid = (thumbnail > 0) & (self._reference > 0)
+            total = np.count_nonzero(valid)
+            return np.count_nonzero(changed & valid) / total if total else 1.0
+        return np.count_nonzero(changed) / changed.size
+
+    def should_infer(self, frame: np.ndarray) -> bool:
+        """判断本帧是否需要运行检测器；返回True时以本帧作为新的参考图"""
+        start = time.monotonic()
+        thumbnail = self._thumbnail(frame)
+        self.frames += 1
+
+        infer = True
+        if self._reference is not None and self._reference.shape == thumbnail.shape:
+            self.last_change = float(self._change(thumbnail))
+            if self.last_change < self.threshold:
+                if self._since_refresh < self.refresh_interval:
+                    infer = False
+                else:
+                    self.forced_refreshes += 1
+
+        if infer:
+            self._reference = thumbnail
+            self._since_refresh = 0
+            self.inferred += 1
+        else:
+            self._since_refresh += 1
+            self.skipped += 1
+
+        self._gate_time += time.monotonic() - start
+        return infer
+
+    def record_inference(self, elapsed_ms: float) -> None:
+        """记录一次检测器耗时，用于估算跳帧节省的计算量"""
+        if self.inference_ms is None:
+            self.inference_ms = elapsed_ms
+        else:
+            self.inference_ms += 0.1 * (elapsed_ms - self.inference_ms)
+
+    def get_stats(self) -> Dict[str, Any]:
+        inference_ms = self.inference_ms or 0.0
+        return {
+            'frames': self.frames,
+            'inferred': self.inferred,
+            'skipped': self.skipped,
+            'forced_refreshes': self.forced_refreshes,
+            'skip_rate': self.skipped / self.frames if self.frames else 0.0,
+            'last_change': self.last_change,
+            'inference_ms': inference_ms,
+            'saved_ms': self.skipped * inference_ms,
+            'gate_ms': self._gate_time / self.frames * 1000 if self.frames else 0.0,
+        }
+
+
+def create_motion_gate(config: Dict[str, Any]) -> Optional[MotionGate]:
+    """按追踪器配置创建运动门控，未启用时返回None"""
+    if not config['motion_gate']:
+        return None
+    source = config['motion_gate_source']
+    return MotionGate(
+        threshold=config['motion_threshold'],
+        pixel_threshold=config['motion_depth_threshold_mm'] if source == DEPTH else config['motion_pixel_threshold'],
+        refresh_interval=config['motion_refresh_interval'],
+        width=config['motion_gate_width'],
+        source=source,
+    )
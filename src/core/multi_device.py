@@ -0,0 +1,600 @@
+import cv2
+import time
+import logging
+import threading
+from typing import Optional, Tuple, Dict, Any, List
+from pathlib import Path
+import sys
+
+import numpy as np
+import requests
+import yaml
+
+ROOT_DIR = Path(__file__).resolve().parents[2]  # 获取项目根目录
+sys.path.append(str(ROOT_DIR))
+
+from src.devices.BerxelSdkDriver.BerxelHawkDefines import *
+from src.devices.device_backend import create_hawk_context
+from src.core.capture_worker import CaptureWorker
+from src.core.model_registry import load_tracker_model, get_model_registry
+from src.core.motion_gate import create_motion_gate
+from src.core.detection_scheduler import create_detection_scheduler
+from src.core.two_stage import create_two_stage_recognizer
+from src.core.inference_server import create_inference_server
+from src.core.frame_renderer import FrameRenderer
+from src.utils.depth_colorizer import create_display_colorizer
+from src.utils.depth_units import depth_pixel_type
+
+
+class DeviceChannel:
+    """单台相机的运行状态：设备句柄、采集线程以及该路独立的稳定性过滤和最新结果"""
+
+    def __init__(self, index: int, device_info, device, preview_width: int = 0):
+        self.index = index
+        self.device_info = device_info
+        self.device = device
+        self.serial = device_info.serialNumber.decode(errors='ignore') or str(index)
+        self.capture_worker = None
+        self.motion_gate = None
+        self.detection_scheduler = None
+        self.last_results = None
+
+        self.previous_class_name = None
+        self.stable_frame_count = 0
+        self.latest_rgb_frame = None
+        # 显示用的深度帧副本；批处理模式下由处理线程写入、主线程读取
+        self.latest_depth_frame = None
+        self._depth_lock = threading.Lock()
+        # 该设备的识别结果只在有观看者时绘制
+        self.renderer = FrameRenderer(preview_width)
+
+        # 调度统计
+        self.frames_processed = 0
+        self.deadline_misses = 0
+        self.last_served = 0.0
+
+    def store_depth_frame(self, depth_frame: np.ndarray) -> None:
+        """拷贝最新深度帧：传入的是采集环形缓冲区的槽位，采集线程随后会覆盖它"""
+        with self._depth_lock:
+            if self.latest_depth_frame is None or self.latest_depth_frame.shape != depth_frame.shape \
+                    or self.latest_depth_frame.dtype != depth_frame.dtype:
+                self.latest_depth_frame = np.empty_like(depth_frame)
+            np.copyto(self.latest_depth_frame, depth_frame)
+
+    def colorize_depth(self, colorizer) -> Optional[np.ndarray]:
+        """在锁内为显示着色最新深度帧，还没有深度帧时返回None"""
+        with self._depth_lock:
+            if self.latest_depth_frame is None:
+                return None
+            return colorizer.colorize(self.latest_depth_frame)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {
+            'serial': self.serial,
+            'frames_processed': self.frames_processed,
+            'deadline_misses': self.deadline_misses,
+        }
+        if self.capture_worker is not None:
+            stats['capture'] = self.capture_worker.get_stats()
+        if self.motion_gate is not None:
+            stats['motion_gate'] = self.motion_gate.get_stats()
+        if self.detection_scheduler is not None:
+            stats['detection_scheduler'] = self.detection_scheduler.get_stats()
+        stats['renderer'] = self.renderer.get_stats()
+        return stats
+
+
+class MultiDeviceTracker:
+    """
+    多相机追踪器
+
+    打开getDeviceList()返回的所有设备，每台设备一个CaptureWorker，
+    所有设备共享同一个YOLO模型实例，由调度器决定下一帧处理哪台设备：
+      round_robin: 按设备顺序轮流取有新帧的设备
+      deadline:    优先处理等待最久的帧，超过frame_deadline_ms的帧丢弃（计入deadline_misses）
+    每台设备独立做稳定性过滤并独立发送识别结果。
+    启用inference_batching时改为每台设备一个处理线程，各路的推理请求由InferenceServer
+    合成微批，一次前向处理多台设备的帧。
+    """
+
+    def __init__(self,
+                 model_path: str,
+                 config_path: Optional[str] = None,
+                 test_mode: bool = False,
+                 test_post: bool = False):
+        """
+        初始化MultiDeviceTracker
+
+        Args:
+            model_path: YOLO模型路径（所有设备共享）
+            config_path: 配置文件路径
+        """
+        self.logger = self._setup_logging()
+        self.config = self._load_config(config_path)
+
+        self.model = load_tracker_model(model_path, self.config) if model_path else None
+        # 两阶段模式下手部定位+裁剪分类代替整帧检测，各设备共享
+        self.two_stage = create_two_stage_recognizer(self.config, self.model)
+
+        self.__context = None
+        self.channels: List[DeviceChannel] = []
+        self._next_channel = 0
+        self.inference_server = None
+        self._channel_threads: List[threading.Thread] = []
+        self._stop_event = threading.Event()
+        self.display_colorizer = create_display_colorizer()
+
+        # 通道控制
+        self.rgb_enabled = True
+        self.depth_enabled = True
+        self.tracking_enabled = True
+
+        self.test_mode = test_mode
+        self.test_post = test_post
+        self.server_url = self.config.get("server_url", "http://localhost:5000")
+
+    def _setup_logging(self) -> logging.Logger:
+        """配置日志系统"""
+        logger = logging.getLogger('MultiDeviceTracker')
+        logger.setLevel(logging.INFO)
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+        return logger
+
+    def _load_config(self, config_path: Optional[str]) -> Dict[str, Any]:
+        """加载配置文件"""
+        default_config = {
+            'server_url': 'http://localhost:5000',
+            'required_stable_frames': 3,
+            'display_window': True,
+            'capture_ring_slots': 4,
+            'read_timeout_ms': 30,
+            'stream_mode': 'poll',
+            'push_queue_size': 2,
+            'frame_sync': False,
+            'sync_tolerance_us': 15000,
+            'sync_queue_size': 4,
+            'hardware_frame_sync': False,
+            'device_backend': 'berxel',
+            'simulated_device': {},
+            'max_devices': 0,
+            'device_scheduling': 'round_robin',
+            'frame_deadline_ms': 100,
+            'inference_backend': 'ultralytics',
+            'onnx_runtime': {},
+            'model_warmup_runs': 2,
+            'preview_width': 0,
+            'inference_workers': 0,
+            'inference_worker_slots': 0,
+            'inference_worker_max_frame': [1080, 1920],
+            'inference_batching': False,
+            'inference_batch_size': 0,
+            'inference_batch_wait_ms': 5.0,
+            'motion_gate': False,
+            'motion_gate_source': 'rgb',
+            'motion_threshold': 0.01,
+            'motion_pixel_threshold': 12,
+            'motion_depth_threshold_mm': 30,
+            'motion_refresh_interval': 15,
+            'motion_gate_width': 80,
+            'detect_interval': 1,
+            'redetect_confidence': 0.5,
+            'box_propagation': 'flow',
+            'recognition_mode': 'detector',
+            'roi_locator': 'detector',
+            'roi_detector_path': None,
+            'roi_detector_imgsz': 320,
+            'crop_classifier_path': 'runs/classify/train/weights/best.pt',
+            'crop_imgsz': 128,
+            'crop_padding': 0.15,
+            'depth_roi_band_mm': 150,
+            'depth_roi_min_mm': 200,
+            'depth_roi_max_mm': 1500
+        }
+
+        if config_path and Path(config_path).exists():
+            try:
+                with open(config_path, 'r') as f:
+                    user_config = yaml.safe_load(f)
+                default_config.update(user_config)
+            except Exception as e:
+                self.logger.error(f"Error loading config: {e}")
+
+        return default_config
+
+    def _stream_flags(self) -> int:
+        stream_flags = 0
+        if self.rgb_enabled:
+            stream_flags |= BerxelHawkStreamType.forward_dict['BERXEL_HAWK_COLOR_STREAM']
+        if self.depth_enabled:
+            stream_flags |= BerxelHawkStreamType.forward_dict['BERXEL_HAWK_DEPTH_STREAM']
+        return stream_flags
+
+    def open_devices(self) -> bool:
+        """初始化相机上下文并打开所有设备，单台打开失败不影响其他设备"""
+        self.__context = create_hawk_context(self.config['device_backend'],
+                                             self.config['simulated_device'])
+        if self.__context is None:
+            self.logger.error("初始化失败")
+            return False
+
+        self.__context.initCamera()
+        device_list = self.__context.getDeviceList()
+        if self.config['max_devices'] > 0:
+            device_list = device_list[:self.config['max_devices']]
+
+        if len(device_list) < 1:
+            self.logger.error("未找到设备")
+            return False
+
+        for index, device_info in enumerate(device_list):
+            device = self.__context.openDevice(device_info)
+            if device is None:
+                self.logger.error(f"打开设备 {device_info.serialNumber} 失败")
+                continue
+            channel = DeviceChannel(index, device_info, device, self.config['preview_width'])
+            if self.config['display_window']:
+                channel.renderer.add_viewer()
+            channel.motion_gate = create_motion_gate(self.config)
+            channel.detection_scheduler = create_detection_scheduler(self.config)
+            self.channels.append(channel)
+
+        self.logger.info(f"Opened {len(self.channels)}/{len(device_list)} devices")
+        return len(self.channels) > 0
+
+    def start_streams(self, channel: DeviceChannel) -> bool:
+        """启动单台设备的数据流"""
+        device = channel.device
+        device.setDenoiseStatus(False)
+        if self.config['hardware_frame_sync']:
+            device.setFrameSync(True)
+
+        stream_flags = self._stream_flags()
+        if self.depth_enabled:
+            depth_stream = BerxelHawkStreamType.forward_dict['BERXEL_HAWK_DEPTH_STREAM']
+            device.setFrameMode(depth_stream, device.getCurrentFrameMode(depth_stream))
+            self._apply_depth_pixel_type(channel, depth_pixel_type(device))
+
+        if self.config['stream_mode'] == 'push':
+            return device.startPushStreams(stream_flags, self.config['push_queue_size']) == 0
+        return device.startStreams(stream_flags) == 0
+
+    def _apply_depth_pixel_type(self, channel: DeviceChannel, pixel_type: int) -> None:
+        """把深度流的像素格式告知按毫米阈值处理原始深度的组件（两阶段识别器各设备共享）"""
+        if self.two_stage is not None:
+            self.two_stage.set_depth_pixel_type(pixel_type)
+        if channel.motion_gate is not None:
+            channel.motion_gate.set_depth_pixel_type(pixel_type)
+
+    def warmup_models(self) -> None:
+        """按第一台设备彩色流的实际分辨率预热共享模型"""
+        if self.model is None or not self.channels:
+            return
+        mode = self.channels[0].device.getCurrentFrameMode(
+            BerxelHawkStreamType.forward_dict['BERXEL_HAWK_COLOR_STREAM'])
+        if mode is not None:
+            get_model_registry().warmup(self.model, (mode.resolutionY, mode.resolutionX),
+                                        self.config['model_warmup_runs'])
+
+    def start_capture_workers(self) -> None:
+        """为每台设备启动独立采集线程"""
+        for channel in self.channels:
+            channel.capture_worker = CaptureWorker(
+                channel.device,
+                rgb_enabled=self.rgb_enabled,
+                depth_enabled=self.depth_enabled,
+                num_slots=self.config['capture_ring_slots'],
+                read_timeout_ms=self.config['read_timeout_ms'],
+                sync_tolerance=self.config['sync_tolerance_us'] if self.config['frame_sync'] else None,
+                sync_queue_size=self.config['sync_queue_size'])
+            channel.capture_worker.start()
+
+    def start_inference_server(self) -> None:
+        """启用微批推理时启动推理服务，并为每台设备启动处理线程"""
+        if not self.config['inference_batching']:
+            return
+        if self.two_stage is not None:
+            self.logger.warning("Inference batching is not supported in two_stage mode, disabled")
+            return
+        self.inference_server = create_inference_server(self.config, self.model, len(self.channels),
+                                                        'multi_device')
+        if self.inference_server is None:
+            return
+        self.inference_server.start()
+
+        self._stop_event.clear()
+        for channel in self.channels:
+            thread = threading.Thread(target=self._channel_loop, args=(channel,),
+                                      name=f'Channel-{channel.serial}', daemon=True)
+            thread.start()
+            self._channel_threads.append(thread)
+
+    def _channel_loop(self, channel: DeviceChannel) -> None:
+        """单台设备的处理线程：等待新帧并处理，推理请求提交给共享的推理服务"""
+        while not self._stop_event.is_set():
+            rgb_frame, depth_frame = channel.capture_worker.read_latest(0.1)
+            if rgb_frame is None and depth_frame is None:
+                continue
+            channel.last_served = time.monotonic()
+            try:
+                self.handle_frames(channel, rgb_frame, depth_frame)
+            except RuntimeError as e:
+                # 推理服务已停止
+                self.logger.debug(f"[{channel.serial}] {e}")
+
+    def stop_channel_threads(self) -> None:
+        self._stop_event.set()
+        for thread in self._channel_threads:
+            thread.join(1.0)
+        self._channel_threads = []
+        if self.inference_server is not None:
+            self.inference_server.stop()
+
+    def _next_round_robin(self) -> Optional[DeviceChannel]:
+        """从上次处理设备的下一台开始，找第一台有新帧的设备"""
+        count = len(self.channels)
+        for offset in range(count):
+            channel = self.channels[(self._next_channel + offset) % count]
+            if channel.capture_worker.ring_buffer.peek_latest() is not None:
+                self._next_channel = (channel.index + 1) % count
+                return channel
+        return None
+
+    def _next_deadline(self) -> Optional[DeviceChannel]:
+        """选择等待最久的新帧；已超过截止时间的帧直接丢弃"""
+        now = time.monotonic()
+        deadline = self.config['frame_deadline_ms'] / 1000.
+        selected = None
+        oldest = None
+        for channel in self.channels:
+            latest = channel.capture_worker.ring_buffer.peek_latest()
+            if latest is None:
+                continue
+            commit_time = latest[1]
+            if now - commit_time > deadline:
+                # 过期帧：消费掉但不推理，等待该设备的下一帧
+                channel.capture_worker.ring_buffer.read_latest(0)
+                channel.deadline_misses += 1
+                continue
+            if oldest is None or commit_time < oldest:
+                selected, oldest = channel, commit_time
+        return selected
+
+    def next_channel(self, timeout: float = 0.05) -> Optional[DeviceChannel]:
+        """按调度策略选出下一台待处理的设备，timeout内都没有新帧返回None"""
+        schedule = (self._next_deadline if self.config['device_scheduling'] == 'deadline'
+                    else self._next_round_robin)
+        end = time.monotonic() + timeout
+        while True:
+            channel = schedule()
+            if channel is not None or time.monotonic() >= end:
+                return channel
+            time.sleep(0.001)
+
+    def capture_frame(self, channel: DeviceChannel) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """取该设备最新的帧对"""
+        return channel.capture_worker.read_latest(0)
+
+    def process_frame(self, channel: DeviceChannel, frame: np.ndarray,
+                      depth_frame: Optional[np.ndarray] = None) -> Tuple[np.ndarray, Optional[str]]:
+        """
+        用共享模型处理一帧
+
+        多路画面交替进入同一个模型，track(persist=True)的跟踪状态会在设备之间串扰，
+        因此这里使用predict，稳定性过滤按设备独立进行。
+        启用运动门控时每台设备各自判断画面是否静止，静止时复用该设备上一次的结果；
+        启用检测调度时每台设备各自推算两次检测之间的检测框。
+        返回的是未绘制的原帧：本地窗口和MJPEG观看者各自从渲染器取绘制结果。
+        """
+        if not self.tracking_enabled or self.model is None:
+            return frame, None
+
+        gate = channel.motion_gate
+        scheduler = channel.detection_scheduler
+        gate_frame = depth_frame if gate is not None and gate.source == 'depth' else frame
+        if gate is not None and gate_frame is not None and not gate.should_infer(gate_frame) \
+                and channel.last_results is not None:
+            results = channel.last_results
+        elif scheduler is not None and not scheduler.should_detect():
+            results = scheduler.propagate(frame)
+            channel.last_results = results
+        else:
+            infer_start = time.monotonic()
+            if self.two_stage is not None:
+                results = self.two_stage.predict(frame, depth_frame)
+            elif self.inference_server is not None:
+                results = self.inference_server.infer(frame, channel.serial)
+            else:
+                results = self.model.predict(frame, verbose=False)
+            if gate is not None:
+                gate.record_inference((time.monotonic() - infer_start) * 1000)
+            if scheduler is not None:
+                scheduler.update(frame, results)
+            channel.last_results = results
+        channel.renderer.submit(frame, results)
+        detected_class_name = None
+
+        if len(results[0].boxes) > 0:
+            class_id = results[0].boxes.cls[0].item()
+            detected_class_name = results[0].names[class_id]
+
+        # 推算帧沿用上一次检测的类别，不计入稳定帧数
+        if not getattr(results[0], 'propagated', False):
+            if detected_class_name == channel.previous_class_name:
+                channel.stable_frame_count += 1
+            else:
+                channel.stable_frame_count = 0
+
+        filtered_class_name = None
+        if channel.stable_frame_count >= self.config['required_stable_frames']:
+            filtered_class_name = detected_class_name
+
+        channel.previous_class_name = detected_class_name
+        return frame, filtered_class_name
+
+    def post_class_name(self, channel: DeviceChannel, class_name: str) -> None:
+        """发送识别结果到服务器，附带设备序列号"""
+        url = f"{self.server_url}/recognize"
+        data = {"class_name": class_name, "device": channel.serial}
+
+        if self.test_post:
+            self.logger.info(f"Pseudo-posting data: {data}")
+            return
+
+        try:
+            response = requests.post(url, json=data, timeout=1.0)
+            if response.status_code != 200:
+                self.logger.error(f"Failed to post: {response.status_code}")
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"Error posting data: {e}")
+
+    def step(self, timeout: float = 0.05) -> Optional[DeviceChannel]:
+        """调度并处理一帧，返回被处理的设备"""
+        channel = self.next_channel(timeout)
+        if channel is None:
+            return None
+
+        rgb_frame, depth_frame = self.capture_frame(channel)
+        channel.last_served = time.monotonic()
+        self.handle_frames(channel, rgb_frame, depth_frame)
+        return channel
+
+    def handle_frames(self, channel: DeviceChannel, rgb_frame: Optional[np.ndarray],
+                      depth_frame: Optional[np.ndarray]) -> None:
+        """处理一台设备的一组帧：识别、发送结果并更新该设备的最新帧"""
+        if rgb_frame is not None:
+            bgr_frame = cv2.cvtColor(rgb_frame, cv2.COLOR_RGB2BGR)
+            if self.tracking_enabled:
+                _, class_name = self.process_frame(channel, bgr_frame, depth_frame)
+                if class_name:
+                    self.logger.info(f"[{channel.serial}] Detected: {class_name}")
+                    self.post_class_name(channel, class_name)
+            else:
+                channel.renderer.submit(bgr_frame)
+            channel.latest_rgb_frame = rgb_frame
+            channel.frames_processed += 1
+
+        if depth_frame is not None and self.config['display_window']:
+            channel.store_depth_frame(depth_frame)
+
+    def start_tracking(self):
+        """开始多设备追踪主循环"""
+        if not self.open_devices():
+            self.logger.error("Failed to open devices")
+            return
+
+        for channel in list(self.channels):
+            if not self.start_streams(channel):
+                self.logger.error(f"Failed to start streams on {channel.serial}")
+                self.__context.clsoeDevice(channel.device)
+                self.channels.remove(channel)
+        if not self.channels:
+            return
+        # 重新编号，保证轮询下标连续
+        for index, channel in enumerate(self.channels):
+            channel.index = index
+
+        self.warmup_models()
+        self.start_capture_workers()
+        self.start_inference_server()
+        scheduling = 'batched' if self.inference_server is not None else self.config['device_scheduling']
+        self.logger.info(f"Starting tracking on {len(self.channels)} devices ({scheduling} scheduling)...")
+
+        try:
+            while True:
+                if self.inference_server is not None:
+                    # 各设备由处理线程处理，主线程只负责显示
+                    displayed = self.channels
+                    time.sleep(0.01)
+                else:
+                    channel = self.step()
+                    displayed = [channel] if channel is not None else []
+
+                if self.config['display_window']:
+                    for channel in displayed:
+                        tracked_frame = channel.renderer.render()
+                        if tracked_frame is not None:
+                            cv2.imshow(f"RGB View {channel.serial}", tracked_frame)
+                        depth_view = channel.colorize_depth(self.display_colorizer)
+                        if depth_view is not None:
+                            cv2.imshow(f"Depth View {channel.serial}", depth_view)
+
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+        finally:
+            self.cleanup()
+
+    def get_latest_frame(self, device_index: int = 0, out: Optional[np.ndarray] = None) -> Any:
+        """返回指定设备的最新标注帧，默认第一台设备（兼容单设备的MJPG推流）"""
+        if device_index >= len(self.channels):
+            return None
+        return self.channels[device_index].renderer.render(out=out)
+
+    def add_viewer(self, device_index: int = 0) -> None:
+        """登记指定设备的一个观看者（如/mjpg_stream客户端），有观看者时才绘制该设备的识别结果"""
+        if device_index < len(self.channels):
+            self.channels[device_index].renderer.add_viewer()
+
+    def remove_viewer(self, device_index: int = 0) -> None:
+        if device_index < len(self.channels):
+            self.channels[device_index].renderer.remove_viewer()
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        return [channel.get_stats() for channel in self.channels]
+
+    def cleanup(self):
+        """清理资源"""
+        self.stop_channel_threads()
+        if self.inference_server is not None:
+            self.logger.info(f"Inference server stats: {self.inference_server.get_stats()}")
+            self.inference_server = None
+
+        for channel in self.channels:
+            if channel.capture_worker is not None:
+                channel.capture_worker.stop()
+            self.logger.info(f"Device {channel.serial} stats: {channel.get_stats()}")
+            channel.capture_worker = None
+            channel.device.stopStream(self._stream_flags())
+            if self.__context:
+                self.__context.clsoeDevice(channel.device)
+        self.channels = []
+
+        if self.two_stage is not None:
+            self.logger.info(f"Two-stage stats: {self.two_stage.get_stats()}")
+
+        self.logger.info(f"Model registry stats: {get_model_registry().get_stats()}")
+
+        if self.__context:
+            self.__context.destroyCamera()
+            self.__context = None
+
+        cv2.destroyAllWindows()
+
+    def toggle_rgb(self, enabled: bool):
+        """切换RGB通道状态"""
+        self.rgb_enabled = enabled
+
+    def toggle_depth(self, enabled: bool):
+        """切换深度通道状态"""
+        self.depth_enabled = enabled
+
+    def toggle_tracking(self, enabled: bool):
+        """切换追踪功能状态"""
+        self.tracking_enabled = enabled
+
+
+if __name__ == "__main__":
+    tracker = MultiDeviceTracker(
+        model_path=ROOT_DIR / "runs/detect/train8/weights/best.pt",
+        config_path=ROOT_DIR / "configs/tracker_config.yaml"
+    )
+
+    try:
+        tracker.start_tracking()
+    except KeyboardInterrupt:
+        print("Stopping tracker...")
+    finally:
+        tracker.cleanup()
@@ -1,4 +1,4 @@
-from ultralytics import YOLO
+from src.core.model_registry import load_model
 from src.core.temporal_buffer import TemporalBuffer
 from src.utils.performance_monitor import PerformanceMonitor
 import torch
@@ -7,8 +7,9 @@ import torch
 class OptimizedSignLanguageRecognizer:
     def __init__(self):
         # 1. 双流模型选择轻量级backbone
-        self.rgb_model = YOLO('yolov11m.pt')  
-        self.depth_model = YOLO('yolov11m.pt')
+        # 同一权重经模型注册表只加载一次，两个实例共享权重
+        self.rgb_model = load_model('yolov11m.pt')
+        self.depth_model = load_model('yolov11m.pt')
         
         # 2. 适度的时序缓存
         self.temporal_buffer = TemporalBuffer(
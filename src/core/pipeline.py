@@ -0,0 +1,283 @@
+import threading
+import time
+import logging
+from collections import deque
+from typing import Optional, Callable, Any, Dict, List
+
+
+# 队列满时的策略
+DROP_OLDEST = 'drop_oldest'   # 丢弃队列中最旧的一项，放入新项
+BLOCK = 'block'               # 阻塞上游直到有空位（背压）
+LATEST_ONLY = 'latest_only'   # 只保留最新一项，等价于容量为1的drop_oldest
+
+POLICIES = (DROP_OLDEST, BLOCK, LATEST_ONLY)
+
+
+class StopPipeline(Exception):
+    """阶段函数抛出该异常时停止整条流水线（例如显示窗口按下q）"""
+
+
+class StageQueue:
+    """阶段之间的有界队列"""
+
+    def __init__(self, maxsize: int = 2, policy: str = DROP_OLDEST):
+        if policy not in POLICIES:
+            raise ValueError(f"Unsupported queue policy: {policy}")
+        self.policy = policy
+        self.maxsize = 1 if policy == LATEST_ONLY else max(int(maxsize), 1)
+        self._items = deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._closed = False
+
+        # 统计信息
+        self.put_count = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def put(self, item: Any) -> bool:
+        """放入一项，队列已关闭时返回False"""
+        with self._lock:
+            if self.policy == BLOCK:
+                while len(self._items) >= self.maxsize and not self._closed:
+                    self._not_full.wait()
+            else:
+                while len(self._items) >= self.maxsize:
+                    self._items.popleft()
+                    self.dropped += 1
+            if self._closed:
+                return False
+
+            self._items.append(item)
+            self.put_count += 1
+            self.max_depth = max(self.max_depth, len(self._items))
+            self._not_empty.notify()
+            return True
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        """取出一项，超时或队列已关闭且为空时返回None"""
+        with self._lock:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not self._items:
+                if self._closed:
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._not_empty.wait(remaining)
+            item = self._items.popleft()
+            self._not_full.notify()
+            return item
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'policy': self.policy,
+                'size': self.maxsize,
+                'depth': len(self._items),
+                'max_depth': self.max_depth,
+                'put': self.put_count,
+                'dropped': self.dropped,
+            }
+
+
+class Stage:
+    """
+    流水线中的一个阶段
+
+    fn接收上游的输出并返回交给下游的对象；返回None表示本项到此为止（被过滤掉）。
+    源阶段没有上游，fn不接收参数，返回None表示本轮没有产出。
+    main_thread为True的阶段不启动线程，由Pipeline.run()在调用线程中执行（如HighGUI显示）。
+    """
+
+    def __init__(self, name: str, fn: Callable, upstream: Optional[str] = None,
+                 queue_size: int = 2, policy: str = DROP_OLDEST, workers: int = 1,
+                 main_thread: bool = False):
+        self.name = name
+        self.fn = fn
+        self.upstream = upstream
+        self.workers = max(int(workers), 1)
+        self.main_thread = main_thread
+        self.queue = None if upstream is None else StageQueue(queue_size, policy)
+        self.downstream: List['Stage'] = []
+
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.last_time = 0.0
+
+    def record(self, elapsed: float) -> None:
+        with self._lock:
+            self.processed += 1
+            self.total_time += elapsed
+            self.last_time = elapsed
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {
+                'processed': self.processed,
+                'errors': self.errors,
+                'last_ms': self.last_time * 1000,
+                'mean_ms': self.total_time / self.processed * 1000 if self.processed else 0.0,
+            }
+        if self.queue is not None:
+            stats['queue'] = self.queue.get_stats()
+        return stats
+
+
+class Pipeline:
+    """
+    分阶段的帧处理流水线
+
+    每个阶段在自己的线程中运行，阶段之间通过有界队列连接，队列策略决定下游跟不上时
+    是丢帧还是反压。一个阶段的输出会送到所有以它为上游的阶段（例如publish和display
+    都接在postprocess之后），下游共享同一个对象，应当只读。
+    cv2.imshow/waitKey等非线程安全的调用放在main_thread阶段，由run()的调用线程执行。
+
+        pipeline = Pipeline('BerxelTracker')
+        pipeline.add_stage('capture', capture_fn)
+        pipeline.add_stage('infer', infer_fn, policy=LATEST_ONLY)
+        pipeline.add_stage('publish', publish_fn, upstream='infer')
+        pipeline.add_stage('display', display_fn, upstream='infer', policy=LATEST_ONLY, main_thread=True)
+        pipeline.run()
+    """
+
+    def __init__(self, name: str = 'Pipeline', poll_interval: float = 0.1):
+        self.name = name
+        self.poll_interval = poll_interval
+        self.logger = logging.getLogger(name)
+        self.stages: Dict[str, Stage] = {}
+        self._order: List[str] = []
+        self._threads: List[threading.Thread] = []
+        self._stop_event = threading.Event()
+
+    def add_stage(self, name: str, fn: Callable, upstream: Optional[str] = None,
+                  queue_size: int = 2, policy: str = DROP_OLDEST, workers: int = 1,
+                  main_thread: bool = False) -> Stage:
+        """
+        添加阶段
+
+        Args:
+            upstream: 上游阶段名，缺省时接在上一个添加的阶段之后；第一个阶段为源阶段
+            queue_size: 输入队列容量
+            policy: 输入队列策略 drop_oldest / block / latest_only
+            workers: 并行worker数，大于1时不保证输出顺序
+            main_thread: 在run()的调用线程中执行（只能是单worker的非源阶段）
+        """
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage name: {name}")
+        if upstream is None and self._order:
+            upstream = self._order[-1]
+        if upstream is not None and upstream not in self.stages:
+            raise ValueError(f"Unknown upstream stage: {upstream}")
+        if main_thread and (upstream is None or workers > 1):
+            raise ValueError(f"Main-thread stage '{name}' needs an upstream and a single worker")
+
+        stage = Stage(name, fn, upstream, queue_size, policy, workers, main_thread)
+        if upstream is not None:
+            self.stages[upstream].downstream.append(stage)
+        self.stages[name] = stage
+        self._order.append(name)
+        return stage
+
+    def _emit(self, stage: Stage, item: Any) -> None:
+        for consumer in stage.downstream:
+            consumer.queue.put(item)
+
+    def _call(self, stage: Stage, *args) -> Any:
+        start = time.monotonic()
+        try:
+            result = stage.fn(*args)
+        except StopPipeline:
+            self.stop()
+            return None
+        except Exception as e:
+            stage.errors += 1
+            self.logger.exception(f"Stage '{stage.name}' failed: {e}")
+            return None
+        stage.record(time.monotonic() - start)
+        return result
+
+    def _run_source(self, stage: Stage) -> None:
+        while not self._stop_event.is_set():
+            item = self._call(stage)
+            if item is not None:
+                self._emit(stage, item)
+            # 等待下一项时不再引用本项：数据可能是帧租约的视图，设备关闭前要能归还
+            item = None
+
+    def _run_stage(self, stage: Stage) -> None:
+        while not self._stop_event.is_set():
+            self._step_stage(stage, self.poll_interval)
+
+    def _step_stage(self, stage: Stage, timeout: float) -> None:
+        """处理一项输入；本项只在函数内引用，等待下一项时不再持有"""
+        item = stage.queue.get(timeout)
+        if item is None:
+            return
+        result = self._call(stage, item)
+        if result is not None:
+            self._emit(stage, result)
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop_event.clear()
+        for name in self._order:
+            stage = self.stages[name]
+            if stage.main_thread:
+                continue
+            target = self._run_source if stage.upstream is None else self._run_stage
+            for index in range(stage.workers):
+                thread = threading.Thread(target=target, args=(stage,),
+                                          name=f"{self.name}-{name}-{index}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        for stage in self.stages.values():
+            if stage.queue is not None:
+                stage.queue.close()
+
+    def join(self, timeout: float = 2.0) -> None:
+        current = threading.current_thread()
+        for thread in self._threads:
+            if thread is not current:
+                thread.join(timeout)
+        self._threads = []
+
+    def is_running(self) -> bool:
+        return not self._stop_event.is_set()
+
+    def run(self) -> None:
+        """启动所有阶段并阻塞到流水线停止（StopPipeline或Ctrl+C），期间在调用线程中执行main_thread阶段"""
+        self.start()
+        sinks = [stage for stage in self.stages.values() if stage.main_thread]
+        try:
+            if not sinks:
+                while not self._stop_event.wait(self.poll_interval):
+                    pass
+            while not self._stop_event.is_set():
+                for stage in sinks:
+                    self._step_stage(stage, self.poll_interval / len(sinks))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+            self.join()
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: self.stages[name].get_stats() for name in self._order}
@@ -0,0 +1,328 @@
+import time
+import queue
+import atexit
+import logging
+import threading
+import itertools
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait as wait_connections
+from typing import Optional, Dict, Any, List, Tuple
+
+import numpy as np
+
+from src.core.inference_backend import (InferenceBackend, DetectionBoxes, DetectionResult,
+                                        create_inference_backend, to_numpy)
+from src.core.inference_server import InferenceRequest
+
+
+def _slot_view(buffer, slot: int, slot_bytes: int, shape: Tuple[int, ...]) -> np.ndarray:
+    """共享内存中某个槽位上按shape解释的uint8数组（不拷贝）"""
+    return np.ndarray(shape, dtype=np.uint8, buffer=buffer, offset=slot * slot_bytes)
+
+
+def _worker_main(index: int, model_path: str, backend: str, options: Dict[str, Any], tasks, results) -> None:
+    """
+    推理进程入口
+
+    加载模型后报告类别名和输入通道数，主进程据此分配共享内存，任务队列的第一条消息为
+    (共享内存名, 槽位字节数)。之后的任务为 (请求id, 槽位, 帧形状, predict参数)，帧直接从共享内存
+    槽位读取；只把类别、置信度和检测框经本进程的结果管道发回主进程。
+    """
+    try:
+        model = create_inference_backend(model_path, backend, options)
+    except Exception as e:
+        results.send(('failed', index, repr(e)))
+        return
+    results.send(('ready', index, dict(model.names), model.dynamic_imgsz, model.channels, model.input_size))
+
+    attach = tasks.get()
+    if attach is None:
+        return
+    shm_name, slot_bytes = attach
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            request_id, slot, shape, kwargs = task
+            start = time.perf_counter()
+            try:
+                frame = _slot_view(shm.buf, slot, slot_bytes, shape)
+                boxes = model.predict(frame, **kwargs)[0].boxes
+                results.send(('result', index, request_id, slot,
+                              to_numpy(boxes.xyxy).reshape(-1, 4), to_numpy(boxes.conf).ravel(),
+                              to_numpy(boxes.cls).ravel(), (time.perf_counter() - start) * 1000))
+            except Exception as e:
+                results.send(('error', index, request_id, slot, repr(e)))
+            # 不再引用共享内存视图，退出时才能关闭共享内存
+            frame = None
+    finally:
+        try:
+            shm.close()
+        except BufferError:
+            pass
+
+
+class ProcessPoolBackend(InferenceBackend):
+    """
+    在独立进程中推理的后端
+
+    采集、JPEG编码和Flask/SocketIO都在主进程里争用GIL；该后端启动workers个推理进程，
+    每个进程各自加载模型。帧写入multiprocessing.shared_memory中的环形槽位，推理进程
+    直接以NumPy视图读取，队列里只传槽位号和检测结果（类别、置信度、检测框）。
+    空闲槽位用完时submit()阻塞，形成背压。请求派发给在途请求最少的进程；进程意外退出时，
+    派发给它的请求以错误结束并收回槽位，predict()等待结果也有超时，不会永久阻塞。
+
+    对外接口与其他后端一致，可由ModelRegistry分发；多个线程并发调用时请求分散到各进程并行执行。
+    推理进程之间不共享跟踪器状态，track()等同于predict()。
+    """
+
+    def __init__(self, model_path: str, backend: str = 'ultralytics',
+                 options: Optional[Dict[str, Any]] = None,
+                 workers: int = 2,
+                 slots: int = 0,
+                 max_frame_shape: Tuple[int, int] = (1080, 1920),
+                 start_timeout: float = 120.0,
+                 request_timeout: float = 30.0):
+        """
+        Args:
+            model_path / backend / options: 同create_inference_backend，由各推理进程加载
+            workers: 推理进程数
+            slots: 共享内存槽位数，0表示 2 * workers
+            max_frame_shape: 单帧最大 (H, W)，按模型输入通道数（3或4通道RGB-D）的uint8分配槽位
+            start_timeout: 等待所有进程加载完模型的时间
+            request_timeout: predict()/predict_batch()等待结果的最长时间，超时抛出TimeoutError
+        """
+        self.logger = logging.getLogger('ProcessPoolBackend')
+        self.model_path = str(model_path)
+        self.workers = max(int(workers), 1)
+        self.num_slots = slots or 2 * self.workers
+        self.request_timeout = request_timeout
+        # 槽位大小取决于模型输入通道数，推理进程加载完模型后才分配共享内存
+        self.slot_bytes = 0
+        self._shm = None
+        self._free_slots = queue.Queue()
+        for slot in range(self.num_slots):
+            self._free_slots.put(slot)
+
+        # spawn：不继承主进程的线程和已加载的模型
+        context = mp.get_context('spawn')
+        # 每个进程一个任务队列，主进程知道每个请求派发给了哪个进程
+        self._tasks = [context.Queue() for _ in range(self.workers)]
+        # 每个进程一条结果管道：写端只有一个进程，不需要跨进程的锁，某个进程在发送中途退出
+        # 不会卡住其他进程；进程退出后读端收到EOF
+        pipes = [context.Pipe(duplex=False) for _ in range(self.workers)]
+        self._results = [reader for reader, _ in pipes]
+        # 请求id -> (请求, 槽位, 推理进程序号)
+        self._pending: Dict[int, Tuple[InferenceRequest, int, int]] = {}
+        self._in_flight = [0] * self.workers
+        self._dead = set()
+        self._pending_lock = threading.Lock()
+        self._ids = itertools.count()
+        self._closed = False
+
+        # 统计信息
+        self.requests = 0
+        self.errors = 0
+        self.worker_requests = [0] * self.workers
+        self._worker_time = 0.0
+        self._round_trip = 0.0
+
+        self._processes = [
+            context.Process(target=_worker_main, name=f'InferenceWorker-{index}', daemon=True,
+                            args=(index, self.model_path, backend, dict(options or {}),
+                                  self._tasks[index], pipes[index][1]))
+            for index in range(self.workers)
+        ]
+        for process in self._processes:
+            process.start()
+        for _, writer in pipes:
+            writer.close()
+        atexit.register(self.close)
+
+        try:
+            self._wait_ready(start_timeout)
+        except Exception:
+            self.close()
+            raise
+
+        self.slot_bytes = int(max_frame_shape[0]) * int(max_frame_shape[1]) * self.channels
+        self._shm = shared_memory.SharedMemory(create=True, size=self.num_slots * self.slot_bytes)
+        for tasks in self._tasks:
+            tasks.put((self._shm.name, self.slot_bytes))
+
+        self._collector = threading.Thread(target=self._collect, name='InferencePoolCollector', daemon=True)
+        self._collector.start()
+        self.logger.info(f"Started {self.workers} inference workers for {self.model_path} "
+                         f"({self.num_slots} shared slots of {self.slot_bytes / 1e6:.1f} MB)")
+
+    def _wait_ready(self, timeout: float) -> None:
+        """等待所有推理进程加载完模型，取得类别名"""
+        self.names: Dict[int, str] = {}
+        self._dynamic_imgsz = False
+        deadline = time.monotonic() + timeout
+        for index, results in enumerate(self._results):
+            if not results.poll(max(deadline - time.monotonic(), 0.1)):
+                raise TimeoutError(f"inference workers did not start within {timeout:.0f} s")
+            try:
+                message = results.recv()
+            except EOFError:
+                raise RuntimeError(f"inference worker {index} exited while loading {self.model_path}")
+            if message[0] == 'failed':
+                raise RuntimeError(f"inference worker {message[1]} failed to load {self.model_path}: {message[2]}")
+            _, _, self.names, self._dynamic_imgsz, self.channels, self.input_size = message
+
+    @property
+    def dynamic_imgsz(self) -> bool:
+        return self._dynamic_imgsz
+
+    def _fail_worker(self, index: int) -> None:
+        """意外退出的推理进程：派发给它的请求以错误结束，收回槽位，之后不再向它派发"""
+        with self._pending_lock:
+            if index in self._dead:
+                return
+            self._dead.add(index)
+            lost = [request_id for request_id, entry in self._pending.items() if entry[2] == index]
+            lost = [self._pending.pop(request_id) for request_id in lost]
+            self._in_flight[index] = 0
+        self.logger.error(f"Inference worker {index} exited, failing {len(lost)} in-flight requests")
+        for request, slot, _ in lost:
+            self.errors += 1
+            self._free_slots.put(slot)
+            request._complete(error=RuntimeError(f"inference worker {index} exited"))
+
+    def _collect(self) -> None:
+        """接收推理进程发回的结果，释放槽位并唤醒等待的请求；检查推理进程是否存活"""
+        connections = {results: index for index, results in enumerate(self._results)}
+        last_check = time.monotonic()
+        while not self._closed:
+            try:
+                ready = wait_connections(list(connections), timeout=0.5)
+            except OSError:
+                return
+            for results in ready:
+                try:
+                    message = results.recv()
+                except (EOFError, OSError):
+                    # 写端随进程退出关闭
+                    index = connections.pop(results)
+                    if not self._closed:
+                        self._fail_worker(index)
+                    continue
+                self._complete(message)
+
+            # 结果持续到达时也定期检查，进程被杀死时管道EOF之外的兜底
+            if time.monotonic() - last_check >= 0.5:
+                last_check = time.monotonic()
+                for index, process in enumerate(self._processes):
+                    if not self._closed and not process.is_alive():
+                        self._fail_worker(index)
+
+    def _complete(self, message) -> None:
+        """处理一条推理结果：释放槽位，唤醒等待的请求"""
+        kind, index, request_id = message[:3]
+        with self._pending_lock:
+            entry = self._pending.pop(request_id, None)
+            if entry is not None:
+                self._in_flight[entry[2]] -= 1
+        # 已按进程退出处理过的请求，槽位已经收回
+        if entry is None:
+            return
+        request, slot, _ = entry
+        self._free_slots.put(slot)
+
+        if kind == 'error':
+            self.errors += 1
+            request._complete(error=RuntimeError(f"inference worker {index}: {message[4]}"))
+            return
+        xyxy, conf, cls, worker_ms = message[4:]
+        self.requests += 1
+        self.worker_requests[index] += 1
+        self._worker_time += worker_ms
+        self._round_trip += time.monotonic() - request.submit_time
+        request._complete([DetectionResult(request.frame, DetectionBoxes(xyxy, conf, cls), self.names)])
+
+    def submit(self, frame: np.ndarray, **kwargs) -> InferenceRequest:
+        """把帧写入空闲槽位并派发给推理进程，立即返回请求"""
+        request = InferenceRequest(frame)
+        if self._closed:
+            request._complete(error=RuntimeError("inference pool is closed"))
+            return request
+        if frame.dtype != np.uint8 or frame.nbytes > self.slot_bytes:
+            raise ValueError(f"frame {frame.shape} {frame.dtype} does not fit a shared slot "
+                             f"({self.slot_bytes} bytes of uint8)")
+
+        while True:
+            try:
+                slot = self._free_slots.get(timeout=0.5)
+                break
+            except queue.Empty:
+                if self._closed or not any(process.is_alive() for process in self._processes):
+                    request._complete(error=RuntimeError("inference pool is not running"))
+                    return request
+        np.copyto(_slot_view(self._shm.buf, slot, self.slot_bytes, frame.shape), frame)
+        request_id = next(self._ids)
+        with self._pending_lock:
+            alive = [index for index in range(self.workers) if index not in self._dead]
+            worker = min(alive, key=self._in_flight.__getitem__) if alive else None
+            if worker is not None:
+                self._pending[request_id] = (request, slot, worker)
+                self._in_flight[worker] += 1
+        if worker is None:
+            self._free_slots.put(slot)
+            request._complete(error=RuntimeError("inference pool is not running"))
+            return request
+        self._tasks[worker].put((request_id, slot, frame.shape, kwargs))
+        return request
+
+    def predict(self, frame: np.ndarray, **kwargs) -> List[DetectionResult]:
+        return self.submit(frame, **kwargs).result(self.request_timeout)
+
+    def track(self, frame: np.ndarray, persist: bool = True, **kwargs) -> List[DetectionResult]:
+        return self.predict(frame, **kwargs)
+
+    def predict_batch(self, frames: List[np.ndarray], **kwargs) -> List[DetectionResult]:
+        """整批帧同时派发，由各推理进程并行处理"""
+        requests = [self.submit(frame, **kwargs) for frame in frames]
+        deadline = time.monotonic() + self.request_timeout
+        return [request.result(max(deadline - time.monotonic(), 0.0))[0] for request in requests]
+
+    def warmup(self, runs: int = 1, shape: Tuple[int, int] = (480, 640)) -> None:
+        # 一次派发workers张，让每个进程都完成首帧初始化
+        frames = [np.zeros((shape[0], shape[1], self.channels), dtype=np.uint8)] * self.workers
+        for _ in range(runs):
+            self.predict_batch(frames, verbose=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'workers': self.workers,
+            'alive': sum(process.is_alive() for process in self._processes),
+            'in_flight': list(self._in_flight),
+            'requests': self.requests,
+            'errors': self.errors,
+            'worker_requests': list(self.worker_requests),
+            'slots_in_use': self.num_slots - self._free_slots.qsize(),
+            'worker_ms': self._worker_time / self.requests if self.requests else 0.0,
+            'round_trip_ms': self._round_trip / self.requests * 1000 if self.requests else 0.0,
+        }
+
+    def close(self, timeout: float = 2.0) -> None:
+        """停止推理进程并释放共享内存"""
+        if self._closed:
+            return
+        self._closed = True
+        for tasks in self._tasks:
+            tasks.put(None)
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        with self._pending_lock:
+            pending, self._pending = list(self._pending.values()), {}
+        for request, _, _ in pending:
+            request._complete(error=RuntimeError("inference pool is closed"))
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
@@ -1,26 +1,170 @@
 import torch
 import numpy as np
-from collections import deque
+
+
+WINDOW = 'window'
+EMA = 'ema'
+
+
+def _as_array(features):
+    """
+    View features as a numpy array without copying where possible.
+
+    :param features: numpy array, CPU/GPU torch tensor or array-like
+    :return: numpy array
+    """
+    if hasattr(features, 'detach'):
+        features = features.detach().cpu().numpy()
+    return np.asarray(features)
+
+
+class _RunningStream:
+    """
+    Running statistics of one feature stream over a preallocated (N, ...) ring array.
+
+    The ring and all accumulators are allocated once, on the first frame. Appending a
+    frame writes it into the oldest slot and updates the running sums in place, so
+    update, eviction and queries cost O(feature size) and allocate nothing. Sums are
+    kept in float64 so subtracting evicted frames does not drift.
+    """
+
+    def __init__(self, capacity, shape, mode=WINDOW, decay=0.9, track_variance=False):
+        """
+        :param capacity: Number of frames kept by the ring (window mode)
+        :param shape: Shape of one feature frame
+        :param mode: 'window' for a sliding-window mean, 'ema' for an exponential moving average
+        :param decay: Weight of the previous average in ema mode
+        :param track_variance: Also keep the running sum of squares (window) or EW variance (ema)
+        """
+        self.capacity = capacity
+        self.shape = tuple(shape)
+        self.mode = mode
+        self.decay = decay
+        self.track_variance = track_variance
+        self.count = 0
+        self._head = 0
+
+        # The ring is only needed to know what leaves the window
+        self._ring = np.empty((capacity,) + self.shape, dtype=np.float32) if mode == WINDOW else None
+        self._sum = np.zeros(self.shape, dtype=np.float64)
+        self._sum_sq = np.zeros(self.shape, dtype=np.float64) if track_variance else None
+        self._scratch = np.empty(self.shape, dtype=np.float64)
+        self._mean = np.empty(self.shape, dtype=np.float32)
+        self._variance = np.empty(self.shape, dtype=np.float32) if track_variance else None
+
+    @property
+    def nbytes(self):
+        arrays = (self._ring, self._sum, self._sum_sq, self._scratch, self._mean, self._variance)
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    @property
+    def frame_nbytes(self):
+        return int(np.prod(self.shape)) * np.dtype(np.float32).itemsize
+
+    def append(self, features):
+        if self.mode == EMA:
+            self._append_ema(features)
+            return
+
+        slot = self._ring[self._head]
+        if self.count == self.capacity:
+            # Evict the oldest frame before its slot is overwritten; squares are taken in
+            # float64 (a float32 square rounds away the variance of large features)
+            np.subtract(self._sum, slot, out=self._sum)
+            if self._sum_sq is not None:
+                np.multiply(slot, slot, out=self._scratch, dtype=np.float64)
+                np.subtract(self._sum_sq, self._scratch, out=self._sum_sq)
+        else:
+            self.count += 1
+
+        np.copyto(slot, features, casting='unsafe')
+        np.add(self._sum, slot, out=self._sum)
+        if self._sum_sq is not None:
+            np.multiply(slot, slot, out=self._scratch, dtype=np.float64)
+            np.add(self._sum_sq, self._scratch, out=self._sum_sq)
+        self._head = (self._head + 1) % self.capacity
+
+    def _append_ema(self, features):
+        """_sum holds the EMA and _sum_sq the exponentially weighted variance."""
+        if self.count == 0:
+            np.copyto(self._sum, features, casting='unsafe')
+            if self._sum_sq is not None:
+                self._sum_sq.fill(0.0)
+            self.count = 1
+            return
+
+        alpha = 1.0 - self.decay
+        # diff = x - mean; mean += alpha * diff; var = decay * (var + alpha * diff^2)
+        np.subtract(features, self._sum, out=self._scratch, casting='unsafe')
+        self._scratch *= alpha
+        self._sum += self._scratch
+        if self._sum_sq is not None:
+            # alpha * diff^2 == (alpha * diff)^2 / alpha
+            np.square(self._scratch, out=self._scratch)
+            self._scratch *= 1.0 / alpha
+            self._sum_sq += self._scratch
+            self._sum_sq *= self.decay
+        self.count += 1
+
+    def mean(self):
+        if self.mode == EMA:
+            np.copyto(self._mean, self._sum, casting='unsafe')
+        else:
+            np.multiply(self._sum, 1.0 / self.count, out=self._mean, casting='unsafe')
+        return self._mean
+
+    def variance(self):
+        if self.mode == EMA:
+            np.copyto(self._variance, self._sum_sq, casting='unsafe')
+            return self._variance
+        # (sum_sq - sum^2 / n) / n in float64, clipped at 0 against rounding; features
+        # with a large mean cancel badly, so only the final result is cast to float32
+        np.square(self._sum, out=self._scratch)
+        self._scratch *= 1.0 / self.count
+        np.subtract(self._sum_sq, self._scratch, out=self._scratch)
+        self._scratch *= 1.0 / self.count
+        np.maximum(self._scratch, 0.0, out=self._scratch)
+        np.copyto(self._variance, self._scratch, casting='unsafe')
+        return self._variance
+
 
 class TemporalBuffer:
-    def __init__(self, buffer_size=15, max_memory_usage='5GB'):
+    def __init__(self, buffer_size=15, max_memory_usage='5GB', mode=WINDOW, decay=0.9, track_variance=False):
         """
         Initialize the Temporal Buffer to store frames and control memory usage.
 
+        Each stream (RGB and depth) keeps its frames in a preallocated ring array with
+        running sums, allocated on the first update once the feature shape is known.
+        The ring holds buffer_size frames, or fewer if that would exceed max_memory_usage.
+        Features with a different shape reset the buffer.
+
         :param buffer_size: The number of frames to store in the buffer
         :param max_memory_usage: Maximum memory usage for the buffer (as string, e.g., '2GB')
+        :param mode: 'window' averages the last buffer_size frames, 'ema' keeps an
+                     exponential moving average instead (no frames stored)
+        :param decay: Weight of the previous average in 'ema' mode
+        :param track_variance: Also track the per-element variance (get_feature_variance)
         """
+        if mode not in (WINDOW, EMA):
+            raise ValueError(f"Unsupported temporal buffer mode: {mode}")
+        if mode == EMA and not 0.0 <= decay < 1.0:
+            raise ValueError(f"EMA decay must be in [0, 1), got {decay}")
 
         self.buffer_size = buffer_size
         self.max_memory_usage = self._parse_memory_limit(max_memory_usage)
-        self.buffer = deque(maxlen=buffer_size)  # FIFO buffer for frames
-        self.current_memory_usage = 0  # Track memory usage
+        self.mode = mode
+        self.decay = decay
+        self.track_variance = track_variance
+        self.capacity = buffer_size
+        self.current_memory_usage = 0  # Memory of the stored frames in MB
         self.frame_size = None  # Frame size will be determined dynamically
+        self._rgb = None
+        self._depth = None
 
     def _parse_memory_limit(self, memory_str):
         """
         Parse the memory limit from a string (e.g., '2GB' -> 2 * 1024MB)
-        
+
         :param memory_str: Memory limit string like '2GB'
         :return: Parsed memory in MB
         """
@@ -30,65 +174,79 @@ class TemporalBuffer:
             return int(memory_str.replace('MB', ''))
         return 0  # Default to no limit
 
-    def _estimate_frame_memory(self, frame):
+    def _allocate(self, rgb, depth):
         """
-        Estimate the memory usage of a single frame.
-        
-        :param frame: The frame to estimate memory for
-        :return: Estimated memory usage in MB
+        Allocate both rings for the given feature shapes, capped by the memory limit.
+
+        :param rgb: First RGB feature frame
+        :param depth: First depth feature frame
         """
-        frame_tensor = torch.tensor(frame)
-        return frame_tensor.element_size() * frame_tensor.numel() / 1024**2  # In MB
+        frame_bytes = (rgb.size + depth.size) * np.dtype(np.float32).itemsize
+        self.capacity = self.buffer_size
+        if self.max_memory_usage and frame_bytes:
+            self.capacity = max(min(self.buffer_size, int(self.max_memory_usage * 1024**2 // frame_bytes)), 1)
+        self._rgb = _RunningStream(self.capacity, rgb.shape, self.mode, self.decay, self.track_variance)
+        self._depth = _RunningStream(self.capacity, depth.shape, self.mode, self.decay, self.track_variance)
+        self.frame_size = rgb.shape
 
     def update(self, rgb_features, depth_features):
         """
         Update the buffer with new features (RGB and Depth).
-        
+
         :param rgb_features: RGB features from the YOLO model
         :param depth_features: Depth features from the YOLO model
         """
-        # Estimate the memory of the incoming frame features
-        rgb_memory = self._estimate_frame_memory(rgb_features)
-        depth_memory = self._estimate_frame_memory(depth_features)
-        
-        # Check if adding the new frame will exceed memory limit
-        total_memory = self.current_memory_usage + rgb_memory + depth_memory
-        if total_memory > self.max_memory_usage:
-            self._drop_old_frames(rgb_memory + depth_memory)
-
-        # Add frames to the buffer
-        self.buffer.append((rgb_features, depth_features))
-        self.current_memory_usage += rgb_memory + depth_memory
-
-        # Track frame size for future memory estimations
-        if self.frame_size is None:
-            self.frame_size = rgb_features.shape  # Assuming rgb_features and depth_features have the same shape
-
-    def _drop_old_frames(self, memory_to_free):
-        """
-        Drop old frames from the buffer to free memory.
-        
-        :param memory_to_free: The amount of memory to free in MB
-        """
-        while self.current_memory_usage + memory_to_free > self.max_memory_usage:
-            old_rgb, old_depth = self.buffer.popleft()
-            self.current_memory_usage -= self._estimate_frame_memory(old_rgb)
-            self.current_memory_usage -= self._estimate_frame_memory(old_depth)
+        rgb = _as_array(rgb_features)
+        depth = _as_array(depth_features)
+        if self._rgb is None or self._rgb.shape != rgb.shape or self._depth.shape != depth.shape:
+            self._allocate(rgb, depth)
+
+        self._rgb.append(rgb)
+        self._depth.append(depth)
+        if self.mode == WINDOW:
+            self.current_memory_usage = len(self) * (self._rgb.frame_nbytes + self._depth.frame_nbytes) / 1024**2
+
+    def __len__(self):
+        """Number of frames in the window, or frames seen so far in 'ema' mode."""
+        return 0 if self._rgb is None else self._rgb.count
+
+    @property
+    def nbytes(self):
+        """Exact size in bytes of all preallocated arrays (rings and accumulators)."""
+        if self._rgb is None:
+            return 0
+        return self._rgb.nbytes + self._depth.nbytes
+
+    def clear(self):
+        """Drop all frames; the arrays are allocated again on the next update."""
+        self._rgb = None
+        self._depth = None
+        self.current_memory_usage = 0
+        self.frame_size = None
 
     def get_averaged_features(self):
         """
         Return the averaged features of all frames in the buffer.
-        
+
+        The returned tensors share memory with the buffer and are overwritten by the
+        next query; clone them to keep a copy.
+
         :return: Averaged RGB and Depth features
         """
-        if len(self.buffer) == 0:
+        if len(self) == 0:
+            return None, None
+        return torch.from_numpy(self._rgb.mean()), torch.from_numpy(self._depth.mean())
+
+    def get_feature_variance(self):
+        """
+        Return the per-element variance of the RGB and Depth features in the buffer.
+
+        Requires track_variance=True; the returned tensors are reused like the averages.
+
+        :return: Variance of RGB and Depth features
+        """
+        if not self.track_variance:
+            raise ValueError("TemporalBuffer was created without track_variance")
+        if len(self) == 0:
             return None, None
-        
-        rgb_frames = torch.stack([torch.tensor(rgb) for rgb, _ in self.buffer])
-        depth_frames = torch.stack([torch.tensor(depth) for _, depth in self.buffer])
-        
-        # Return the average features across the buffer
-        averaged_rgb = rgb_frames.mean(dim=0)
-        averaged_depth = depth_frames.mean(dim=0)
-        
-        return averaged_rgb, averaged_depth
+        return torch.from_numpy(self._rgb.variance()), torch.from_numpy(self._depth.variance())
@@ -66,6 +66,9 @@ def setup_training_config(project_root: Path, dataset_type: str, logger: logging
             20: 'v', 21: 'w', 22: 'x', 23: 'y'
         }
     }
+    if dataset_type == 'rgbd':
+        # 早期融合：B、G、R、深度4通道输入
+        data_config['channels'] = 4
     
     # 保存数据配置
     try:
@@ -112,12 +115,28 @@ def setup_training_config(project_root: Path, dataset_type: str, logger: logging
 
 def parse_args():
     """解析命令行参数"""
-    parser = argparse.ArgumentParser(description='Train YOLO model on RGB or Depth dataset')
+    parser = argparse.ArgumentParser(description='Train YOLO model on RGB, Depth or fused RGB-D dataset')
     parser.add_argument('--dataset', 
                        type=str, 
-                       choices=['rgb', 'depth'],
+                       choices=['rgb', 'depth', 'rgbd'],
                        default='rgb',
-                       help='选择训练数据集类型 (rgb 或 depth)')
+                       help='选择训练数据集类型 (rgb、depth 或早期融合的4通道 rgbd)')
+    parser.add_argument('--quantize',
+                       action='store_true',
+                       help='导出后生成INT8量化模型并与FP32对比mAP和CPU延迟')
+    parser.add_argument('--depth-raw',
+                       type=str,
+                       default=None,
+                       help='DataCollector采集的原始数据集目录：depth时把16位深度图按固定范围查表上色生成dataset/depth，'
+                            'rgbd时把RGB图与深度图配对合成4通道图像生成dataset/rgbd')
+    parser.add_argument('--compare-fusion',
+                       nargs=2,
+                       metavar=('RGB_MODEL', 'DEPTH_MODEL'),
+                       default=None,
+                       help='rgbd训练完成后，在--depth-raw的test划分上与双模型（RGB、深度权重）比较准确率和单帧延迟')
+    parser.add_argument('--crop-classifier',
+                       action='store_true',
+                       help='从YOLO标注生成手部裁剪数据集并训练两阶段识别用的分类器')
     return parser.parse_args()
 
 def main():
@@ -140,6 +159,13 @@ def main():
         
         # 初始化训练器
         trainer = ModelTrainer(config_paths['model_config'])
+
+        if dataset_type == 'depth' and args.depth_raw:
+            logger.info(f"Colorizing raw depth images from {args.depth_raw}...")
+            trainer.prepare_depth_dataset(args.depth_raw)
+        elif dataset_type == 'rgbd' and args.depth_raw:
+            logger.info(f"Fusing RGB and depth pairs from {args.depth_raw}...")
+            trainer.prepare_rgbd_dataset(args.depth_raw)
         
         # 训练流程
         logger.info("Initializing model...")
@@ -153,6 +179,22 @@ def main():
         
         logger.info("Exporting model to ONNX format...")
         trainer.export_model('onnx')
+
+        if args.quantize:
+            logger.info("Quantizing model to INT8...")
+            report = trainer.quantize_model()
+            logger.info(f"Quantization report: {report}")
+
+        if args.compare_fusion:
+            if dataset_type != 'rgbd' or not args.depth_raw:
+                raise ValueError("--compare-fusion requires --dataset rgbd and --depth-raw")
+            logger.info("Comparing early fusion with the two-model tracker...")
+            report = trainer.compare_fusion(args.depth_raw, *args.compare_fusion)
+            logger.info(f"Fusion comparison report: {report}")
+
+        if args.crop_classifier:
+            logger.info("Training crop classifier for two-stage recognition...")
+            trainer.train_crop_classifier()
         
         logger.info("Training process completed successfully")
         
@@ -0,0 +1,236 @@
+import time
+import logging
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple
+
+import cv2
+import numpy as np
+
+from src.core.inference_backend import DetectionBoxes, DetectionResult, OnnxRuntimeBackend, to_numpy
+from src.core.model_registry import load_model
+from src.utils.depth_units import DEFAULT_DEPTH_PIXEL_TYPE, depth_to_mm
+
+
+def square_crop_box(box, padding: float, width: int, height: int) -> Tuple[int, int, int, int]:
+    """
+    以检测框中心取边长为 max(w, h) * (1 + 2 * padding) 的正方形区域并裁剪到图像范围内
+
+    训练数据（ModelTrainer.prepare_crop_dataset）和运行时使用同一套裁剪规则。
+    """
+    x1, y1, x2, y2 = (float(v) for v in box[:4])
+    cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+    half = max(x2 - x1, y2 - y1) * (1 + 2 * padding) / 2
+    left, top = int(max(cx - half, 0)), int(max(cy - half, 0))
+    right, bottom = int(min(cx + half, width)), int(min(cy + half, height))
+    return left, top, max(right, left + 1), max(bottom, top + 1)
+
+
+def crop_to_buffer(frame: np.ndarray, crop_box: Tuple[int, int, int, int], out: np.ndarray) -> np.ndarray:
+    """把裁剪区域缩放到预分配的 (S, S, 3) 缓冲区"""
+    x1, y1, x2, y2 = crop_box
+    return cv2.resize(frame[y1:y2, x1:x2], (out.shape[1], out.shape[0]), dst=out,
+                      interpolation=cv2.INTER_LINEAR)
+
+
+class DepthHandLocator:
+    """
+    基于深度图的手部定位
+
+    手势识别时手通常是离相机最近的物体：取最近有效深度之后band_mm以内的像素，
+    最大连通区域的外接框即为手的位置。要求深度图与彩色图已配准（尺寸不同时按比例换算坐标）。
+    原始深度值先按深度像素格式换算为毫米再与阈值比较。
+    """
+
+    def __init__(self, band_mm: float = 150, min_mm: float = 200, max_mm: float = 1500,
+                 min_area: int = 400, step: int = 4, pixel_type: int = DEFAULT_DEPTH_PIXEL_TYPE):
+        self.band_mm = band_mm
+        self.min_mm = min_mm
+        self.max_mm = max_mm
+        self.min_area = min_area
+        self.step = max(int(step), 1)
+        self.pixel_type = pixel_type
+        self._small_mm = None
+
+    def set_depth_pixel_type(self, pixel_type: int) -> None:
+        """设置深度流的像素格式（BerxelHawkPixelType），由追踪器在启动数据流后调用"""
+        self.pixel_type = pixel_type
+
+    def locate(self, frame: np.ndarray, depth_frame: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        if depth_frame is None:
+            return None
+        raw = depth_frame[::self.step, ::self.step]
+        if self._small_mm is None or self._small_mm.shape != raw.shape:
+            self._small_mm = np.empty(raw.shape, dtype=np.float32)
+        small = depth_to_mm(raw, self.pixel_type, out=self._small_mm)
+        valid = (small >= self.min_mm) & (small <= self.max_mm)
+        if not valid.any():
+            return None
+
+        # 取1%分位数作为最近深度，避开零星的噪点
+        nearest = np.percentile(small[valid], 1)
+        mask = (valid & (small <= nearest + self.band_mm)).astype(np.uint8)
+        count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        if count <= 1:
+            return None
+        index = 1 + int(np.argmax(stats[1:, cv2.CC_STAT_AREA]))
+        if stats[index, cv2.CC_STAT_AREA] * self.step * self.step < self.min_area:
+            return None
+
+        x, y, w, h = stats[index, :4] * self.step
+        scale_x = frame.shape[1] / depth_frame.shape[1]
+        scale_y = frame.shape[0] / depth_frame.shape[0]
+        return np.array([x * scale_x, y * scale_y, (x + w) * scale_x, (y + h) * scale_y], dtype=np.float32)
+
+
+class DetectorHandLocator:
+    """用低输入分辨率的检测器定位手部，只取置信度最高的框，类别交给裁剪分类器"""
+
+    def __init__(self, detector, imgsz: int = 320):
+        self.detector = detector
+        self.imgsz = imgsz
+
+    def locate(self, frame: np.ndarray, depth_frame: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        # ONNX Runtime后端的输入尺寸在导出时确定，会忽略imgsz
+        results = self.detector.predict(frame, imgsz=self.imgsz, verbose=False)
+        boxes = results[0].boxes
+        if len(boxes) == 0:
+            return None
+        conf = to_numpy(boxes.conf).ravel()
+        return to_numpy(boxes.xyxy).reshape(-1, 4)[int(np.argmax(conf))]
+
+
+class CropClassifier:
+    """
+    手部裁剪图分类器（ModelTrainer.train_crop_classifier训练的YOLO分类模型）
+
+    裁剪图写入预分配的 (S, S, 3) 缓冲区；ONNX Runtime后端再写入预分配的 (1, 3, S, S) 输入数组，
+    每帧不产生新的图像分配。
+    """
+
+    def __init__(self, model_path: str, imgsz: int = 128, backend: str = 'ultralytics',
+                 intra_op_threads: int = 0):
+        self.backend = backend
+        self.logger = logging.getLogger('CropClassifier')
+
+        if backend == 'onnxruntime':
+            import onnxruntime as ort
+            onnx_path = Path(model_path)
+            if onnx_path.suffix != '.onnx':
+                onnx_path = onnx_path.with_suffix('.onnx')
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = intra_op_threads
+            self.session = ort.InferenceSession(str(onnx_path), options, providers=['CPUExecutionProvider'])
+            model_input = self.session.get_inputs()[0]
+            self.input_name = model_input.name
+            if isinstance(model_input.shape[2], int):
+                imgsz = model_input.shape[2]
+            self.names = OnnxRuntimeBackend._parse_names(
+                self.session.get_modelmeta().custom_metadata_map.get('names'))
+            self._input = np.empty((1, 3, imgsz, imgsz), dtype=np.float32)
+        elif backend == 'ultralytics':
+            from ultralytics import YOLO
+            self.model = YOLO(str(model_path), task='classify')
+            self.names = self.model.names
+        else:
+            raise ValueError(f"Unsupported crop classifier backend: {backend}")
+
+        self.imgsz = imgsz
+        self._crop = np.empty((imgsz, imgsz, 3), dtype=np.uint8)
+        self.logger.info(f"Loaded crop classifier {model_path} ({imgsz}x{imgsz}, {len(self.names)} classes)")
+
+    def classify(self, frame: np.ndarray, crop_box: Tuple[int, int, int, int]) -> Tuple[int, float]:
+        """返回 (类别id, 置信度)"""
+        crop_to_buffer(frame, crop_box, self._crop)
+        if self.backend == 'onnxruntime':
+            # BGR转RGB、HWC转CHW并归一化，直接写入输入数组
+            np.multiply(self._crop[:, :, ::-1].transpose(2, 0, 1), 1.0 / 255.0,
+                        out=self._input[0], casting='unsafe')
+            probs = self.session.run(None, {self.input_name: self._input})[0].ravel()
+        else:
+            probs = to_numpy(self.model.predict(self._crop, imgsz=self.imgsz, verbose=False)[0].probs.data)
+        class_id = int(np.argmax(probs))
+        return class_id, float(probs[class_id])
+
+
+class TwoStageRecognizer:
+    """
+    两阶段识别：先定位手部，再对紧贴手部的小尺寸裁剪图分类
+
+    predict()返回与检测器输出用法一致的结果（一个框，类别和置信度来自分类器），
+    可以直接替换trackers中的model.track()。
+    """
+
+    def __init__(self, locator, classifier: CropClassifier, padding: float = 0.15):
+        self.locator = locator
+        self.classifier = classifier
+        self.padding = padding
+
+        # 统计信息
+        self.frames = 0
+        self.located = 0
+        self._locate_time = 0.0
+        self._classify_time = 0.0
+
+    @property
+    def names(self) -> Dict[int, str]:
+        return self.classifier.names
+
+    def predict(self, frame: np.ndarray, depth_frame: Optional[np.ndarray] = None) -> List[DetectionResult]:
+        self.frames += 1
+        start = time.monotonic()
+        box = self.locator.locate(frame, depth_frame)
+        located = time.monotonic()
+        self._locate_time += located - start
+
+        if box is None:
+            empty = DetectionBoxes(np.empty((0, 4), np.float32), np.empty(0, np.float32), np.empty(0, np.float32))
+            return [DetectionResult(frame, empty, self.names)]
+
+        crop_box = square_crop_box(box, self.padding, frame.shape[1], frame.shape[0])
+        class_id, conf = self.classifier.classify(frame, crop_box)
+        self._classify_time += time.monotonic() - located
+        self.located += 1
+        boxes = DetectionBoxes(np.asarray(box, dtype=np.float32).reshape(1, 4),
+                               np.array([conf], dtype=np.float32), np.array([class_id], dtype=np.float32))
+        return [DetectionResult(frame, boxes, self.names)]
+
+    def set_depth_pixel_type(self, pixel_type: int) -> None:
+        """转发给基于深度的定位器，其他定位器忽略"""
+        if hasattr(self.locator, 'set_depth_pixel_type'):
+            self.locator.set_depth_pixel_type(pixel_type)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'frames': self.frames,
+            'located': self.located,
+            'locate_ms': self._locate_time / self.frames * 1000 if self.frames else 0.0,
+            'classify_ms': self._classify_time / self.located * 1000 if self.located else 0.0,
+        }
+
+
+def create_two_stage_recognizer(config: Dict[str, Any], detector=None) -> Optional[TwoStageRecognizer]:
+    """
+    按追踪器配置创建两阶段识别器，recognition_mode不是two_stage时返回None
+
+    Args:
+        detector: 追踪器已加载的检测模型，roi_locator为detector且未配置roi_detector_path时用作手部定位
+    """
+    if config['recognition_mode'] != 'two_stage':
+        return None
+
+    if config['roi_locator'] == 'depth':
+        locator = DepthHandLocator(config['depth_roi_band_mm'], config['depth_roi_min_mm'],
+                                   config['depth_roi_max_mm'])
+    elif config['roi_locator'] == 'detector':
+        if config['roi_detector_path']:
+            detector = load_model(config['roi_detector_path'], config['inference_backend'],
+                                  config['onnx_runtime'])
+        if detector is None:
+            raise ValueError("roi_locator 'detector' requires a model or roi_detector_path")
+        locator = DetectorHandLocator(detector, config['roi_detector_imgsz'])
+    else:
+        raise ValueError(f"Unsupported roi locator: {config['roi_locator']}")
+
+    classifier = CropClassifier(config['crop_classifier_path'], config['crop_imgsz'], config['inference_backend'],
+                                config['onnx_runtime'].get('intra_op_threads', 0))
+    return TwoStageRecognizer(locator, classifier, config['crop_padding'])
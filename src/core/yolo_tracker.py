@@ -1,11 +1,14 @@
 import cv2
-from ultralytics import YOLO
 import requests
 import logging
 from typing import Optional, Any
 import yaml
 import os
 
+from src.core.model_registry import load_tracker_model, get_model_registry
+from src.core.frame_renderer import FrameRenderer
+from src.core.pipeline import Pipeline, StopPipeline, DROP_OLDEST, LATEST_ONLY
+
 logger = logging.getLogger(__name__)
 
 class YOLOTracker:
@@ -19,11 +22,14 @@ class YOLOTracker:
         # self.config = load_config(config_path)
 
         # Load the YOLO model
-        self.model = YOLO(model_path)
+        self.model = load_tracker_model(model_path, self.config)
         self.test_mode = test_mode
         self.test_post = test_post
         self.video_source = video_source
-        self.latest_frame = None
+        # 识别结果只在有观看者（本地窗口或MJPG客户端）时绘制
+        self.renderer = FrameRenderer(self.config['preview_width'])
+        if self.config['display_window']:
+            self.renderer.add_viewer()
 
         self.server_url = self.config.get("server_url", "http://localhost:5000")
         self.required_stable_frames = self.config.get("required_stable_frames", 3)
@@ -43,7 +49,18 @@ class YOLOTracker:
             'server_url': 'http://localhost:5000',
             'required_stable_frames': 3,
             'mjpg_quality': 95,
-            'display_window': True
+            'display_window': True,
+            'pipeline_mode': False,
+            'pipeline_queue_size': 2,
+            'pipeline_queue_policy': 'drop_oldest',
+            'publish_queue_size': 8,
+            'inference_backend': 'ultralytics',
+            'onnx_runtime': {},
+            'model_warmup_runs': 2,
+            'preview_width': 0,
+            'inference_workers': 0,
+            'inference_worker_slots': 0,
+            'inference_worker_max_frame': [1080, 1920]
         }
 
         if config_path and os.path.exists(config_path):
@@ -63,13 +80,21 @@ class YOLOTracker:
 
         self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
 
+        # 按采集分辨率预热模型，避免首帧承担延迟初始化开销
+        shape = (int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)))
+        if all(shape):
+            get_model_registry().warmup(self.model, shape, self.config['model_warmup_runs'])
+
 
     def process_frame(self, frame):
         # Run YOLO tracking on the frame
         results = self.model.track(frame, persist=True, verbose=True)
+        return self._postprocess(frame, results)
 
-        # Visualize the results on the frame
-        annotated_frame = results[0].plot()
+    def _postprocess(self, frame, results):
+        # Draw here only for the local window; MJPEG viewers render their own copy
+        self.renderer.submit(frame, results)
+        annotated_frame = self.renderer.render() if self.config['display_window'] else frame
         detected_class_name = None
 
         # If any object is detected, extract the class name
@@ -95,7 +120,6 @@ class YOLOTracker:
         if filtered_class_name is not None:
             logger.info(f"Detected class: {filtered_class_name}")
 
-        self.latest_frame = annotated_frame
         return annotated_frame, filtered_class_name
 
 
@@ -126,6 +150,10 @@ class YOLOTracker:
 
     def _run_normal_mode(self) -> None:
         """运行正常模式"""
+        if self.config['pipeline_mode']:
+            self._run_pipeline_mode()
+            return
+
         while self.cap.isOpened():
             success, frame = self.cap.read()
             if not success:
@@ -140,8 +168,62 @@ class YOLOTracker:
                 if cv2.waitKey(1) & 0xFF == ord("q"):
                     break
 
-    def get_latest_frame(self) -> Any:
-        return self.latest_frame
+    def build_pipeline(self) -> Pipeline:
+        """把采集、推理、后处理、发布和显示组织成流水线，各阶段独立线程运行"""
+        queue_size = self.config['pipeline_queue_size']
+        policy = self.config['pipeline_queue_policy']
+
+        pipeline = Pipeline('YOLOTracker.pipeline')
+        pipeline.add_stage('capture', self._stage_capture)
+        pipeline.add_stage('infer', self._stage_infer, queue_size=queue_size, policy=policy)
+        pipeline.add_stage('postprocess', self._stage_postprocess, queue_size=queue_size, policy=policy)
+        pipeline.add_stage('publish', self._stage_publish, upstream='postprocess',
+                           queue_size=self.config['publish_queue_size'], policy=DROP_OLDEST)
+        if self.config['display_window']:
+            pipeline.add_stage('display', self._stage_display, upstream='postprocess', policy=LATEST_ONLY,
+                               main_thread=True)
+        return pipeline
+
+    def _run_pipeline_mode(self) -> None:
+        """以流水线方式运行，阻塞到视频源结束、按下q或Ctrl+C"""
+        pipeline = self.build_pipeline()
+        pipeline.run()
+        logger.info(f"Pipeline stats: {pipeline.get_stats()}")
+
+    def _stage_capture(self):
+        if not self.cap.isOpened():
+            raise StopPipeline()
+        success, frame = self.cap.read()
+        if not success:
+            raise StopPipeline()
+        return {'frame': frame}
+
+    def _stage_infer(self, packet):
+        packet['results'] = self.model.track(packet['frame'], persist=True, verbose=True)
+        return packet
+
+    def _stage_postprocess(self, packet):
+        packet['annotated'], packet['class_name'] = self._postprocess(packet['frame'], packet['results'])
+        return packet
+
+    def _stage_publish(self, packet) -> None:
+        if packet['class_name']:
+            self.post_class_name(packet['class_name'])
+
+    def _stage_display(self, packet) -> None:
+        cv2.imshow("YOLO Tracking", packet['annotated'])
+        if cv2.waitKey(1) & 0xFF == ord("q"):
+            raise StopPipeline()
+
+    def get_latest_frame(self, out=None) -> Any:
+        return self.renderer.render(out)
+
+    def add_viewer(self) -> None:
+        """登记一个观看者（如/mjpg_stream客户端），有观看者时才绘制识别结果"""
+        self.renderer.add_viewer()
+
+    def remove_viewer(self) -> None:
+        self.renderer.remove_viewer()
 
     def post_class_name(self, class_name) -> None:
         url = f"{self.server_url}/recognize"
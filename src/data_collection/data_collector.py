@@ -15,6 +15,7 @@ from src.devices.BerxelSdkDriver.BerxelHawkFrame import *
 from src.devices.BerxelSdkDriver.BerxelHawkDevice import *
 from src.devices.BerxelSdkDriver.BerxelHawkContext import *
 from src.devices.BerxelSdkDriver.BerxelHawkDefines import *
+from src.utils.depth_colorizer import create_display_colorizer
 
 
 class DataCollector:
@@ -23,6 +24,7 @@ class DataCollector:
         self.__device = None
         self.__deviceList = []
         self.is_collecting = False
+        self.display_colorizer = create_display_colorizer()
         self.current_sign = None
         self.save_dir = ROOT_DIR / save_dir / "raw"
         self._setup_directories()
@@ -92,34 +94,22 @@ class DataCollector:
 
     def captureFrame(self) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
         """捕获一帧数据，返回RGB图和深度图"""
-        hawkDepthFrame = self.__device.readDepthFrame(30)
+        hawkDepthFrame = self.__device.leaseFrame(self.__device.readDepthFrame(30))
         if hawkDepthFrame is None:
             return None, None
 
-        hawkColorFrame = self.__device.readColorFrame(30)
+        hawkColorFrame = self.__device.leaseFrame(self.__device.readColorFrame(30))
         if hawkColorFrame is None:
-            self.__device.releaseFrame(hawkDepthFrame)
+            hawkDepthFrame.release()
             return None, None
 
-        try:
-            # 获取深度图数据
-            depthWidth = hawkDepthFrame.getWidth()
-            depthHeight = hawkDepthFrame.getHeight()
-            depthFrameBuffer = hawkDepthFrame.getDataAsUint16()
-            depth_array = np.ndarray(shape=(depthHeight, depthWidth),
-                                     dtype=np.uint16, buffer=depthFrameBuffer)
-
-            # 获取彩色图数据
-            colorWidth = hawkColorFrame.getWidth()
-            colorHeight = hawkColorFrame.getHeight()
-            colorFrameBuffer = hawkColorFrame.getDataAsUint8()
-            color_array = np.ndarray(shape=(colorHeight, colorWidth, 3),
-                                     dtype=np.uint8, buffer=colorFrameBuffer)
-
-            return color_array, depth_array
-        finally:
-            self.__device.releaseFrame(hawkColorFrame)
-            self.__device.releaseFrame(hawkDepthFrame)
+        # 零拷贝视图持有帧租约，视图被回收后帧才归还SDK
+        depth_array = hawkDepthFrame.asDepthArray()
+        color_array = hawkColorFrame.asColorArray()
+        hawkColorFrame.release()
+        hawkDepthFrame.release()
+
+        return color_array, depth_array
 
     def save_data(self, rgb_img: np.ndarray, depth_img: np.ndarray,
                   sign: str, counter: int, split: str = "train"):
@@ -147,8 +137,7 @@ class DataCollector:
 
             # 显示实时画面
             cv2.imshow('RGB View', rgb_img)
-            depth_display = ((depth_img / 10000.) * 255).astype(np.uint8)
-            cv2.imshow('Depth View', depth_display)
+            cv2.imshow('Depth View', self.display_colorizer.colorize(depth_img))
 
             key = cv2.waitKey(1) & 0xFF
 
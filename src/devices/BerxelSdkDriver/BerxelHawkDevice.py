@@ -4,6 +4,7 @@
 # from BerxelHawkDefines import *
 from .BerxelHawkNativeMethods import *
 from .BerxelHawkFrame import *
+from .BerxelHawkFrameQueue import BerxelHawkFrameQueue
 
 class BerxelHawkDevice(object):
 
@@ -12,7 +13,8 @@ class BerxelHawkDevice(object):
         self._mDepthStream = None
         self._mColorStream = None
         self._mIrStream = None
-
+        self._mFrameQueue = None
+        self._leaseTracker = BerxelHawkLeaseTracker()
 
 
     def getSupportFrameModes(self, streamType):
@@ -114,6 +116,25 @@ class BerxelHawkDevice(object):
             print("start stream failed")
             return  -1
 
+    def startPushStreams(self, streamFlag, maxQueueSize = 2):
+        """以回调推送模式打开数据流，之后readXxxFrame从帧队列中取帧租约"""
+        if self._deviceHandle is None:
+            return -1
+
+        self._mFrameQueue = BerxelHawkFrameQueue(maxQueueSize, self._leaseTracker)
+        ret = self.startStreams(streamFlag, self._mFrameQueue.getCallback(), None)
+        if ret != 0:
+            self._mFrameQueue = None
+        return ret
+
+    def isPushMode(self):
+        return self._mFrameQueue is not None
+
+    def getFrameQueueStats(self):
+        if self._mFrameQueue is None:
+            return None
+        return self._mFrameQueue.getStats()
+
     def stopStream(self, streamFlag):
         if self._deviceHandle is None:
             return -1
@@ -149,6 +170,11 @@ class BerxelHawkDevice(object):
                 else:
                     print("close Ir stream failed")
 
+        if self._mFrameQueue is not None and self._mColorStream is None \
+                and self._mDepthStream is None and self._mIrStream is None:
+            self._mFrameQueue.clear()
+            self._mFrameQueue = None
+
         if (retColor < 0) or (retDepth < 0) or  (retIr< 0):
             print("colose stream failed")
             return -1
@@ -159,8 +185,24 @@ class BerxelHawkDevice(object):
     def releaseFrame(self, hawkFrame):
         if hawkFrame is None:
             return  -1
+        elif isinstance(hawkFrame, BerxelHawkFrameLease):
+            return hawkFrame.release()
         else:
-            berxelReleaseFrame(byref(hawkFrame.getFrameHandle()))
+            return berxelReleaseFrame(byref(hawkFrame.getFrameHandle()))
+
+    def leaseFrame(self, hawkFrame):
+        """把读到的帧包装成引用计数租约，最后一个引用释放时归还SDK"""
+        if hawkFrame is None or isinstance(hawkFrame, BerxelHawkFrameLease):
+            return hawkFrame
+        return BerxelHawkFrameLease(hawkFrame, self.releaseFrame, self._leaseTracker)
+
+    def getOutstandingLeases(self):
+        """尚未归还SDK的帧租约数（包括仍然存活的零拷贝视图）"""
+        return self._leaseTracker.getOutstanding()
+
+    def drainLeases(self, timeout = 1.0):
+        """关闭设备前等待所有帧租约归还，timeout单位为秒；超时返回False，剩余租约失效"""
+        return self._leaseTracker.drain(timeout)
 
     def readColorFrame(self, timeout):
 
@@ -168,6 +210,9 @@ class BerxelHawkDevice(object):
             print("Color stream is not opened")
             return None
 
+        if self._mFrameQueue is not None:
+            return self._mFrameQueue.readFrame(BerxelHawkStreamType.forward_dict['BERXEL_HAWK_COLOR_STREAM'], timeout)
+
         if self._mColorStream == None:
             print("self._mColorStream")
         frame_handle = imageFrameHandle()
@@ -187,6 +232,9 @@ class BerxelHawkDevice(object):
             print("Depth stream is not opened")
             return None
 
+        if self._mFrameQueue is not None:
+            return self._mFrameQueue.readFrame(BerxelHawkStreamType.forward_dict['BERXEL_HAWK_DEPTH_STREAM'], timeout)
+
         # print("read depth frame")
         frame_handle = imageFrameHandle()
         ret = berxelReadFrame(self._mDepthStream, byref(frame_handle), timeout)
@@ -209,6 +257,9 @@ class BerxelHawkDevice(object):
             print("Ir stream is not opened")
             return None
 
+        if self._mFrameQueue is not None:
+            return self._mFrameQueue.readFrame(BerxelHawkStreamType.forward_dict['BERXEL_HAWK_IR_STREAM'], timeout)
+
         frame_handle = imageFrameHandle()
         ret = berxelReadFrame(self._mIrStream, byref(frame_handle), timeout)
 
@@ -4,12 +4,30 @@
 
 from .BerxelHawkDefines import  *
 from ctypes import *
+import gc
 import os
 import time
 import datetime
 import threading
+import weakref
 import sys
 
+import numpy as np
+
+
+# 缓存按长度构造的ctypes数组类型，避免每帧都创建新的类型对象
+_arrayTypeCache = {}
+
+
+def _getArrayType(elementType, length):
+    key = (elementType, length)
+    arrayType = _arrayTypeCache.get(key)
+    if arrayType is None:
+        arrayType = elementType * length
+        _arrayTypeCache[key] = arrayType
+    return arrayType
+
+
 class BerxelHawkFrame(object):
 
     def __init__(self, frame_Handle = None):
@@ -19,7 +37,7 @@ class BerxelHawkFrame(object):
     def getDataAsUint8(self):
         if self._frameHandle is None:
             return None
-        return (c_uint8 * int(self._frameHandle.contents.dataSize)).from_address(self._frameHandle.contents.pVoidData)
+        return _getArrayType(c_uint8, int(self._frameHandle.contents.dataSize)).from_address(self._frameHandle.contents.pVoidData)
 
     def getOriData(self):
         if self._frameHandle is None:
@@ -29,7 +47,7 @@ class BerxelHawkFrame(object):
     def getDataAsUint16(self):
         if self._frameHandle is None:
             return None
-        return (c_uint16 * int(self._frameHandle.contents.dataSize /2)).from_address(self._frameHandle.contents.pVoidData)
+        return _getArrayType(c_uint16, int(self._frameHandle.contents.dataSize) // 2).from_address(self._frameHandle.contents.pVoidData)
 
     def getStreamType(self):
         if self._frameHandle is None:
@@ -75,3 +93,129 @@ class BerxelHawkFrame(object):
         if self._frameHandle is None:
             return None
         return  self._frameHandle.contents.fps
+
+
+class BerxelHawkLeaseTracker(object):
+    """
+    统计一台设备上尚未归还SDK的帧租约
+
+    零拷贝视图可能比读帧的循环活得更久（流水线队列、缓存的识别结果等）。关闭设备、销毁上下文
+    之前调用drain()等待所有租约归还；超时仍未归还的租约被标记为失效，之后回收时不再调用
+    SDK的releaseFrame（设备已经关闭）。
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._outstanding = 0
+        self._invalidated = False
+
+    def opened(self):
+        with self._cond:
+            self._outstanding += 1
+
+    def closed(self):
+        """租约的最后一个引用释放；返回False表示租约已失效，不应再把帧归还SDK"""
+        with self._cond:
+            self._outstanding -= 1
+            self._cond.notify_all()
+            return not self._invalidated
+
+    def getOutstanding(self):
+        return self._outstanding
+
+    def drain(self, timeout):
+        """等待所有租约归还，timeout单位为秒；超时返回False并使剩余租约失效"""
+        # 视图可能只被循环引用持有（如捕获了帧的闭包），先回收一次
+        gc.collect()
+        with self._cond:
+            drained = self._cond.wait_for(lambda: self._outstanding <= 0, timeout)
+            if not drained:
+                self._invalidated = True
+            return drained
+
+
+class BerxelHawkFrameLease(object):
+    """
+    引用计数的帧租约：持有一个SDK帧，最后一个使用者放手时才把帧归还给SDK。
+
+    asColorArray()/asDepthArray()返回直接指向SDK内存的NumPy视图（零拷贝），
+    每个视图各持有一份引用，视图（及其派生视图）被回收时自动减引用，
+    因此调用方拿到视图后即可release()，不会出现数组指向已释放内存的问题。
+    除租约接口外的调用都转发给内部的BerxelHawkFrame，可以直接当作帧使用。
+    传入tracker时租约计入设备的未归还租约数，关闭设备前可以等待它们归还。
+    """
+
+    def __init__(self, hawkFrame, releaser, tracker=None):
+        self._frame = hawkFrame
+        self._releaser = releaser
+        self._lock = threading.Lock()
+        self._refCount = 1
+        self._tracker = tracker
+        if tracker is not None:
+            tracker.opened()
+
+    def __getattr__(self, name):
+        frame = self.__dict__.get('_frame')
+        if frame is None:
+            raise AttributeError(name)
+        return getattr(frame, name)
+
+    def getFrame(self):
+        return self._frame
+
+    def getRefCount(self):
+        return self._refCount
+
+    def isReleased(self):
+        return self._refCount <= 0
+
+    def acquire(self):
+        with self._lock:
+            if self._refCount <= 0:
+                raise RuntimeError("frame lease already released")
+            self._refCount += 1
+        return self
+
+    def release(self):
+        with self._lock:
+            if self._refCount <= 0:
+                return 0
+            self._refCount -= 1
+            if self._refCount > 0:
+                return 0
+        return self._return()
+
+    def _return(self):
+        """把帧归还SDK；租约已因设备关闭失效时跳过"""
+        tracker = self.__dict__.get('_tracker')
+        if tracker is not None and not tracker.closed():
+            return 0
+        return self._releaser(self._frame)
+
+    def asArray(self, dtype, shape):
+        """返回指向SDK帧内存的NumPy视图，视图存活期间帧不会被归还"""
+        buffer = self._frame.getDataAsUint8()
+        self.acquire()
+        weakref.finalize(buffer, self.release)
+        count = 1
+        for dim in shape:
+            count *= dim
+        return np.frombuffer(buffer, dtype=dtype, count=count).reshape(shape)
+
+    def asColorArray(self):
+        return self.asArray(np.uint8, (self._frame.getHeight(), self._frame.getWidth(), 3))
+
+    def asDepthArray(self):
+        return self.asArray(np.uint16, (self._frame.getHeight(), self._frame.getWidth()))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+    def __del__(self):
+        # 使用者忘记release时兜底归还
+        if self.__dict__.get('_refCount', 0) > 0:
+            self._refCount = 0
+            self._return()
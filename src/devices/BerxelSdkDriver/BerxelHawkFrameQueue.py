@@ -0,0 +1,82 @@
+#coding=utf-8
+
+from .BerxelHawkNativeMethods import *
+from .BerxelHawkFrame import *
+import threading
+import queue
+
+
+class BerxelHawkFrameQueue(object):
+    """
+    推送模式的帧队列
+
+    作为berxelOpenStream2的回调对象，把SDK的新帧通知转换成按流类型分开的线程安全租约队列。
+    队列满时丢弃最旧的帧（只保留最新），读取方在帧到达时立即被唤醒，不再按超时轮询。
+    """
+
+    def __init__(self, maxSize = 2, leaseTracker = None):
+        self._maxSize = max(int(maxSize), 1)
+        self._leaseTracker = leaseTracker
+        self._queues = {
+            BerxelHawkStreamType.forward_dict['BERXEL_HAWK_COLOR_STREAM']: queue.Queue(self._maxSize),
+            BerxelHawkStreamType.forward_dict['BERXEL_HAWK_DEPTH_STREAM']: queue.Queue(self._maxSize),
+            BerxelHawkStreamType.forward_dict['BERXEL_HAWK_IR_STREAM']: queue.Queue(self._maxSize),
+        }
+        self._lock = threading.Lock()
+        self._receivedCount = dict.fromkeys(self._queues, 0)
+        self._droppedCount = dict.fromkeys(self._queues, 0)
+        # 必须持有回调对象的引用，否则会被回收导致SDK回调野指针
+        self._realCallback = BerxelNewFrameCallback(self._onNewFrame)
+
+    def getCallback(self):
+        return self._realCallback
+
+    def _releaseFrame(self, hawkFrame):
+        return berxelReleaseFrame(byref(hawkFrame.getFrameHandle()))
+
+    def _onNewFrame(self, stream_handle, frame_handle, user_data):
+        lease = BerxelHawkFrameLease(BerxelHawkFrame(frame_handle), self._releaseFrame, self._leaseTracker)
+        frameQueue = self._queues.get(frame_handle.contents.type)
+        if frameQueue is None:
+            lease.release()
+            return
+
+        streamType = frame_handle.contents.type
+        with self._lock:
+            self._receivedCount[streamType] += 1
+            while True:
+                try:
+                    frameQueue.put_nowait(lease)
+                    break
+                except queue.Full:
+                    try:
+                        frameQueue.get_nowait().release()
+                        self._droppedCount[streamType] += 1
+                    except queue.Empty:
+                        pass
+
+    def readFrame(self, streamType, timeout):
+        """等待指定流的下一帧租约，timeout单位为毫秒，超时返回None"""
+        frameQueue = self._queues.get(streamType)
+        if frameQueue is None:
+            return None
+        try:
+            return frameQueue.get(timeout = timeout / 1000.)
+        except queue.Empty:
+            return None
+
+    def clear(self):
+        """释放队列中所有未被取走的帧"""
+        for frameQueue in self._queues.values():
+            while True:
+                try:
+                    frameQueue.get_nowait().release()
+                except queue.Empty:
+                    break
+
+    def getStats(self):
+        with self._lock:
+            return {
+                'received': dict(self._receivedCount),
+                'dropped': dict(self._droppedCount),
+            }
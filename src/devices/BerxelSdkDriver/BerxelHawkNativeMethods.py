@@ -5,6 +5,7 @@ import ctypes.util
 import platform
 import os.path
 import sys
+import threading
 
 from ctypes import *
 
@@ -34,143 +35,128 @@ def onloadLibrary():
 
 
 
-berxelDll = onloadLibrary()
+_berxelDll = None
+_berxelDllLock = threading.Lock()
 
-berxelInit = berxelDll.berxelInit
-berxelInit.restype = c_int
 
-berxelDestroy = berxelDll.berxelDestroy
-berxelDestroy.restype = c_int
+def getBerxelDll():
+    """首次调用SDK接口时才加载libBerxelInterface，未安装SDK的机器也能导入驱动模块"""
+    global _berxelDll
+    if _berxelDll is None:
+        with _berxelDllLock:
+            if _berxelDll is None:
+                dll = onloadLibrary()
+                if dll is None:
+                    raise OSError("Berxel native library not found, use the simulated device backend instead")
+                _berxelDll = dll
+    return _berxelDll
 
-berxelGetDeviceList = berxelDll.berxelGetDeviceList
-berxelGetDeviceList.argtypes = [deviceInfoHandle_p,POINTER(c_uint32)]
-berxelGetDeviceList.restype = c_int
 
+def isNativeLibraryAvailable():
+    try:
+        getBerxelDll()
+        return True
+    except OSError:
+        return False
+
+
+class _LazyNativeFunction(object):
+    """延迟绑定的SDK函数：第一次调用时才从动态库中取出函数并设置argtypes/restype"""
+
+    def __init__(self, name, argtypes, restype):
+        self._name = name
+        self._argtypes = argtypes
+        self._restype = restype
+        self._func = None
+
+    def _bind(self):
+        func = getattr(getBerxelDll(), self._name)
+        if self._argtypes is not None:
+            func.argtypes = self._argtypes
+        func.restype = self._restype
+        self._func = func
+        return func
+
+    def __call__(self, *args):
+        func = self._func
+        if func is None:
+            func = self._bind()
+        return func(*args)
+
+
+berxelInit = _LazyNativeFunction('berxelInit', None, c_int)
+
+berxelDestroy = _LazyNativeFunction('berxelDestroy', None, c_int)
 
-berxelReleaseDeviceList = berxelDll.berxelReleaseDeviceList
-berxelReleaseDeviceList.argtypes = [deviceInfoHandle_p]
-berxelReleaseDeviceList.restype = c_int
+berxelGetDeviceList = _LazyNativeFunction('berxelGetDeviceList', [deviceInfoHandle_p,POINTER(c_uint32)], c_int)
 
 
+berxelReleaseDeviceList = _LazyNativeFunction('berxelReleaseDeviceList', [deviceInfoHandle_p], c_int)
 
-berxelOpenDeviceByAddr = berxelDll.berxelOpenDeviceByAddr
-berxelOpenDeviceByAddr.argtypes = [c_char_p, deviceHandle_p]
-berxelOpenDeviceByAddr.restype = c_int
 
+berxelOpenDeviceByAddr = _LazyNativeFunction('berxelOpenDeviceByAddr', [c_char_p, deviceHandle_p], c_int)
 
 
-berxelCloseDevice = berxelDll.berxelCloseDevice
-berxelCloseDevice.argtypes = [deviceHandle]
-berxelCloseDevice.restype = c_int
+berxelCloseDevice = _LazyNativeFunction('berxelCloseDevice', [deviceHandle], c_int)
 
 
-berxelGetVersion = berxelDll.berxelGetVersion
-berxelGetVersion.argtypes = [deviceHandle, versionHandle]
-berxelGetVersion.restype = c_int
+berxelGetVersion = _LazyNativeFunction('berxelGetVersion', [deviceHandle, versionHandle], c_int)
 
-berxelGetCurrentDeviceInfo = berxelDll.berxelGetCurrentDeviceInfo
-berxelGetCurrentDeviceInfo.argtypes = [deviceHandle, deviceInfoHandle]
-berxelGetCurrentDeviceInfo.restype = c_int
+berxelGetCurrentDeviceInfo = _LazyNativeFunction('berxelGetCurrentDeviceInfo', [deviceHandle, deviceInfoHandle], c_int)
 
 
-berxelGetDeviceIntriscParams = berxelDll.berxelGetDeviceIntriscParams
-berxelGetDeviceIntriscParams.argtypes = [deviceHandle, deviceIntrinsicParamsHandle]
-berxelGetDeviceIntriscParams.restype = c_int
+berxelGetDeviceIntriscParams = _LazyNativeFunction('berxelGetDeviceIntriscParams', [deviceHandle, deviceIntrinsicParamsHandle], c_int)
 
 
-berxelSetStreamMirror = berxelDll.berxelSetStreamMirror
-berxelSetStreamMirror.argtypes = [deviceHandle, c_uint32]
-berxelSetStreamMirror.restype = c_int
+berxelSetStreamMirror = _LazyNativeFunction('berxelSetStreamMirror', [deviceHandle, c_uint32], c_int)
 
 
-berxelSetDeviceStatusCallback = berxelDll.berxelSetDeviceStatusCallback
-berxelSetDeviceStatusCallback.argtypes = [BerxelDeviceStatusCallback, c_void_p]
-berxelSetDeviceStatusCallback.restype = c_int
+berxelSetDeviceStatusCallback = _LazyNativeFunction('berxelSetDeviceStatusCallback', [BerxelDeviceStatusCallback, c_void_p], c_int)
 
 
-berxelSetStreamFlagMode = berxelDll.berxelSetStreamFlagMode
-berxelSetStreamFlagMode.argtypes = [deviceHandle, c_uint32]
-berxelSetStreamFlagMode.restype = c_int
+berxelSetStreamFlagMode = _LazyNativeFunction('berxelSetStreamFlagMode', [deviceHandle, c_uint32], c_int)
 
 
-berxelEnableRegistration = berxelDll.berxelEnableRegistration
-berxelEnableRegistration.argtypes = [deviceHandle, c_uint32]
-berxelEnableRegistration.restype = c_int
+berxelEnableRegistration = _LazyNativeFunction('berxelEnableRegistration', [deviceHandle, c_uint32], c_int)
 
-berxelGetSupportStreamFrameMode = berxelDll.berxelGetSupportStreamFrameMode
-berxelGetSupportStreamFrameMode.argtypes = [deviceHandle, c_uint32, frameModeHandle_p, POINTER(c_uint32)]
-berxelGetSupportStreamFrameMode.restype = c_int
+berxelGetSupportStreamFrameMode = _LazyNativeFunction('berxelGetSupportStreamFrameMode', [deviceHandle, c_uint32, frameModeHandle_p, POINTER(c_uint32)], c_int)
 
 
-berxelSetStreamFrameMode = berxelDll.berxelSetStreamFrameMode
-berxelSetStreamFrameMode.argtypes = [deviceHandle, c_uint32,  frameModeHandle]
-berxelSetStreamFrameMode.restype = c_int
+berxelSetStreamFrameMode = _LazyNativeFunction('berxelSetStreamFrameMode', [deviceHandle, c_uint32,  frameModeHandle], c_int)
 
-berxelGetCurrentStramFrameMode = berxelDll.berxelGetCurrentStramFrameMode
-berxelGetCurrentStramFrameMode.argtypes = [deviceHandle, c_uint32]
-berxelGetCurrentStramFrameMode.restype = frameModeHandle
+berxelGetCurrentStramFrameMode = _LazyNativeFunction('berxelGetCurrentStramFrameMode', [deviceHandle, c_uint32], frameModeHandle)
 
-berxelOpenStream = berxelDll.berxelOpenStream
-berxelOpenStream.argtypes = [deviceHandle, c_uint32, streamHandle_p]
-berxelOpenStream.restype = c_int
+berxelOpenStream = _LazyNativeFunction('berxelOpenStream', [deviceHandle, c_uint32, streamHandle_p], c_int)
 
-berxelOpenStream2 = berxelDll.berxelOpenStream2
-berxelOpenStream2.argtypes = [deviceHandle, c_uint32, streamHandle_p,  BerxelNewFrameCallback, c_void_p]
-berxelOpenStream2.restype = c_int
+berxelOpenStream2 = _LazyNativeFunction('berxelOpenStream2', [deviceHandle, c_uint32, streamHandle_p,  BerxelNewFrameCallback, c_void_p], c_int)
 
-berxelCloseStream = berxelDll.berxelCloseStream
-berxelCloseStream.argtypes = [streamHandle]
-berxelCloseStream.restype = c_int
+berxelCloseStream = _LazyNativeFunction('berxelCloseStream', [streamHandle], c_int)
 
-berxelReadFrame = berxelDll.berxelReadFrame
-berxelReadFrame.argtypes = [streamHandle, imageFrameHandle_p, c_int32]
-berxelReadFrame.restype = c_int
+berxelReadFrame = _LazyNativeFunction('berxelReadFrame', [streamHandle, imageFrameHandle_p, c_int32], c_int)
 
 
-berxelReleaseFrame = berxelDll.berxelReleaseFrame
-berxelReleaseFrame.argtypes = [imageFrameHandle_p]
-berxelReleaseFrame.restype = c_int
+berxelReleaseFrame = _LazyNativeFunction('berxelReleaseFrame', [imageFrameHandle_p], c_int)
 
-berxelSetFrameSync = berxelDll.berxelSetFrameSync
-berxelSetFrameSync.argtypes = [deviceHandle, c_uint32]
-berxelSetFrameSync.restype = c_int
+berxelSetFrameSync = _LazyNativeFunction('berxelSetFrameSync', [deviceHandle, c_uint32], c_int)
 
-berxelSetSafetyMode = berxelDll.berxelSetSafetyMode
-berxelSetSafetyMode.argtypes = [deviceHandle, c_uint32]
-berxelSetSafetyMode.restype = c_int
+berxelSetSafetyMode = _LazyNativeFunction('berxelSetSafetyMode', [deviceHandle, c_uint32], c_int)
 
 
-berxelSetSystemClock = berxelDll.berxelSetSystemClock
-berxelSetSystemClock.argtypes = [deviceHandle]
-berxelSetSystemClock.restype = c_int
+berxelSetSystemClock = _LazyNativeFunction('berxelSetSystemClock', [deviceHandle], c_int)
 
-berxelSetDenoise = berxelDll.berxelSetDenoise
-berxelSetDenoise.argtypes = [deviceHandle, c_uint32]
-berxelSetDenoise.restype = c_int
+berxelSetDenoise = _LazyNativeFunction('berxelSetDenoise', [deviceHandle, c_uint32], c_int)
 
-berxelSetColorQuality = berxelDll.berxelSetColorQuality
-berxelSetColorQuality.argtypes = [deviceHandle, c_uint32]
-berxelSetColorQuality.restype = c_int
+berxelSetColorQuality = _LazyNativeFunction('berxelSetColorQuality', [deviceHandle, c_uint32], c_int)
 
 #BERXEL_EXPOPRT int32_t berxelConvertDepthToPointCloud(const uint16_t* pDepth, uint32_t width, uint32_t height, float factor, float fx, float fy, float cx, float cy, BerxelPoint3D* pPointClouds, BerxelPixelFormat format);
-berxelConvertDepthToPointCloud = berxelDll.berxelConvertDepthToPointCloud
-berxelConvertDepthToPointCloud.argtypes = [c_void_p, c_uint32,c_uint32 ,c_float,c_float,c_float,c_float,c_float,pointListHandle,c_uint32]
-berxelConvertDepthToPointCloud.restype = c_int
+berxelConvertDepthToPointCloud = _LazyNativeFunction('berxelConvertDepthToPointCloud', [c_void_p, c_uint32,c_uint32 ,c_float,c_float,c_float,c_float,c_float,pointListHandle,c_uint32], c_int)
 
 
-berxelSetColorExposureGain = berxelDll.berxelSetColorExposureGain
-berxelSetColorExposureGain.argtypes  = [deviceHandle, c_uint32, c_uint32]
-berxelSetColorExposureGain.restype   = c_int
+berxelSetColorExposureGain = _LazyNativeFunction('berxelSetColorExposureGain', [deviceHandle, c_uint32, c_uint32], c_int)
 
-berxelRecoveryColorAE = berxelDll.berxelRecoveryColorAE
-berxelRecoveryColorAE.argtypes  = [deviceHandle]
-berxelRecoveryColorAE.restype   = c_int
+berxelRecoveryColorAE = _LazyNativeFunction('berxelRecoveryColorAE', [deviceHandle], c_int)
 
-berxelEnableTemporalDenoise = berxelDll.berxelEnableTemporalDenoise
-berxelEnableTemporalDenoise.argtypes = [deviceHandle, c_uint32]
-berxelEnableTemporalDenoise.restype = c_int
+berxelEnableTemporalDenoise = _LazyNativeFunction('berxelEnableTemporalDenoise', [deviceHandle, c_uint32], c_int)
 
-berxelEnableSpatialDenoise = berxelDll.berxelEnableSpatialDenoise
-berxelEnableSpatialDenoise.argtypes = [deviceHandle, c_uint32]
-berxelEnableSpatialDenoise.restype = c_int
+berxelEnableSpatialDenoise = _LazyNativeFunction('berxelEnableSpatialDenoise', [deviceHandle, c_uint32], c_int)
 
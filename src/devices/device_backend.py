@@ -0,0 +1,25 @@
+from typing import Optional, Dict, Any
+
+
+def create_hawk_context(backend: str = 'berxel', options: Optional[Dict[str, Any]] = None):
+    """
+    创建相机上下文
+
+    Args:
+        backend: berxel 使用真实相机（SDK动态库在首次调用时加载）；
+                 simulated 使用模拟设备，不依赖相机和SDK；
+        replay 回放.hawkrec录制文件（模拟设备 + recording帧源）
+        options: 传给模拟设备的参数（num_devices/fps/source/width/height/path/realtime/loop ...）
+    """
+    options = options or {}
+    if backend == 'berxel':
+        from src.devices.BerxelSdkDriver.BerxelHawkContext import BerxelHawkContext
+        return BerxelHawkContext()
+    if backend == 'simulated':
+        from src.devices.simulated_device import SimulatedHawkContext
+        return SimulatedHawkContext(**options)
+    if backend == 'replay':
+        from src.devices.simulated_device import SimulatedHawkContext
+        options = dict(options, source='recording')
+        return SimulatedHawkContext(**options)
+    raise ValueError(f"Unsupported device backend: {backend}")
@@ -0,0 +1,373 @@
+"""
+Hawk录制文件格式（.hawkrec），所有整数均为小端序
+
+    文件头   : FILE_MAGIC(8) + version(u32) + reserved(u32)
+    帧块 * N : CHUNK_MAGIC(4) + stream(u32) + frame_index(u32) + timestamp(u64)
+               + width(u32) + height(u32) + channels(u32) + dtype(u32) + data_size(u64)
+               + 填充到64字节对齐 + 原始像素数据
+    索引     : INDEX_DTYPE结构化数组，每帧一条
+    文件尾   : INDEX_MAGIC(8) + index_offset(u64) + frame_count(u64)
+
+像素数据按64字节对齐，读取端mmap整个文件后直接用np.frombuffer得到零拷贝视图。
+录制中断导致没有索引时，读取端会顺序扫描帧块重建索引。
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Dict, Any, Iterator, Tuple
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[2]  # 获取项目根目录
+sys.path.append(str(ROOT_DIR))
+
+from src.devices.BerxelSdkDriver.BerxelHawkDefines import BerxelHawkStreamType
+
+
+FILE_MAGIC = b'HAWKREC1'
+CHUNK_MAGIC = b'FRME'
+INDEX_MAGIC = b'HAWKIDX1'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+_FILE_HEADER = struct.Struct('<8sII')
+_CHUNK_HEADER = struct.Struct('<4sIIQIIIIQ')
+_FOOTER = struct.Struct('<8sQQ')
+
+_DTYPES = {1: np.uint8, 2: np.uint16}
+_DTYPE_CODES = {np.dtype(np.uint8): 1, np.dtype(np.uint16): 2}
+
+INDEX_DTYPE = np.dtype([
+    ('stream', '<u4'),
+    ('frame_index', '<u4'),
+    ('timestamp', '<u8'),
+    ('offset', '<u8'),
+    ('width', '<u4'),
+    ('height', '<u4'),
+    ('channels', '<u4'),
+    ('dtype', '<u4'),
+])
+
+COLOR_STREAM = BerxelHawkStreamType.forward_dict['BERXEL_HAWK_COLOR_STREAM']
+DEPTH_STREAM = BerxelHawkStreamType.forward_dict['BERXEL_HAWK_DEPTH_STREAM']
+IR_STREAM = BerxelHawkStreamType.forward_dict['BERXEL_HAWK_IR_STREAM']
+
+
+def _padding(position: int) -> int:
+    return (-position) % ALIGNMENT
+
+
+class HawkRecorder:
+    """
+    把RGB(uint8 HxWx3)、深度(uint16 HxW)和可选IR帧连同SDK时间戳、帧序号写入录制文件
+
+    写入线程安全，可以直接在采集线程里调用write_frame。
+    """
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self._file = open(self.path, 'wb')
+        self._lock = threading.Lock()
+        self._index = []
+        self._file.write(_FILE_HEADER.pack(FILE_MAGIC, FORMAT_VERSION, 0))
+        self._file.write(b'\0' * _padding(_FILE_HEADER.size))
+
+    def write_frame(self, stream: int, data: np.ndarray, timestamp: int, frame_index: int = 0) -> None:
+        dtype_code = _DTYPE_CODES.get(data.dtype)
+        if dtype_code is None:
+            raise ValueError(f"Unsupported frame dtype: {data.dtype}")
+        height, width = data.shape[:2]
+        channels = data.shape[2] if data.ndim == 3 else 1
+        data = np.ascontiguousarray(data)
+
+        with self._lock:
+            header = _CHUNK_HEADER.pack(CHUNK_MAGIC, stream, frame_index, timestamp,
+                                        width, height, channels, dtype_code, data.nbytes)
+            position = self._file.tell()
+            self._file.write(header)
+            self._file.write(b'\0' * _padding(position + len(header)))
+            offset = self._file.tell()
+            self._file.write(data.data)
+            self._file.write(b'\0' * _padding(offset + data.nbytes))
+            self._index.append((stream, frame_index, timestamp, offset, width, height, channels, dtype_code))
+
+    def write_color(self, data: np.ndarray, timestamp: int, frame_index: int = 0) -> None:
+        self.write_frame(COLOR_STREAM, data, timestamp, frame_index)
+
+    def write_depth(self, data: np.ndarray, timestamp: int, frame_index: int = 0) -> None:
+        self.write_frame(DEPTH_STREAM, data, timestamp, frame_index)
+
+    def write_ir(self, data: np.ndarray, timestamp: int, frame_index: int = 0) -> None:
+        self.write_frame(IR_STREAM, data, timestamp, frame_index)
+
+    @property
+    def frame_count(self) -> int:
+        return len(self._index)
+
+    def close(self) -> None:
+        """写入索引和文件尾"""
+        with self._lock:
+            if self._file is None:
+                return
+            index = np.array(self._index, dtype=INDEX_DTYPE)
+            index_offset = self._file.tell()
+            self._file.write(index.tobytes())
+            self._file.write(_FOOTER.pack(INDEX_MAGIC, index_offset, len(index)))
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class HawkRecordingReader:
+    """
+    mmap方式读取录制文件，get_frame返回指向文件映射的NumPy视图（零拷贝）
+
+    映射为写时复制，下游就地修改视图不会写回录制文件。
+    """
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self._file = open(self.path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_COPY)
+
+        magic, version, _ = _FILE_HEADER.unpack_from(self._mmap, 0)
+        if magic != FILE_MAGIC:
+            raise ValueError(f"Not a hawk recording: {self.path}")
+        self.version = version
+
+        self.index = self._read_index()
+        self._stream_rows = {
+            stream: np.flatnonzero(self.index['stream'] == stream)
+            for stream in np.unique(self.index['stream'])
+        }
+
+    def _read_index(self) -> np.ndarray:
+        size = len(self._mmap)
+        if size >= _FOOTER.size:
+            magic, index_offset, count = _FOOTER.unpack_from(self._mmap, size - _FOOTER.size)
+            if magic == INDEX_MAGIC:
+                return np.frombuffer(self._mmap, dtype=INDEX_DTYPE, count=count, offset=index_offset)
+        return self._rebuild_index()
+
+    def _rebuild_index(self) -> np.ndarray:
+        """没有索引（录制被中断）时顺序扫描帧块"""
+        entries = []
+        position = _FILE_HEADER.size + _padding(_FILE_HEADER.size)
+        size = len(self._mmap)
+        while position + _CHUNK_HEADER.size <= size:
+            (magic, stream, frame_index, timestamp, width, height,
+             channels, dtype_code, data_size) = _CHUNK_HEADER.unpack_from(self._mmap, position)
+            if magic != CHUNK_MAGIC:
+                break
+            offset = position + _CHUNK_HEADER.size
+            offset += _padding(offset)
+            if offset + data_size > size:
+                break
+            entries.append((stream, frame_index, timestamp, offset, width, height, channels, dtype_code))
+            position = offset + data_size + _padding(offset + data_size)
+        return np.array(entries, dtype=INDEX_DTYPE)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def streams(self):
+        return list(self._stream_rows.keys())
+
+    def frame_count(self, stream: int) -> int:
+        rows = self._stream_rows.get(stream)
+        return 0 if rows is None else len(rows)
+
+    def _view(self, row: int) -> np.ndarray:
+        entry = self.index[row]
+        dtype = _DTYPES[int(entry['dtype'])]
+        height, width, channels = int(entry['height']), int(entry['width']), int(entry['channels'])
+        shape = (height, width, channels) if channels > 1 else (height, width)
+        return np.frombuffer(self._mmap, dtype=dtype, count=height * width * channels,
+                             offset=int(entry['offset'])).reshape(shape)
+
+    def get_frame(self, stream: int, position: int) -> Tuple[np.ndarray, Dict[str, int]]:
+        """按流内序号取帧，返回(视图, 元信息)"""
+        row = int(self._stream_rows[stream][position])
+        entry = self.index[row]
+        return self._view(row), {
+            'stream': int(entry['stream']),
+            'frame_index': int(entry['frame_index']),
+            'timestamp': int(entry['timestamp']),
+        }
+
+    def timestamps(self, stream: int) -> np.ndarray:
+        rows = self._stream_rows.get(stream)
+        if rows is None:
+            return np.empty(0, dtype=np.uint64)
+        return self.index['timestamp'][rows]
+
+    def seek(self, stream: int, timestamp: int) -> int:
+        """返回指定流中第一个时间戳不小于timestamp的帧序号"""
+        return int(np.searchsorted(self.timestamps(stream), timestamp))
+
+    def iter_frames(self) -> Iterator[Tuple[np.ndarray, Dict[str, int]]]:
+        """按写入顺序遍历所有帧"""
+        for row in range(len(self.index)):
+            entry = self.index[row]
+            yield self._view(row), {
+                'stream': int(entry['stream']),
+                'frame_index': int(entry['frame_index']),
+                'timestamp': int(entry['timestamp']),
+            }
+
+    def close(self) -> None:
+        self.index = None
+        self._stream_rows = {}
+        try:
+            self._mmap.close()
+        except BufferError:
+            # 仍有视图引用映射内存，交给GC在视图释放后回收
+            pass
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class RecordingFrameSource:
+    """
+    模拟设备的帧源：回放录制文件
+
+    realtime为True时按录制的SDK时间戳节奏出帧，否则尽可能快；loop控制播完后是否从头开始。
+    """
+
+    def __init__(self, path: str, realtime: bool = True, loop: bool = False):
+        self.reader = HawkRecordingReader(path)
+        self.realtime = realtime
+        self.loop = loop
+        self._first_timestamp = {
+            stream: int(self.reader.timestamps(stream)[0])
+            for stream in self.reader.streams if self.reader.frame_count(stream) > 0
+        }
+
+    def _position(self, stream_type: int, index: int) -> Optional[int]:
+        count = self.reader.frame_count(stream_type)
+        if count == 0:
+            return None
+        if index >= count and not self.loop:
+            return None
+        return index % count
+
+    def frame_size(self, stream_type: int) -> Tuple[int, int]:
+        if self.reader.frame_count(stream_type) == 0:
+            return 0, 0
+        frame, _ = self.reader.get_frame(stream_type, 0)
+        return frame.shape[1], frame.shape[0]
+
+    def read(self, stream_type: int, index: int) -> Optional[np.ndarray]:
+        position = self._position(stream_type, index)
+        if position is None:
+            return None
+        frame, _ = self.reader.get_frame(stream_type, position)
+        return frame
+
+    def frame_info(self, stream_type: int, index: int) -> Optional[Tuple[int, int]]:
+        """返回(相对首帧的录制时刻/微秒, SDK帧序号)"""
+        position = self._position(stream_type, index)
+        if position is None:
+            return None
+        _, meta = self.reader.get_frame(stream_type, position)
+        count = self.reader.frame_count(stream_type)
+        timestamps = self.reader.timestamps(stream_type)
+        # 循环播放时把每一轮的时长累加上去，保证时间单调
+        span = int(timestamps[-1]) - self._first_timestamp[stream_type]
+        span += span // max(count - 1, 1)
+        offset = meta['timestamp'] - self._first_timestamp[stream_type] + (index // count) * span
+        return offset, meta['frame_index']
+
+
+def record_session(output: str, seconds: float, backend: str = 'berxel',
+                   with_ir: bool = False, options: Optional[Dict[str, Any]] = None) -> int:
+    """从相机录制一段RGB+深度(+IR)会话，返回写入的帧数"""
+    from src.devices.device_backend import create_hawk_context
+
+    context = create_hawk_context(backend, options)
+    context.initCamera()
+    devices = context.getDeviceList()
+    if len(devices) < 1:
+        raise RuntimeError("No device found")
+    device = context.openDevice(devices[0])
+    if device is None:
+        raise RuntimeError("Failed to open device")
+
+    stream_flags = COLOR_STREAM | DEPTH_STREAM | (IR_STREAM if with_ir else 0)
+    readers = [(COLOR_STREAM, device.readColorFrame, 'asColorArray'),
+               (DEPTH_STREAM, device.readDepthFrame, 'asDepthArray')]
+    if with_ir:
+        readers.append((IR_STREAM, device.readIrFrame, 'asDepthArray'))
+
+    device.setDenoiseStatus(False)
+    if device.startStreams(stream_flags) != 0:
+        raise RuntimeError("Failed to start streams")
+
+    try:
+        with HawkRecorder(output) as recorder:
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                for stream, read, as_array in readers:
+                    lease = device.leaseFrame(read(30))
+                    if lease is None:
+                        continue
+                    with lease:
+                        recorder.write_frame(stream, getattr(lease, as_array)(),
+                                             lease.getTimeStamp(), lease.getFrameIndex())
+            return recorder.frame_count
+    finally:
+        device.stopStream(stream_flags)
+        context.clsoeDevice(device)
+        context.destroyCamera()
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='Record or inspect hawk RGB-D recordings')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record = subparsers.add_parser('record', help='录制一段会话')
+    record.add_argument('output', type=str)
+    record.add_argument('--seconds', type=float, default=10.0)
+    record.add_argument('--backend', type=str, choices=['berxel', 'simulated'], default='berxel')
+    record.add_argument('--ir', action='store_true', help='同时录制IR流')
+
+    info = subparsers.add_parser('info', help='查看录制文件信息')
+    info.add_argument('path', type=str)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.command == 'record':
+        count = record_session(args.output, args.seconds, args.backend, args.ir)
+        print(f"Recorded {count} frames to {args.output}")
+    else:
+        with HawkRecordingReader(args.path) as reader:
+            print(f"{args.path}: {len(reader)} frames, {os.path.getsize(args.path)} bytes")
+            for stream in reader.streams:
+                timestamps = reader.timestamps(stream)
+                name = BerxelHawkStreamType.get(int(stream), str(stream))
+                duration = (int(timestamps[-1]) - int(timestamps[0])) / 1e6 if len(timestamps) > 1 else 0.0
+                print(f"  {name}: {len(timestamps)} frames, {duration:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,476 @@
+import glob
+import os
+import threading
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+from src.devices.BerxelSdkDriver.BerxelHawkDefines import *
+from src.devices.BerxelSdkDriver.BerxelHawkFrame import BerxelHawkFrameLease, BerxelHawkLeaseTracker
+from src.utils.depth_units import mm_to_depth
+
+
+COLOR_STREAM = BerxelHawkStreamType.forward_dict['BERXEL_HAWK_COLOR_STREAM']
+DEPTH_STREAM = BerxelHawkStreamType.forward_dict['BERXEL_HAWK_DEPTH_STREAM']
+IR_STREAM = BerxelHawkStreamType.forward_dict['BERXEL_HAWK_IR_STREAM']
+
+_PIXEL_TYPES = {
+    COLOR_STREAM: BerxelHawkPixelType.forward_dict['BERXEL_HAWK_PIXEL_TYPE_IMAGE_RGB24'],
+    DEPTH_STREAM: BerxelHawkPixelType.forward_dict['BERXEL_HAWK_PIXEL_TYPE_DEP_16BIT_12I_4D'],
+    IR_STREAM: BerxelHawkPixelType.forward_dict['BERXEL_HAWK_PIXEL_TYPE_IR_16BIT'],
+}
+
+
+class SyntheticFrameSource:
+    """
+    合成帧源：一个在画面中缓慢移动的"手"（彩色方块 + 更近的深度块）
+
+    预先生成num_frames帧循环播放，生成开销不会干扰吞吐量测量。
+    """
+
+    def __init__(self, width: int = 640, height: int = 400, num_frames: int = 60):
+        self.width = width
+        self.height = height
+        self.num_frames = max(int(num_frames), 1)
+        self._color = []
+        self._depth = []
+        self._generate()
+
+    def _generate(self) -> None:
+        h, w = self.height, self.width
+        ys, xs = np.mgrid[0:h, 0:w]
+        background = np.empty((h, w, 3), dtype=np.uint8)
+        background[..., 0] = (xs * 255 // max(w - 1, 1)).astype(np.uint8)
+        background[..., 1] = (ys * 255 // max(h - 1, 1)).astype(np.uint8)
+        background[..., 2] = 96
+        # 深度按声明的像素格式（12I_4D，1/16毫米）编码：背景2.5米，手0.8米
+        depth_background = np.full((h, w), mm_to_depth(2500, _PIXEL_TYPES[DEPTH_STREAM]), dtype=np.uint16)
+        hand_depth = mm_to_depth(800, _PIXEL_TYPES[DEPTH_STREAM])
+
+        size = max(min(h, w) // 4, 1)
+        for i in range(self.num_frames):
+            phase = 2 * np.pi * i / self.num_frames
+            cx = int(w / 2 + w / 4 * np.cos(phase))
+            cy = int(h / 2 + h / 6 * np.sin(phase))
+            y0, y1 = max(cy - size // 2, 0), min(cy + size // 2, h)
+            x0, x1 = max(cx - size // 2, 0), min(cx + size // 2, w)
+
+            color = background.copy()
+            color[y0:y1, x0:x1] = (224, 172, 140)
+            depth = depth_background.copy()
+            depth[y0:y1, x0:x1] = hand_depth
+            self._color.append(color)
+            self._depth.append(depth)
+
+    def frame_size(self, stream_type: int) -> Tuple[int, int]:
+        return self.width, self.height
+
+    def read(self, stream_type: int, index: int) -> Optional[np.ndarray]:
+        if stream_type == COLOR_STREAM:
+            return self._color[index % self.num_frames]
+        if stream_type == DEPTH_STREAM:
+            return self._depth[index % self.num_frames]
+        if stream_type == IR_STREAM:
+            return self._depth[index % self.num_frames]
+        return None
+
+    def frame_info(self, stream_type: int, index: int) -> Optional[Tuple[int, int]]:
+        # 没有录制时间戳，由模拟设备按fps生成
+        return None
+
+
+class ImageFolderFrameSource:
+    """
+    从DataCollector保存的图片回放：*_rgb.jpg 与同名 *_depth.png 成对读取
+
+    图片在初始化时全部解码进内存，回放阶段不再有磁盘和解码开销。
+    """
+
+    def __init__(self, path: str, max_frames: Optional[int] = None):
+        import cv2
+
+        rgb_files = sorted(glob.glob(os.path.join(path, '*_rgb.jpg')))
+        if max_frames:
+            rgb_files = rgb_files[:max_frames]
+
+        self._color = []
+        self._depth = []
+        for rgb_file in rgb_files:
+            depth_file = rgb_file[:-len('_rgb.jpg')] + '_depth.png'
+            if not os.path.exists(depth_file):
+                continue
+            bgr = cv2.imread(rgb_file)
+            depth = cv2.imread(depth_file, cv2.IMREAD_UNCHANGED)
+            if bgr is None or depth is None:
+                continue
+            # DataCollector保存时做过RGB->BGR转换，这里还原成SDK输出的RGB顺序
+            self._color.append(cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB))
+            self._depth.append(depth.astype(np.uint16, copy=False))
+
+        if not self._color:
+            raise FileNotFoundError(f"No *_rgb.jpg/*_depth.png pairs found in {path}")
+        self.num_frames = len(self._color)
+
+    def frame_size(self, stream_type: int) -> Tuple[int, int]:
+        frames = self._color if stream_type == COLOR_STREAM else self._depth
+        return frames[0].shape[1], frames[0].shape[0]
+
+    def read(self, stream_type: int, index: int) -> Optional[np.ndarray]:
+        if stream_type == COLOR_STREAM:
+            return self._color[index % self.num_frames]
+        if stream_type in (DEPTH_STREAM, IR_STREAM):
+            return self._depth[index % self.num_frames]
+        return None
+
+    def frame_info(self, stream_type: int, index: int) -> Optional[Tuple[int, int]]:
+        # 没有录制时间戳，由模拟设备按fps生成
+        return None
+
+
+def create_frame_source(source: str = 'synthetic', **options):
+    """按名称创建帧源"""
+    if source == 'synthetic':
+        return SyntheticFrameSource(options.get('width', 640),
+                                    options.get('height', 400),
+                                    options.get('num_frames', 60))
+    if source == 'images':
+        return ImageFolderFrameSource(options['path'], options.get('max_frames'))
+    if source == 'recording':
+        from src.devices.recording import RecordingFrameSource
+        return RecordingFrameSource(options['path'],
+                                    options.get('realtime', True),
+                                    options.get('loop', False))
+    raise ValueError(f"Unsupported simulated frame source: {source}")
+
+
+class SimulatedHawkFrame(object):
+    """与BerxelHawkFrame接口一致的模拟帧，数据直接指向NumPy数组"""
+
+    def __init__(self, data: np.ndarray, streamType: int, frameIndex: int, timestamp: int, fps: int):
+        self._data = np.ascontiguousarray(data)
+        self._streamType = streamType
+        self._frameIndex = frameIndex
+        self._timestamp = timestamp
+        self._fps = fps
+
+    # 与SDK一样返回ctypes数组，帧租约依赖它来跟踪NumPy视图的生命周期
+    def getDataAsUint8(self):
+        return (c_uint8 * self._data.nbytes).from_buffer(self._data)
+
+    def getDataAsUint16(self):
+        return (c_uint16 * (self._data.nbytes // 2)).from_buffer(self._data)
+
+    def getOriData(self):
+        return self._data.ctypes.data
+
+    def getStreamType(self):
+        return self._streamType
+
+    def getFrameIndex(self):
+        return self._frameIndex
+
+    def getPixelType(self):
+        return _PIXEL_TYPES.get(self._streamType, 0xff)
+
+    def getWidth(self):
+        return self._data.shape[1]
+
+    def getHeight(self):
+        return self._data.shape[0]
+
+    def getDataSize(self):
+        return self._data.nbytes
+
+    def getTimeStamp(self):
+        return self._timestamp
+
+    def getFrameHandle(self):
+        return None
+
+    def getFps(self):
+        return self._fps
+
+
+class SimulatedHawkDevice(object):
+    """
+    模拟的BerxelHawkDevice
+
+    按配置的帧率产生帧：readXxxFrame会等待到下一帧的到达时刻（不超过timeout），
+    fps为0时不限速，尽可能快地出帧。时间戳单位为微秒。
+    """
+
+    def __init__(self, deviceInfo, frameSource, fps: int = 30):
+        self._deviceInfo = deviceInfo
+        self._source = frameSource
+        self._fps = fps
+        self._nativeFps = fps
+        self._lock = threading.Lock()
+        self._openStreams = 0
+        self._startTime = None
+        self._frameCount = {COLOR_STREAM: 0, DEPTH_STREAM: 0, IR_STREAM: 0}
+        self._framesInFlight = 0
+        self._leaseTracker = BerxelHawkLeaseTracker()
+        self._connected = True
+
+    # 帧模式
+    def _makeFrameMode(self, streamType, width, height, fps):
+        pixelType = _PIXEL_TYPES.get(streamType, 0xff)
+        return BerxelHawkStreamFrameMode(pixelType, width, height, fps)
+
+    def getSupportFrameModes(self, streamType):
+        # 帧源分辨率固定，提供创建时帧率及其一半两档帧率
+        width, height = self._source.frame_size(streamType)
+        framerates = sorted(set([max(self._nativeFps // 2, 1), self._nativeFps])) if self._nativeFps > 0 else [0]
+        return [self._makeFrameMode(streamType, width, height, fps) for fps in framerates]
+
+    def getCurrentFrameMode(self, streamType):
+        width, height = self._source.frame_size(streamType)
+        return self._makeFrameMode(streamType, width, height, self._fps)
+
+    def setFrameMode(self, stramtype, mode):
+        if mode is not None and mode.framerate > 0:
+            self._fps = mode.framerate
+        return 0
+
+    def setStreamFlagMode(self, streamFlagMode):
+        return 0
+
+    # 数据流
+    def startStreams(self, streamFlag, callback = None, user = None):
+        with self._lock:
+            self._openStreams |= streamFlag
+            self._startTime = time.monotonic()
+            for streamType in self._frameCount:
+                self._frameCount[streamType] = 0
+        return 0
+
+    def startPushStreams(self, streamFlag, maxQueueSize = 2):
+        # 模拟设备的读帧本身就是按帧到达时刻唤醒的
+        return self.startStreams(streamFlag)
+
+    def isPushMode(self):
+        return False
+
+    def getFrameQueueStats(self):
+        return None
+
+    def stopStream(self, streamFlag):
+        with self._lock:
+            self._openStreams &= ~streamFlag
+        return 0
+
+    def _waitUntil(self, dueTime, timeout):
+        """等待到帧的到达时刻，超过timeout则返回False"""
+        wait = dueTime - time.monotonic()
+        if wait > timeout / 1000.:
+            time.sleep(timeout / 1000.)
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    def _readFrame(self, streamType, timeout):
+        if not self._connected:
+            # 设备已断开，模拟SDK读帧超时
+            time.sleep(timeout / 1000.)
+            return None
+        if not (self._openStreams & streamType):
+            return None
+
+        with self._lock:
+            index = self._frameCount[streamType]
+            startTime = self._startTime
+
+        # 录制回放使用录制的时间戳（realtime时按其节奏出帧），否则按fps出帧
+        info = self._source.frame_info(streamType, index)
+        frameIndex = index
+        if info is not None:
+            timestamp, frameIndex = info
+            if self._source.realtime and not self._waitUntil(startTime + timestamp / 1e6, timeout):
+                return None
+        elif self._fps > 0:
+            dueTime = startTime + index / float(self._fps)
+            if not self._waitUntil(dueTime, timeout):
+                return None
+            timestamp = int((dueTime - startTime) * 1e6)
+        else:
+            timestamp = int((time.monotonic() - startTime) * 1e6)
+
+        data = self._source.read(streamType, index)
+        if data is None:
+            # 回放结束，模拟SDK读帧超时
+            time.sleep(timeout / 1000.)
+            return None
+
+        with self._lock:
+            self._frameCount[streamType] = index + 1
+            self._framesInFlight += 1
+        return SimulatedHawkFrame(data, streamType, frameIndex, timestamp, self._fps)
+
+    def readColorFrame(self, timeout):
+        return self._readFrame(COLOR_STREAM, timeout)
+
+    def readDepthFrame(self, timeout):
+        return self._readFrame(DEPTH_STREAM, timeout)
+
+    def readIrFrame(self, timeout):
+        return self._readFrame(IR_STREAM, timeout)
+
+    def releaseFrame(self, hawkFrame):
+        if hawkFrame is None:
+            return -1
+        if isinstance(hawkFrame, BerxelHawkFrameLease):
+            return hawkFrame.release()
+        with self._lock:
+            self._framesInFlight -= 1
+        return 0
+
+    def leaseFrame(self, hawkFrame):
+        if hawkFrame is None or isinstance(hawkFrame, BerxelHawkFrameLease):
+            return hawkFrame
+        return BerxelHawkFrameLease(hawkFrame, self.releaseFrame, self._leaseTracker)
+
+    def getFramesInFlight(self):
+        """尚未release的帧数，用于检查帧泄漏"""
+        return self._framesInFlight
+
+    def getOutstandingLeases(self):
+        return self._leaseTracker.getOutstanding()
+
+    def drainLeases(self, timeout = 1.0):
+        return self._leaseTracker.drain(timeout)
+
+    # 设备信息
+    def getVersion(self):
+        return BerxelVersionInfo()
+
+    def getCurrentDeviceInfo(self):
+        return self._deviceInfo
+
+    def getDeviceIntriscParams(self):
+        params = BerxelHawkDeviceIntrinsicParams()
+        # 数值取自Hawk相机1280x800分辨率下的典型内参
+        for intrinsic in (params.colorIntrinsicParams, params.irIntrinsicParams, params.liteIrIntrinsicParams):
+            intrinsic.fx = 841.507
+            intrinsic.fy = 841.507
+            intrinsic.cx = 636.436
+            intrinsic.cy = 404.947
+        return params
+
+    # 设备设置（模拟设备上均为空操作）
+    def setStreamMirror(self, bMiiror):
+        return 0
+
+    def setRegistrationEnable(self, bEnable):
+        return 0
+
+    def setFrameSync(self, bEnable):
+        return 0
+
+    def setSystemClock(self):
+        return 0
+
+    def setDenoiseStatus(self, bEnable):
+        return 0
+
+    def setColorQuality(self, nValue):
+        return 0
+
+    def setColorExposureGain(self, exposureTime, gain):
+        return 0
+
+    def enableColorAutoExposure(self):
+        return 0
+
+    def setTemporalDenoiseStatus(self, bEnable):
+        return 0
+
+    def setSpatialDenoiseStatus(self, bEnable):
+        return 0
+
+
+class SimulatedHawkContext(object):
+    """
+    模拟的BerxelHawkContext，可在没有相机和SDK动态库的机器上跑完整条流水线
+
+    Args:
+        num_devices: 模拟的设备数量
+        fps: 出帧速率，0表示不限速
+        source: 帧源类型，synthetic、images 或 recording
+        其余参数传给帧源（width/height/num_frames、path/max_frames 或 path/realtime/loop）
+    """
+
+    def __init__(self, num_devices: int = 1, fps: int = 30, source: str = 'synthetic', **sourceOptions):
+        self._numDevices = max(int(num_devices), 1)
+        self._fps = fps
+        self._source = source
+        self._sourceOptions = sourceOptions
+        self._frameSource = None
+        self._statusCallback = None
+        self._statusUserData = None
+        self._openedDevices = {}
+        self._disconnected = set()
+        self.mDeviceList = []
+
+    def initCamera(self):
+        if self._frameSource is None:
+            self._frameSource = create_frame_source(self._source, **self._sourceOptions)
+
+    def destroyCamera(self):
+        self.mDeviceList = []
+
+    def getDeviceList(self):
+        self.mDeviceList = []
+        for index in range(self._numDevices):
+            if ("SIM%05d" % index).encode() in self._disconnected:
+                continue
+            info = BerxelHawkDeviceInfo()
+            info.vendorId = 0x0603
+            info.productId = 0x0009
+            info.deviceNum = index
+            info.serialNumber = ("SIM%05d" % index).encode()
+            info.deviceAddress = ("sim://%d" % index).encode()
+            self.mDeviceList.append(info)
+        return self.mDeviceList
+
+    def setDeviceStausCallBack(self, callback, data):
+        self._statusCallback = callback
+        self._statusUserData = data
+        return 0
+
+    def openDevice(self, deviceinfo):
+        if deviceinfo.serialNumber in self._disconnected:
+            return None
+        if self._frameSource is None:
+            self.initCamera()
+        device = SimulatedHawkDevice(deviceinfo, self._frameSource, self._fps)
+        self._openedDevices[deviceinfo.serialNumber] = device
+        return device
+
+    def setDeviceConnected(self, serialNumber, connected):
+        """
+        模拟USB拔插：断开后已打开的设备不再出帧、openDevice失败，
+        并像SDK一样通过设备状态回调通知(deviceUri, serialNumber, deviceState, userData)
+        """
+        if connected:
+            self._disconnected.discard(serialNumber)
+        else:
+            self._disconnected.add(serialNumber)
+            device = self._openedDevices.get(serialNumber)
+            if device is not None:
+                device._connected = False
+
+        if self._statusCallback is not None:
+            index = int(serialNumber[3:])
+            state = BerxelHawkDeviceStatus.forward_dict[
+                'BERXEL_HAWK_DEVICE_CONNECT' if connected else 'BERXEL_HAWK_DEVICE_DISCONNECT']
+            self._statusCallback(("sim://%d" % index).encode(), serialNumber, state, self._statusUserData)
+
+    def clsoeDevice(self, device):
+        if device is None:
+            return -1
+        device.stopStream(COLOR_STREAM | DEPTH_STREAM | IR_STREAM)
+        if self._openedDevices.get(device._deviceInfo.serialNumber) is device:
+            del self._openedDevices[device._deviceInfo.serialNumber]
+        return 0
@@ -0,0 +1,211 @@
+import logging
+from pathlib import Path
+from typing import Optional, Dict, Any, Iterable, Tuple, Union
+
+import cv2
+import numpy as np
+import yaml
+
+from src.utils.depth_units import DEFAULT_DEPTH_PIXEL_TYPE, mm_per_unit
+
+
+# 显示用的固定范围（毫米），与原先 (depth / 10000.) * 255 的灰度显示一致（12I_4D下原始值10000为625毫米）
+DISPLAY_RANGE = (0, 625)
+
+
+def build_depth_lut(min_depth: float, max_depth: float, colormap: Optional[int] = cv2.COLORMAP_JET,
+                    invalid_color=0, pixel_type: int = DEFAULT_DEPTH_PIXEL_TYPE) -> np.ndarray:
+    """
+    生成uint16原始深度值到颜色的查找表
+
+    min_depth~max_depth（毫米）线性映射到0~255，原始值按pixel_type换算为毫米，范围外的值截断到两端；
+    深度为0（无效像素）映射为invalid_color。
+
+    Returns:
+        colormap为None时为 (65536,) 灰度表，否则为 (65536, 3) BGR表
+    """
+    if max_depth <= min_depth:
+        raise ValueError(f"Invalid depth range: [{min_depth}, {max_depth}]")
+    depth = np.arange(65536, dtype=np.float32) * np.float32(mm_per_unit(pixel_type))
+    levels = np.clip((depth - min_depth) * (255.0 / (max_depth - min_depth)), 0, 255)
+    levels = np.round(levels).astype(np.uint8)
+    if colormap is None:
+        lut = levels
+    else:
+        lut = cv2.applyColorMap(levels.reshape(-1, 1), colormap).reshape(-1, 3)
+    lut[0] = invalid_color
+    return np.ascontiguousarray(lut)
+
+
+def calibrate_depth_range(depth_frames: Iterable[np.ndarray], low_percentile: float = 1.0,
+                          high_percentile: float = 99.0,
+                          pixel_type: int = DEFAULT_DEPTH_PIXEL_TYPE) -> Tuple[float, float]:
+    """
+    按一组原始深度图中有效像素的分位数确定映射范围，返回毫米
+
+    逐帧累加65536级直方图，不需要把所有像素放进内存。
+    """
+    histogram = np.zeros(65536, dtype=np.int64)
+    for depth in depth_frames:
+        histogram += np.bincount(depth.ravel().astype(np.uint16), minlength=65536)
+    histogram[0] = 0
+    total = histogram.sum()
+    if total == 0:
+        raise ValueError("No valid depth pixels to calibrate from")
+    cumulative = np.cumsum(histogram)
+    low = int(np.searchsorted(cumulative, total * low_percentile / 100.0))
+    high = max(int(np.searchsorted(cumulative, total * high_percentile / 100.0)), low + 1)
+    scale = mm_per_unit(pixel_type)
+    return low * scale, high * scale
+
+
+def colormap_code(name: Optional[str]) -> Optional[int]:
+    """把配置中的色表名（jet/turbo/...，none表示灰度）转换成OpenCV常量"""
+    if name is None or str(name).lower() in ('none', 'gray', 'grey'):
+        return None
+    code = getattr(cv2, f"COLORMAP_{str(name).upper()}", None)
+    if code is None:
+        raise ValueError(f"Unsupported colormap: {name}")
+    return code
+
+
+class DepthColorizer:
+    """
+    基于查找表的深度伪彩色化
+
+    查找表在构造时按固定范围生成一次，每帧只做一次查表（np.take），结果写入复用的输出缓冲区，
+    没有归一化、类型转换产生的临时数组；固定范围也使同一距离在不同画面中颜色一致。
+    训练数据准备（ModelTrainer.prepare_depth_dataset）和运行时（DualModelTracker）使用
+    同一个类和同一个范围，深度模型训练和推理看到的输入保持一致。
+    """
+
+    def __init__(self, min_depth: float = 200, max_depth: float = 1500,
+                 colormap: Optional[int] = cv2.COLORMAP_JET, invalid_color=0,
+                 pixel_type: int = DEFAULT_DEPTH_PIXEL_TYPE):
+        """
+        Args:
+            min_depth / max_depth: 映射范围（毫米）
+            colormap: OpenCV色表常量，None表示输出单通道灰度
+            invalid_color: 深度为0的像素颜色
+            pixel_type: 深度像素格式，决定原始深度值到毫米的换算
+        """
+        self.min_depth = min_depth
+        self.max_depth = max_depth
+        self.colormap = colormap
+        self.invalid_color = invalid_color
+        self.pixel_type = pixel_type
+        self.lut = build_depth_lut(min_depth, max_depth, colormap, invalid_color, pixel_type)
+        self._buffer = None
+
+    @property
+    def depth_range(self) -> Tuple[float, float]:
+        return self.min_depth, self.max_depth
+
+    def set_depth_pixel_type(self, pixel_type: int) -> None:
+        """设置深度流的像素格式，由追踪器在启动数据流后调用；格式变化时重建查找表"""
+        if pixel_type != self.pixel_type:
+            self.pixel_type = pixel_type
+            self.lut = build_depth_lut(self.min_depth, self.max_depth, self.colormap, self.invalid_color,
+                                       pixel_type)
+
+    def colorize(self, depth_frame: np.ndarray, reuse: bool = True,
+                 out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        深度图查表上色
+
+        Args:
+            depth_frame: uint16深度图（其他整数类型会先转换为uint16）
+            reuse: True时写入内部复用的缓冲区（下一次调用会覆盖）；
+                   结果需要跨线程保留（如流水线模式）时传False返回新数组
+            out: 调用方提供的输出数组（可以是更大数组的一个通道），优先于reuse
+        """
+        if depth_frame.dtype != np.uint16:
+            depth_frame = depth_frame.astype(np.uint16)
+        # uint16索引不会越界，mode='clip'省去越界检查和输出的中间缓冲
+        if out is not None:
+            return np.take(self.lut, depth_frame, axis=0, out=out, mode='clip')
+        shape = depth_frame.shape + self.lut.shape[1:]
+        if not reuse:
+            return np.take(self.lut, depth_frame, axis=0)
+        if self._buffer is None or self._buffer.shape != shape:
+            self._buffer = np.empty(shape, dtype=np.uint8)
+        return np.take(self.lut, depth_frame, axis=0, out=self._buffer, mode='clip')
+
+    def save_range(self, path: Union[str, Path]) -> None:
+        """把映射范围（毫米）写入yaml，供运行时通过depth_range_file读取"""
+        with open(path, 'w', encoding='utf-8') as f:
+            yaml.safe_dump({'min_mm': float(self.min_depth), 'max_mm': float(self.max_depth)}, f)
+
+    @staticmethod
+    def load_range(path: Union[str, Path]) -> Tuple[float, float]:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = yaml.safe_load(f)
+        return data['min_mm'], data['max_mm']
+
+
+class MinMaxDepthColorizer:
+    """
+    逐帧min-max归一化后上色（cv2.normalize(NORM_MINMAX) + applyColorMap）
+
+    没有标定的深度范围时使用，与原有深度模型训练时的输入一致；同一距离在不同画面中颜色不同，
+    训练数据改用固定范围准备后应通过depth_range_file切换到DepthColorizer。接口与DepthColorizer相同。
+    """
+
+    def __init__(self, colormap: Optional[int] = cv2.COLORMAP_JET):
+        self.colormap = colormap
+        self._levels = None
+        self._buffer = None
+
+    @property
+    def depth_range(self) -> None:
+        return None
+
+    def set_depth_pixel_type(self, pixel_type: int) -> None:
+        """逐帧归一化与深度单位无关"""
+
+    def colorize(self, depth_frame: np.ndarray, reuse: bool = True,
+                 out: Optional[np.ndarray] = None) -> np.ndarray:
+        """参数含义同DepthColorizer.colorize"""
+        if self._levels is None or self._levels.shape != depth_frame.shape:
+            self._levels = np.empty(depth_frame.shape, dtype=np.uint8)
+        cv2.normalize(depth_frame, self._levels, 0, 255, cv2.NORM_MINMAX, cv2.CV_8U)
+
+        shape = depth_frame.shape if self.colormap is None else depth_frame.shape + (3,)
+        if out is None and not reuse:
+            out = np.empty(shape, dtype=np.uint8)
+        elif out is None:
+            if self._buffer is None or self._buffer.shape != shape:
+                self._buffer = np.empty(shape, dtype=np.uint8)
+            out = self._buffer
+        if self.colormap is None:
+            np.copyto(out, self._levels)
+            return out
+        return cv2.applyColorMap(self._levels, self.colormap, dst=out)
+
+
+def create_depth_colorizer(config: Dict[str, Any], grayscale: bool = False,
+                           pixel_type: int = DEFAULT_DEPTH_PIXEL_TYPE):
+    """
+    按配置创建深度模型输入用的着色器
+
+    depth_range_file存在时使用训练数据准备时标定的范围，否则使用depth_range（毫米）；
+    两者都没有时退回逐帧min-max归一化（MinMaxDepthColorizer），与原有深度模型的训练输入一致。
+    grayscale为True时忽略depth_colormap，输出单通道（早期融合模型的深度通道）。
+    """
+    colormap = None if grayscale else colormap_code(config['depth_colormap'])
+    range_file = config.get('depth_range_file')
+    if range_file and Path(range_file).exists():
+        min_depth, max_depth = DepthColorizer.load_range(range_file)
+    elif config.get('depth_range'):
+        min_depth, max_depth = config['depth_range']
+    else:
+        logging.getLogger('DepthColorizer').warning(
+            f"No calibrated depth range (depth_range_file: {range_file}, depth_range not set), "
+            f"using per-frame min-max normalisation")
+        return MinMaxDepthColorizer(colormap)
+    return DepthColorizer(min_depth, max_depth, colormap, pixel_type=pixel_type)
+
+
+def create_display_colorizer(colormap: Optional[int] = None) -> DepthColorizer:
+    """创建显示用的着色器（固定DISPLAY_RANGE范围），默认输出灰度"""
+    return DepthColorizer(*DISPLAY_RANGE, colormap=colormap)
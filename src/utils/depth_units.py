@@ -0,0 +1,40 @@
+import numpy as np
+from typing import Optional
+
+from src.devices.BerxelSdkDriver.BerxelHawkDefines import BerxelHawkStreamType
+
+# Berxel深度像素格式：16位中整数/小数位的划分决定了原始值到毫米的换算
+PIXEL_TYPE_DEP_16BIT_12I_4D = 0x01
+PIXEL_TYPE_DEP_16BIT_13I_3D = 0x02
+_FRACTION_DIVISOR = {
+    PIXEL_TYPE_DEP_16BIT_12I_4D: 16.0,
+    PIXEL_TYPE_DEP_16BIT_13I_3D: 8.0,
+}
+
+# Hawk深度流的默认格式
+DEFAULT_DEPTH_PIXEL_TYPE = PIXEL_TYPE_DEP_16BIT_12I_4D
+
+
+def mm_per_unit(pixel_type: int = DEFAULT_DEPTH_PIXEL_TYPE) -> float:
+    """原始深度值1对应的毫米数；未知格式按原始值即毫米处理"""
+    return 1.0 / _FRACTION_DIVISOR.get(pixel_type, 1.0)
+
+
+def depth_to_mm(depth: np.ndarray, pixel_type: int = DEFAULT_DEPTH_PIXEL_TYPE,
+                out: Optional[np.ndarray] = None) -> np.ndarray:
+    """把uint16原始深度帧换算为float32毫米，out为形状匹配的float32数组时直接写入"""
+    return np.multiply(depth, np.float32(mm_per_unit(pixel_type)), out=out, dtype=np.float32,
+                       casting='unsafe')
+
+
+def mm_to_depth(mm: float, pixel_type: int = DEFAULT_DEPTH_PIXEL_TYPE) -> float:
+    """把毫米换算为原始深度值（用于阈值等标量）"""
+    return mm / mm_per_unit(pixel_type)
+
+
+def depth_pixel_type(device) -> int:
+    """读取设备当前深度流的像素格式，读取失败时返回默认格式"""
+    mode = device.getCurrentFrameMode(BerxelHawkStreamType.forward_dict['BERXEL_HAWK_DEPTH_STREAM'])
+    if mode is None or mode.pixelFormat not in _FRACTION_DIVISOR:
+        return DEFAULT_DEPTH_PIXEL_TYPE
+    return mode.pixelFormat
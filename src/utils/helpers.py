@@ -25,16 +25,31 @@ def generate_html_response(class_name: Optional[str]) -> tuple:
     return html, 200
 
 def generate_mjpg_stream(tracker):
-    """生成 MJPEG 视频流"""
-    while True:
-        frame = tracker.get_latest_frame()
-        if frame is not None:
-            ret, jpeg = cv2.imencode('.jpg', frame)
-            if ret:
-                yield (b'--frame\r\n'
-                      b'Content-Type: image/jpeg\r\n\r\n' +
-                      jpeg.tobytes() + b'\r\n')
+    """
+    生成 MJPEG 视频流
+
+    连接期间向追踪器登记为一个观看者，追踪器只在有观看者时绘制识别结果；
+    客户端断开时生成器被关闭，观看者随之注销。每个客户端拿到自己的帧副本并在下一轮复用，
+    编码期间不会被其他客户端触发的绘制覆盖。
+    """
+    viewer = hasattr(tracker, 'add_viewer')
+    if viewer:
+        tracker.add_viewer()
+    try:
+        frame = None
+        while True:
+            latest = tracker.get_latest_frame(out=frame)
+            if latest is not None:
+                frame = latest
+                ret, jpeg = cv2.imencode('.jpg', frame)
+                if ret:
+                    yield (b'--frame\r\n'
+                          b'Content-Type: image/jpeg\r\n\r\n' +
+                          jpeg.tobytes() + b'\r\n')
             time.sleep(1 / 30)
+    finally:
+        if viewer:
+            tracker.remove_viewer()
 
 
 def load_config(config_path: str) -> Dict[str, Any]:
@@ -0,0 +1,103 @@
+import numpy as np
+from typing import Optional
+
+from src.utils.depth_units import PIXEL_TYPE_DEP_16BIT_12I_4D, mm_per_unit
+
+# getDeviceIntriscParams()返回的是1280x800分辨率下的内参
+INTRINSICS_WIDTH = 1280
+
+
+class DepthToPointCloud:
+    """
+    向量化的深度图转点云
+
+    按当前帧模式预先计算每个像素的射线方向 ((u-cx)/fx, (v-cy)/fy, 1)，
+    每帧只需一次乘法即可得到 (H, W, 3) float32 点云，结果写入可复用的输出缓冲区。
+    替代 converDepthToPoint + 逐点遍历 BerxelHawkPoint3DList 的做法。
+    """
+
+    def __init__(self, fx: float, fy: float, cx: float, cy: float,
+                 width: int, height: int,
+                 factor: float = 1000.0,
+                 pixel_type: int = PIXEL_TYPE_DEP_16BIT_12I_4D):
+        """
+        Args:
+            fx, fy, cx, cy: 与width/height对应分辨率下的相机内参
+            width, height: 深度帧尺寸
+            factor: 毫米到输出单位的除数，1000.0 输出米
+            pixel_type: 深度像素格式（BerxelHawkPixelType）
+        """
+        self.width = width
+        self.height = height
+        self.scale = np.float32(mm_per_unit(pixel_type) / factor)
+
+        u = (np.arange(width, dtype=np.float32) - cx) / fx
+        v = (np.arange(height, dtype=np.float32) - cy) / fy
+        self._rays = np.empty((height, width, 3), dtype=np.float32)
+        self._rays[..., 0] = u[np.newaxis, :]
+        self._rays[..., 1] = v[:, np.newaxis]
+        self._rays[..., 2] = 1.0
+
+        self._z = np.empty((height, width), dtype=np.float32)
+        self._out = np.empty((height, width, 3), dtype=np.float32)
+
+    @classmethod
+    def from_device(cls, device, width: int, height: int,
+                    registered: bool = False,
+                    factor: float = 1000.0,
+                    pixel_type: int = PIXEL_TYPE_DEP_16BIT_12I_4D) -> 'DepthToPointCloud':
+        """
+        从设备内参构造；内参按当前帧宽度相对1280的比例缩放
+
+        深度图配准到彩色后应使用彩色相机内参（registered=True）。
+        """
+        params = device.getDeviceIntriscParams()
+        if params is None:
+            raise RuntimeError("Failed to read device intrinsic parameters")
+        intrinsic = params.colorIntrinsicParams if registered else params.liteIrIntrinsicParams
+        ratio = width / float(INTRINSICS_WIDTH)
+        return cls(intrinsic.fx * ratio, intrinsic.fy * ratio,
+                   intrinsic.cx * ratio, intrinsic.cy * ratio,
+                   width, height, factor, pixel_type)
+
+    def convert(self, depth: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        把 (H, W) uint16 深度帧转换为 (H, W, 3) float32 点云
+
+        不传out时写入内部缓冲区，下一次调用会覆盖结果；无效深度(0)对应的点为(0, 0, 0)。
+        """
+        if depth.shape != (self.height, self.width):
+            raise ValueError(f"Depth frame shape {depth.shape} does not match "
+                             f"{(self.height, self.width)}")
+        if out is None:
+            out = self._out
+        np.multiply(depth, self.scale, out=self._z, casting='unsafe')
+        np.multiply(self._rays, self._z[..., np.newaxis], out=out)
+        return out
+
+    def valid_points(self, cloud: np.ndarray) -> np.ndarray:
+        """返回深度有效的点，形状 (N, 3)"""
+        return cloud[cloud[..., 2] > 0]
+
+
+def voxel_downsample(points: np.ndarray, voxel_size: float) -> np.ndarray:
+    """
+    体素下采样：同一体素内的点取平均
+
+    Args:
+        points: (N, 3) 点集，可以是 (H, W, 3) 点云（会自动去掉无效点）
+        voxel_size: 体素边长，单位与点坐标一致
+    """
+    if points.ndim == 3:
+        points = points[points[..., 2] > 0]
+    if len(points) == 0:
+        return np.empty((0, 3), dtype=np.float32)
+
+    voxels = np.floor(points / voxel_size).astype(np.int64)
+    _, inverse, counts = np.unique(voxels, axis=0, return_inverse=True, return_counts=True)
+    inverse = inverse.reshape(-1)
+
+    result = np.empty((len(counts), 3), dtype=np.float32)
+    for axis in range(3):
+        result[:, axis] = np.bincount(inverse, weights=points[:, axis], minlength=len(counts)) / counts
+    return result
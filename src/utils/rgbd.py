@@ -0,0 +1,69 @@
+from pathlib import Path
+from typing import Optional, List, NamedTuple
+
+import cv2
+import numpy as np
+
+from src.utils.depth_colorizer import DepthColorizer
+
+
+# 与DataCollector.save_data的命名一致
+RGB_SUFFIX = '_rgb.jpg'
+DEPTH_SUFFIX = '_depth.png'
+RGBD_CHANNELS = 4
+
+
+class RGBDPair(NamedTuple):
+    """同一次采集的RGB图、深度图和标注（没有标注时为None）"""
+    name: str
+    rgb_path: Path
+    depth_path: Path
+    label_path: Optional[Path]
+
+
+def find_rgbd_pairs(split_dir: Path) -> List[RGBDPair]:
+    """
+    在 <split>/images 中把 <名称>_rgb.jpg 与 <名称>_depth.png 配对
+
+    标注依次查找 <split>/labels 下的 <名称>_rgb.txt、<名称>.txt、<名称>_depth.txt。
+    只有一半的图像被跳过。
+    """
+    image_dir = Path(split_dir) / 'images'
+    label_dir = Path(split_dir) / 'labels'
+    pairs = []
+    for rgb_path in sorted(image_dir.glob(f'*{RGB_SUFFIX}')):
+        name = rgb_path.name[:-len(RGB_SUFFIX)]
+        depth_path = image_dir / f'{name}{DEPTH_SUFFIX}'
+        if not depth_path.exists():
+            continue
+        label_path = next((path for path in (label_dir / f'{name}_rgb.txt', label_dir / f'{name}.txt',
+                                             label_dir / f'{name}_depth.txt') if path.exists()), None)
+        pairs.append(RGBDPair(name, rgb_path, depth_path, label_path))
+    return pairs
+
+
+def read_rgbd_pair(pair: RGBDPair):
+    """读取 (BGR图, uint16深度图)，任一读取失败时返回 (None, None)"""
+    bgr = cv2.imread(str(pair.rgb_path), cv2.IMREAD_COLOR)
+    depth = cv2.imread(str(pair.depth_path), cv2.IMREAD_UNCHANGED)
+    if bgr is None or depth is None or depth.dtype != np.uint16:
+        return None, None
+    return bgr, depth
+
+
+def fuse_rgbd(bgr: np.ndarray, depth: np.ndarray, colorizer: DepthColorizer,
+              out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    把BGR图和深度图合成早期融合模型的 (H, W, 4) uint8 输入：B、G、R、深度
+
+    深度通道由灰度着色器得到（与训练时同一范围查表），尺寸与彩色图不同时按最近邻缩放（要求已配准）。
+    out为形状匹配的预分配数组时直接写入，否则新建。训练数据准备和运行时使用同一函数。
+    """
+    height, width = bgr.shape[:2]
+    if depth.shape[:2] != (height, width):
+        depth = cv2.resize(depth, (width, height), interpolation=cv2.INTER_NEAREST)
+    if out is None or out.shape != (height, width, RGBD_CHANNELS):
+        out = np.empty((height, width, RGBD_CHANNELS), dtype=np.uint8)
+    out[:, :, :3] = bgr
+    colorizer.colorize(depth, out=out[:, :, 3])
+    return out
@@ -0,0 +1,125 @@
+import os
+import signal
+import sys
+import time
+
+import numpy as np
+import pytest
+
+onnx = pytest.importorskip('onnx')
+pytest.importorskip('onnxruntime')
+# src.core的包初始化会导入ultralytics
+pytest.importorskip('ultralytics')
+
+from onnx import helper, numpy_helper, TensorProto
+
+from src.core.inference_backend import OnnxRuntimeBackend
+from src.core.process_pool import ProcessPoolBackend
+
+SIZE = 64
+NUM_CLASSES = 2
+OPTIONS = {'conf': 0.1}
+
+
+@pytest.fixture(scope='module')
+def model_path(tmp_path_factory):
+    """YOLO输出格式 (1, 4 + 类别数, 锚点数) 的小模型：一个步长8的卷积加reshape"""
+    rng = np.random.default_rng(0)
+    weights = numpy_helper.from_array(
+        (rng.standard_normal((4 + NUM_CLASSES, 3, 8, 8)) * 0.05).astype(np.float32), 'W')
+    bias = numpy_helper.from_array(np.array([32, 32, 16, 16, 0, 0], np.float32), 'B')
+    shape = numpy_helper.from_array(np.array([0, 4 + NUM_CLASSES, -1], np.int64), 'shape')
+    graph = helper.make_graph(
+        [helper.make_node('Conv', ['images', 'W', 'B'], ['features'], strides=[8, 8]),
+         helper.make_node('Reshape', ['features', 'shape'], ['output0'])],
+        'tiny_yolo',
+        [helper.make_tensor_value_info('images', TensorProto.FLOAT, [1, 3, SIZE, SIZE])],
+        [helper.make_tensor_value_info('output0', TensorProto.FLOAT, [1, 4 + NUM_CLASSES, 'anchors'])],
+        [weights, bias, shape])
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 13)])
+    model.ir_version = 8
+    model.metadata_props.add(key='names', value=str({0: 'a', 1: 'b'}))
+    path = tmp_path_factory.mktemp('model') / 'tiny.onnx'
+    onnx.save(model, str(path))
+    return str(path)
+
+
+def _frames(count):
+    rng = np.random.default_rng(1)
+    return [rng.integers(0, 256, (SIZE, SIZE, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def _assert_same(result, expected):
+    np.testing.assert_allclose(result.boxes.xyxy, expected.boxes.xyxy, rtol=1e-4, atol=1e-3)
+    np.testing.assert_allclose(result.boxes.conf, expected.boxes.conf, rtol=1e-4, atol=1e-5)
+    np.testing.assert_array_equal(result.boxes.cls, expected.boxes.cls)
+
+
+def test_predict_round_trip_and_slot_reuse(model_path):
+    local = OnnxRuntimeBackend(model_path, **OPTIONS)
+    frames = _frames(8)
+    expected = [local.predict(frame)[0] for frame in frames]
+    assert any(len(result.boxes) for result in expected)
+
+    pool = ProcessPoolBackend(model_path, 'onnxruntime', OPTIONS, workers=2, slots=2,
+                              max_frame_shape=(SIZE, SIZE), start_timeout=60, request_timeout=30)
+    try:
+        assert pool.names == {0: 'a', 1: 'b'}
+        assert pool.channels == 3
+
+        result = pool.predict(frames[0])[0]
+        _assert_same(result, expected[0])
+        assert result.names == {0: 'a', 1: 'b'}
+
+        # 请求数多于槽位数：submit在槽位回收前阻塞，每个槽位被多次复用且不串帧
+        results = pool.predict_batch(frames)
+        for result, reference in zip(results, expected):
+            _assert_same(result, reference)
+        stats = pool.get_stats()
+        assert stats['requests'] == 1 + len(frames)
+        assert stats['errors'] == 0
+        assert stats['slots_in_use'] == 0
+    finally:
+        pool.close()
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='needs SIGSTOP/SIGKILL')
+def test_killed_worker_fails_in_flight_requests(model_path):
+    pool = ProcessPoolBackend(model_path, 'onnxruntime', OPTIONS, workers=2, slots=4,
+                              max_frame_shape=(SIZE, SIZE), start_timeout=60, request_timeout=10)
+    try:
+        frames = _frames(4)
+        pool.predict_batch(frames)
+
+        # 两个进程都暂停，请求停留在途，再杀死进程0
+        victim, survivor = pool._processes
+        os.kill(victim.pid, signal.SIGSTOP)
+        os.kill(survivor.pid, signal.SIGSTOP)
+        requests = [pool.submit(frame) for frame in frames]
+        with pool._pending_lock:
+            lost = {id(entry[0]) for entry in pool._pending.values() if entry[2] == 0}
+        assert lost
+        os.kill(victim.pid, signal.SIGKILL)
+        os.kill(survivor.pid, signal.SIGCONT)
+
+        start = time.monotonic()
+        for request in requests:
+            if id(request) in lost:
+                with pytest.raises(RuntimeError, match='exited'):
+                    request.result(10)
+            else:
+                assert len(request.result(10)) == 1
+        assert time.monotonic() - start < 10
+
+        # 槽位全部收回，之后的请求只派发给存活的进程
+        victim.join(5)
+        stats = pool.get_stats()
+        assert stats['alive'] == 1
+        assert stats['slots_in_use'] == 0
+        assert stats['errors'] == len(lost)
+        served_by_victim = stats['worker_requests'][0]
+        for result, frame in zip(pool.predict_batch(frames), frames):
+            assert result.orig_img is frame
+        assert pool.get_stats()['worker_requests'][0] == served_by_victim
+    finally:
+        pool.close()
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('torch')
+
+from src.core.temporal_buffer import TemporalBuffer
+
+
+def _as_numpy(tensor):
+    return np.asarray(tensor.numpy() if hasattr(tensor, 'numpy') else tensor)
+
+
+def test_window_variance_matches_numpy_with_large_mean():
+    window = 15
+    rng = np.random.default_rng(0)
+    buffer = TemporalBuffer(buffer_size=window, track_variance=True)
+    frames = []
+    # Features near 1000 with std 0.1 cancel badly in E[x^2] - E[x]^2
+    for _ in range(40):
+        rgb = (1000.0 + 0.1 * rng.standard_normal((4, 8))).astype(np.float32)
+        depth = (-500.0 + 0.05 * rng.standard_normal((2, 3))).astype(np.float32)
+        buffer.update(rgb, depth)
+        frames.append((rgb, depth))
+
+    rgb_var, depth_var = buffer.get_feature_variance()
+    recent = frames[-window:]
+    expected_rgb = np.var(np.stack([rgb for rgb, _ in recent]).astype(np.float64), axis=0)
+    expected_depth = np.var(np.stack([depth for _, depth in recent]).astype(np.float64), axis=0)
+    np.testing.assert_allclose(_as_numpy(rgb_var), expected_rgb, rtol=1e-3)
+    np.testing.assert_allclose(_as_numpy(depth_var), expected_depth, rtol=1e-3)
+
+
+def test_window_mean_matches_numpy_after_eviction():
+    window = 5
+    rng = np.random.default_rng(1)
+    buffer = TemporalBuffer(buffer_size=window)
+    frames = [rng.standard_normal((3, 3)).astype(np.float32) for _ in range(12)]
+    for frame in frames:
+        buffer.update(frame, frame)
+
+    rgb_mean, _ = buffer.get_averaged_features()
+    np.testing.assert_allclose(_as_numpy(rgb_mean), np.mean(frames[-window:], axis=0), rtol=1e-5, atol=1e-6)